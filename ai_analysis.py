@@ -6,9 +6,275 @@ AI分析功能模块
 
 import json
 import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from config import Config
 import os
 from vector_db import get_vector_db
+from metrics import record_llm_call, record_llm_queue_wait
+from tracing import span
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+DASHSCOPE_DEFAULT_API_BASE = 'https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation'
+
+# AI工作类别，按优先级从高到低：交互式请求（如创建问题时的分析）、CSV导入、后台补充分析/重新分析
+AI_WORK_CLASSES = ('interactive', 'import', 'backfill')
+
+_current_work_class = ContextVar('ai_work_class', default='interactive')
+
+
+@contextmanager
+def ai_work_class(work_class):
+    """
+    在该上下文中发起的大模型调用按指定的工作类别排队（未指定时为interactive）
+    
+    Args:
+        work_class: 工作类别（interactive/import/backfill）
+    """
+    if work_class not in AI_WORK_CLASSES:
+        raise ValueError(f"无效的AI工作类别 '{work_class}'，有效值: {list(AI_WORK_CLASSES)}")
+    token = _current_work_class.set(work_class)
+    try:
+        yield
+    finally:
+        _current_work_class.reset(token)
+
+
+def current_ai_work_class():
+    """当前上下文的AI工作类别"""
+    return _current_work_class.get()
+
+
+class _SharedSlots:
+    """
+    跨进程共享的调用名额：名额目录下每个名额一个文件，持有文件锁(flock)即占用该名额。
+    进程异常退出时文件锁由操作系统释放，不会遗留占用的名额
+    """
+
+    def __init__(self, lock_dir, poll_interval=0.05):
+        self.lock_dir = lock_dir
+        self.poll_interval = poll_interval
+
+    def acquire(self, name, limit):
+        """
+        取得name类名额中的一个，全部被占用时轮询等待
+
+        Returns:
+            int: 持有文件锁的文件描述符，用于release
+        """
+        os.makedirs(self.lock_dir, exist_ok=True)
+        while True:
+            for index in range(limit):
+                fd = os.open(os.path.join(self.lock_dir, f'{name}-{index}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def release(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class AIWorkScheduler:
+    """
+    大模型调用调度器：所有调用共用总并发数，每个工作类别另有并发上限
+    有空闲名额时优先分配给优先级高的类别，同一类别内按到达顺序分配。
+    导入和补充分析的并发上限小于总并发数时，交互式调用始终有空闲名额，不会排在大批量导入之后。
+    指定名额目录时，总并发数和类别并发上限由共用该目录的所有进程（如各gunicorn worker、导入进程）合计；
+    进程内仍按优先级排队，进程之间不保证优先级顺序，由类别并发上限为交互式调用保留名额
+    """
+
+    def __init__(self, max_concurrency, class_limits=None, lock_dir=None):
+        """
+        Args:
+            max_concurrency: 同时进行的大模型调用总数
+            class_limits: 工作类别 -> 该类别的并发上限，未指定的类别以总数为上限
+            lock_dir: 跨进程共享名额的目录，为空时只在进程内调度（不支持文件锁的平台上同样只在进程内调度）
+        """
+        if max_concurrency < 1:
+            raise ValueError("AI调用总并发数必须大于0")
+        class_limits = class_limits or {}
+        self.max_concurrency = max_concurrency
+        self.class_limits = {work_class: min(class_limits.get(work_class) or max_concurrency, max_concurrency)
+                             for work_class in AI_WORK_CLASSES}
+        self._shared = _SharedSlots(lock_dir) if lock_dir and FCNTL_AVAILABLE else None
+        self._condition = threading.Condition()
+        self._running = {work_class: 0 for work_class in AI_WORK_CLASSES}
+        self._waiting = {work_class: deque() for work_class in AI_WORK_CLASSES}
+
+    def _can_start(self, work_class, ticket):
+        if sum(self._running.values()) >= self.max_concurrency:
+            return False
+        if self._running[work_class] >= self.class_limits[work_class] or self._waiting[work_class][0] is not ticket:
+            return False
+        # 优先级更高、且未达到其并发上限的类别有排队的调用时让其先开始
+        for higher_class in AI_WORK_CLASSES[:AI_WORK_CLASSES.index(work_class)]:
+            if self._waiting[higher_class] and self._running[higher_class] < self.class_limits[higher_class]:
+                return False
+        return True
+
+    @contextmanager
+    def slot(self, work_class=None):
+        """
+        取得一个调用名额，没有名额时排队等待，退出上下文时释放
+        
+        Args:
+            work_class: 工作类别，默认为当前上下文的类别
+        """
+        work_class = work_class or current_ai_work_class()
+        if work_class not in AI_WORK_CLASSES:
+            raise ValueError(f"无效的AI工作类别 '{work_class}'，有效值: {list(AI_WORK_CLASSES)}")
+        ticket = object()
+        wait_start = time.perf_counter()
+        with self._condition:
+            self._waiting[work_class].append(ticket)
+            try:
+                while not self._can_start(work_class, ticket):
+                    self._condition.wait()
+            finally:
+                self._waiting[work_class].remove(ticket)
+                # 队首变化后同类别的下一个调用可能可以开始
+                self._condition.notify_all()
+            self._running[work_class] += 1
+        try:
+            shared_fds = self._acquire_shared(work_class)
+            record_llm_queue_wait(work_class, time.perf_counter() - wait_start)
+            try:
+                yield
+            finally:
+                for fd in reversed(shared_fds):
+                    _SharedSlots.release(fd)
+        finally:
+            with self._condition:
+                self._running[work_class] -= 1
+                self._condition.notify_all()
+
+    def _acquire_shared(self, work_class):
+        """取得跨进程名额：先取类别名额再取总名额（顺序固定，不会互相等待）"""
+        if self._shared is None:
+            return []
+        fds = []
+        try:
+            if self.class_limits[work_class] < self.max_concurrency:
+                fds.append(self._shared.acquire(work_class, self.class_limits[work_class]))
+            fds.append(self._shared.acquire('all', self.max_concurrency))
+        except BaseException:
+            for fd in fds:
+                _SharedSlots.release(fd)
+            raise
+        return fds
+
+    def stats(self):
+        """各工作类别正在进行和排队中的调用数"""
+        with self._condition:
+            return {work_class: {'running': self._running[work_class], 'waiting': len(self._waiting[work_class]),
+                                 'limit': self.class_limits[work_class]}
+                    for work_class in AI_WORK_CLASSES}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_ai_scheduler():
+    """获取进程内共用的AI调度器（按配置创建）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = AIWorkScheduler(
+                    getattr(Config, 'AI_MAX_CONCURRENCY', 4),
+                    {'interactive': getattr(Config, 'AI_INTERACTIVE_CONCURRENCY', 0),
+                     'import': getattr(Config, 'AI_IMPORT_CONCURRENCY', 2),
+                     'backfill': getattr(Config, 'AI_BACKFILL_CONCURRENCY', 1)},
+                    lock_dir=getattr(Config, 'AI_SCHEDULER_LOCK_DIR', None)
+                )
+    return _scheduler
+
+
+def _openai_chat_completion(operation, **kwargs):
+    """
+    调用OpenAI ChatCompletion接口并记录耗时、失败次数和token用量
+    
+    Args:
+        operation: 调用用途，用于指标标签
+        **kwargs: 传给openai.ChatCompletion.create的参数
+    
+    Returns:
+        OpenAI响应对象
+    """
+    import openai
+    
+    with get_ai_scheduler().slot():
+        start_time = time.perf_counter()
+        try:
+            with span('llm', detail=f'openai/{operation}'):
+                response = openai.ChatCompletion.create(**kwargs)
+        except Exception:
+            record_llm_call('openai', operation, time.perf_counter() - start_time, error=True)
+            raise
+    usage = response.get('usage') or {}
+    record_llm_call('openai', operation, time.perf_counter() - start_time,
+                    prompt_tokens=usage.get('prompt_tokens'), completion_tokens=usage.get('completion_tokens'))
+    return response
+
+
+def _dashscope_request(operation, data):
+    """
+    调用通义千问文本生成接口并记录耗时、失败次数和token用量
+    
+    Args:
+        operation: 调用用途，用于指标标签
+        data: 请求体
+    
+    Returns:
+        Tuple[requests.Response, Optional[dict]]: (接口响应, 解析后的响应JSON，状态码不是200时为None)
+    """
+    import requests
+    
+    headers = {
+        'Authorization': f'Bearer {Config.DASHSCOPE_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+    with get_ai_scheduler().slot():
+        start_time = time.perf_counter()
+        try:
+            with span('llm', detail=f'dashscope/{operation}'):
+                response = requests.post(
+                    Config.DASHSCOPE_API_BASE or DASHSCOPE_DEFAULT_API_BASE,
+                    headers=headers,
+                    json=data
+                )
+        except Exception:
+            record_llm_call('dashscope', operation, time.perf_counter() - start_time, error=True)
+            raise
+    elapsed = time.perf_counter() - start_time
+    if response.status_code != 200:
+        record_llm_call('dashscope', operation, elapsed, error=True)
+        return response, None
+    try:
+        result = response.json()
+    except ValueError:
+        record_llm_call('dashscope', operation, elapsed, error=True)
+        raise
+    usage = result.get('usage') or {}
+    record_llm_call('dashscope', operation, elapsed,
+                    prompt_tokens=usage.get('input_tokens'), completion_tokens=usage.get('output_tokens'))
+    return response, result
 
 # 根据配置决定使用哪种AI服务
 def analyze_problem_with_ai(title, description, equipment_type=None, phase=None):
@@ -125,7 +391,8 @@ def _analyze_with_openai(prompt, title, description, equipment_type=None, phase=
 
 请确保分析结果具有专业性、针对性和实用性。"""
         
-        response = openai.ChatCompletion.create(
+        response = _openai_chat_completion(
+            'analysis',
             model=Config.OPENAI_MODEL or "gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -161,11 +428,6 @@ def _analyze_with_dashscope(prompt, title, description, equipment_type=None, pha
 
 请确保分析结果具有专业性、针对性和实用性。"""
         
-        headers = {
-            'Authorization': f'Bearer {Config.DASHSCOPE_API_KEY}',
-            'Content-Type': 'application/json'
-        }
-        
         data = {
             'model': Config.DASHSCOPE_MODEL or 'qwen-max',
             'input': {
@@ -180,14 +442,9 @@ def _analyze_with_dashscope(prompt, title, description, equipment_type=None, pha
             }
         }
         
-        response = requests.post(
-            Config.DASHSCOPE_API_BASE or 'https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation',
-            headers=headers,
-            json=data
-        )
+        response, result = _dashscope_request('analysis', data)
         
         if response.status_code == 200:
-            result = response.json()
             analysis = result.get('output', {}).get('text', '')
             return {'analysis': analysis}
         else:
@@ -587,11 +844,6 @@ AI分析: {p.ai_analysis or '未分析'}
             import requests
             from config import Config
             
-            headers = {
-                'Authorization': f'Bearer {Config.DASHSCOPE_API_KEY}',
-                'Content-Type': 'application/json'
-            }
-            
             data = {
                 'model': Config.DASHSCOPE_MODEL or 'qwen-max',
                 'input': {
@@ -605,14 +857,9 @@ AI分析: {p.ai_analysis or '未分析'}
                 }
             }
             
-            response = requests.post(
-                Config.DASHSCOPE_API_BASE or 'https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation',
-                headers=headers,
-                json=data
-            )
+            response, result = _dashscope_request('design_query', data)
             
             if response.status_code == 200:
-                result = response.json()
                 return result.get('output', {}).get('text', '')
             else:
                 print(f"通义千问API调用失败: {response.status_code}, {response.text}")
@@ -634,7 +881,8 @@ def _query_with_openai(prompt):
         
         openai.api_key = Config.OPENAI_API_KEY
         
-        response = openai.ChatCompletion.create(
+        response = _openai_chat_completion(
+            'design_query',
             model=Config.OPENAI_MODEL or "gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4  # 降低温度以获得更准确的技术建议
@@ -696,7 +944,8 @@ AI分析结果: {ai_analysis_result}
             
             openai.api_key = Config.OPENAI_API_KEY
             
-            response = openai.ChatCompletion.create(
+            response = _openai_chat_completion(
+                'internal_solution',
                 model=Config.OPENAI_MODEL or "gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "你是一个专业的设备工程专家，专注于解决系统内部原因导致的故障。请结合设备类型和发现阶段提供详细、具体的内部改进方案。"},
@@ -710,11 +959,6 @@ AI分析结果: {ai_analysis_result}
         elif Config.AI_PROVIDER == 'dashscope':  # 通义千问
             import requests
             
-            headers = {
-                'Authorization': f'Bearer {Config.DASHSCOPE_API_KEY}',
-                'Content-Type': 'application/json'
-            }
-            
             data = {
                 'model': Config.DASHSCOPE_MODEL or 'qwen-max',
                 'input': {
@@ -729,14 +973,9 @@ AI分析结果: {ai_analysis_result}
                 }
             }
             
-            response = requests.post(
-                Config.DASHSCOPE_API_BASE or 'https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation',
-                headers=headers,
-                json=data
-            )
+            response, result = _dashscope_request('internal_solution', data)
             
             if response.status_code == 200:
-                result = response.json()
                 solution = result.get('output', {}).get('text', '')
                 return solution
             else:
@@ -0,0 +1,191 @@
+"""
+AI补充分析模块
+导入时跳过AI分析（skip_ai）的问题以ai_analyzed=False写入，本模块在后台按每分钟调用次数预算逐个补充分析和分类。
+待分析的问题直接按ai_analyzed=False查询，每个问题分析后立即提交，进程重启后自动从尚未分析的问题继续
+可作为命令行脚本运行，也可以在应用中作为后台线程持续处理
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import or_
+
+from config import Config
+from models import db, Problem
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """令牌桶速率限制：每分钟补充rpm个令牌，最多积攒capacity个，没有令牌时acquire()等待"""
+
+    def __init__(self, rpm: float, capacity: int = 1, clock=time.monotonic, sleep=time.sleep):
+        if rpm <= 0:
+            raise ValueError("每分钟调用次数必须大于0")
+        self.rate = rpm / 60.0  # 每秒补充的令牌数
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self) -> float:
+        """
+        取得一个令牌，没有令牌时等待到补充出一个为止
+
+        Returns:
+            float: 等待的秒数
+        """
+        waited = 0.0
+        with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+                self._sleep(delay)
+                waited += delay
+
+
+def _unanalyzed():
+    """尚未AI分析的问题（包括字段为空的旧数据）"""
+    return or_(Problem.ai_analyzed.is_(False), Problem.ai_analyzed.is_(None))
+
+
+def count_unanalyzed() -> int:
+    """统计尚未AI分析的问题数"""
+    return db.session.query(db.func.count(Problem.id)).filter(_unanalyzed()).scalar()
+
+
+def backfill_ai_analysis(limiter: TokenBucket = None, batch_size: int = None,
+                         max_problems: int = None) -> Dict[str, Any]:
+    """
+    按ID顺序补充分析尚未AI分析的问题，每次调用AI前从令牌桶取得令牌
+
+    分析结果（分类、优先级）与导入时的AI分析相同，每个问题分析后立即提交（发件箱随之同步向量数据库）。
+    本次运行中分析失败、仍为未分析的问题不再重试，下次运行时重试
+
+    Args:
+        limiter: 速率限制，默认按配置值AI_BACKFILL_RPM新建
+        batch_size: 每次查询的问题数，默认使用配置值
+        max_problems: 最多处理的问题数，None表示处理到没有未分析的问题
+
+    Returns:
+        Dict[str, Any]: 处理统计信息
+    """
+    from csv_import import _ImportState, _apply_ai_analysis
+
+    limiter = limiter or TokenBucket(getattr(Config, 'AI_BACKFILL_RPM', 30), getattr(Config, 'AI_BACKFILL_BURST', 1))
+    batch_size = batch_size or getattr(Config, 'AI_BACKFILL_BATCH_SIZE', 50)
+    state = _ImportState(False, 'off', 0)  # 复用导入时的分类缓存
+    state.ai_work_class = 'backfill'  # AI调度器中优先级最低
+
+    stats = {'processed_count': 0, 'analyzed_count': 0, 'failed_count': 0, 'waited_seconds': 0.0}
+    last_id = 0
+    while max_problems is None or stats['processed_count'] < max_problems:
+        problem_ids = [row.id for row in db.session.query(Problem.id)
+                       .filter(_unanalyzed(), Problem.id > last_id)
+                       .order_by(Problem.id)
+                       .limit(batch_size)
+                       .all()]
+        db.session.commit()  # 结束读事务，等待令牌期间不占用数据库
+        if not problem_ids:
+            break
+
+        for problem_id in problem_ids:
+            if max_problems is not None and stats['processed_count'] >= max_problems:
+                break
+            last_id = problem_id
+            stats['waited_seconds'] += limiter.acquire()
+
+            problem = db.session.get(Problem, problem_id)
+            if problem is None or problem.ai_analyzed:
+                db.session.commit()
+                continue  # 等待期间已被删除或分析
+            try:
+                equipment_type_name = problem.equipment_type.name if problem.equipment_type else None
+                _apply_ai_analysis(problem, equipment_type_name, state)
+                db.session.commit()
+            except Exception as e:
+                logger.error(f'补充分析问题 {problem_id} 失败: {str(e)}', exc_info=True)
+                db.session.rollback()
+                analyzed = False
+            else:
+                analyzed = bool(problem.ai_analyzed)
+            stats['processed_count'] += 1
+            stats['analyzed_count' if analyzed else 'failed_count'] += 1
+        db.session.expunge_all()
+
+    stats['waited_seconds'] = round(stats['waited_seconds'], 2)
+    if stats['processed_count']:
+        logger.info(f"AI补充分析完成: {stats}")
+    return stats
+
+
+def start_backfill_worker(app, interval: float = None) -> Optional[threading.Thread]:
+    """
+    启动后台线程，按固定间隔补充分析尚未AI分析的问题（各轮共用同一个速率限制）
+
+    Args:
+        app: Flask应用实例
+        interval: 没有待分析问题时的轮询间隔（秒），默认使用配置值，小于等于0时不启动
+
+    Returns:
+        Optional[threading.Thread]: 后台线程，未启动时返回None
+    """
+    interval = interval if interval is not None else app.config.get('AI_BACKFILL_POLL_INTERVAL', 0)
+    if not interval or interval <= 0:
+        logger.info("未启用AI补充分析后台处理")
+        return None
+    limiter = TokenBucket(app.config.get('AI_BACKFILL_RPM', 30), app.config.get('AI_BACKFILL_BURST', 1))
+
+    def _run():
+        while True:
+            try:
+                with app.app_context():
+                    backfill_ai_analysis(limiter=limiter)
+            except Exception as e:
+                logger.error(f"AI补充分析失败: {str(e)}", exc_info=True)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=_run, name='ai-backfill-worker', daemon=True)
+    thread.start()
+    logger.info(f"已启动AI补充分析后台处理，每分钟最多 {limiter.rate * 60:g} 次，轮询间隔 {interval} 秒")
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description='补充分析导入时跳过AI分析的问题')
+    parser.add_argument('--rpm', type=float, default=None, help='每分钟最多调用AI的次数（默认使用配置值）')
+    parser.add_argument('--limit', type=int, default=None, help='最多处理的问题数')
+    parser.add_argument('--loop', type=float, metavar='SECONDS', default=None,
+                        help='持续运行，没有待分析问题时按该间隔轮询（作为独立的后台进程）')
+    parser.add_argument('--status', action='store_true', help='只显示尚未分析的问题数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        if args.status:
+            print(json.dumps({'unanalyzed': count_unanalyzed()}, ensure_ascii=False, indent=2))
+        else:
+            bucket = TokenBucket(args.rpm or app.config.get('AI_BACKFILL_RPM', 30),
+                                 app.config.get('AI_BACKFILL_BURST', 1))
+            while True:
+                summary = backfill_ai_analysis(limiter=bucket, max_problems=args.limit)
+                summary['unanalyzed'] = count_unanalyzed()
+                print(json.dumps(summary, ensure_ascii=False, indent=2))
+                if args.loop is None:
+                    break
+                time.sleep(args.loop)
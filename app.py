@@ -1,21 +1,34 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash
+from flask import Flask, Response, g, request, jsonify, render_template, redirect, url_for, flash, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import os
+import hmac
+import tempfile
+import threading
+from functools import wraps
 from datetime import datetime
 import json
 import csv
 from io import StringIO
 import logging
 
-from models import db, Problem, EquipmentType, ProblemCategory, SolutionCategory
+from models import db, Problem, EquipmentType, ProblemCategory, SolutionCategory, ImportHistory
 from config import Config
 from csv_import import import_csv_file
 from ai_analysis import analyze_problem_with_ai, extract_category_from_ai_response
 from vector_db import init_vector_db
+import metrics
+import tracing
+import profiler
+from upload_stream import HashingUploadFile, StreamingUploadRequest
+from compressed_csv import open_csv_text, source_extension
+from columnar_io import PYARROW_AVAILABLE, columnar_format
 
 app = Flask(__name__)
 app.config.from_object(Config)
+# CSV上传在解析请求时即分块写入上传目录并计算SHA-256，超过大小限制立即中止
+app.request_class = StreamingUploadRequest
 
 # 允许跨域请求
 CORS(app)
@@ -23,15 +36,57 @@ CORS(app)
 # 初始化数据库
 db.init_app(app)
 
+# 注册请求耗时和SQL统计
+metrics.init_app(app)
+
+# 注册请求追踪（TRACING_ENABLED开启时输出Server-Timing响应头）
+tracing.init_app(app)
+
+def _is_admin_request():
+    """校验X-Admin-Token请求头（未配置ADMIN_TOKEN时管理功能全部禁用）"""
+    admin_token = app.config.get('ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(admin_token) and hmac.compare_digest(provided.encode('utf-8'), admin_token.encode('utf-8'))
+
+
+def admin_required(view):
+    """管理接口装饰器"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _is_admin_request():
+            return jsonify({'error': '需要管理员权限'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.before_request
+def _start_request_profiler():
+    """请求头带X-Profile-Request且为管理员时，对本次请求所在线程采样"""
+    if request.headers.get('X-Profile-Request') and _is_admin_request():
+        interval = app.config.get('PROFILE_INTERVAL_MS', 5) / 1000.0
+        g.request_profiler = profiler.StackSampler(interval=interval, thread_ids={threading.get_ident()}).start()
+
+
+@app.after_request
+def _finish_request_profiler(response):
+    """停止单请求采样，结果写入采样目录，并通过X-Profile-File响应头返回文件名"""
+    sampler = g.pop('request_profiler', None)
+    if sampler is not None:
+        sampler.stop()
+        path = profiler.write_profile(app.config['PROFILE_OUTPUT_DIR'], sampler.collapsed(), prefix='request')
+        response.headers['X-Profile-File'] = os.path.basename(path)
+    return response
+
+
 # 确保上传目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 # 允许的文件类型
-ALLOWED_EXTENSIONS = {'csv'}
+ALLOWED_EXTENSIONS = {'csv', 'csv.gz', 'zip', 'parquet', 'arrow', 'feather'}
 
 
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return source_extension(filename) in ALLOWED_EXTENSIONS
 
 
 def _detect_csv_delimiter(sample_text):
@@ -119,6 +174,43 @@ def _detect_csv_delimiter(sample_text):
         return ','
 
 
+@app.route('/api/admin/profile', methods=['GET'])
+@admin_required
+def profile_process():
+    """对当前worker进程采样指定秒数，返回collapsed stack文件（可用于生成火焰图）"""
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval_ms = float(request.args.get('interval_ms', app.config.get('PROFILE_INTERVAL_MS', 5)))
+    except ValueError:
+        return jsonify({'error': 'seconds和interval_ms必须是数字'}), 400
+    max_seconds = app.config.get('PROFILE_MAX_SECONDS', 60)
+    if not 0 < seconds <= max_seconds or interval_ms < 1:
+        return jsonify({'error': f'seconds必须在(0, {max_seconds}]之间，interval_ms不能小于1'}), 400
+    
+    content = profiler.profile_for(seconds, interval_ms / 1000.0)
+    if content is None:
+        return jsonify({'error': '已有采样任务在运行'}), 409
+    
+    filename = f'profile-{os.getpid()}-{datetime.now().strftime("%Y%m%d-%H%M%S")}.folded'
+    return Response(content, content_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+@app.route('/api/admin/profiles/<filename>', methods=['GET'])
+@admin_required
+def download_profile(filename):
+    """下载单请求采样或信号采样生成的文件"""
+    return send_from_directory(os.path.abspath(app.config['PROFILE_OUTPUT_DIR']), secure_filename(filename),
+                               mimetype='text/plain', as_attachment=True)
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus指标"""
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
+
+
 @app.route('/')
 def index():
     """主页 - 显示仪表盘"""
@@ -182,6 +274,42 @@ def get_problems():
     })
 
 
+@app.route('/api/problems/export', methods=['GET'])
+def export_problems_file():
+    """导出全部问题为Parquet或Arrow IPC文件（列名与CSV导入一致，可直接重新导入）"""
+    from columnar_io import export_problems
+
+    fmt = request.args.get('format', 'parquet').lower()
+    if fmt not in ('parquet', 'arrow'):
+        return jsonify({'error': '无效的导出格式，有效值: parquet, arrow'}), 400
+    if not PYARROW_AVAILABLE:
+        return jsonify({'error': '服务器未安装pyarrow，不支持Parquet/Arrow导出'}), 501
+
+    # 先按批写入临时文件再发送，发送完成后删除
+    export_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'exports')
+    os.makedirs(export_dir, exist_ok=True)
+    fd, export_path = tempfile.mkstemp(suffix=f'.{fmt}', dir=export_dir)
+    os.close(fd)
+    try:
+        export_problems(export_path, fmt)
+    except Exception as e:
+        os.remove(export_path)
+        app.logger.error(f'导出问题失败: {str(e)}', exc_info=True)
+        return jsonify({'error': '导出问题失败', 'details': str(e)}), 500
+
+    def generate():
+        try:
+            with open(export_path, 'rb') as f:
+                yield from iter(lambda: f.read(64 * 1024), b'')
+        finally:
+            os.remove(export_path)
+
+    mimetype = 'application/vnd.apache.parquet' if fmt == 'parquet' else 'application/vnd.apache.arrow.file'
+    return Response(generate(), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=problems.{fmt}',
+                             'Content-Length': str(os.path.getsize(export_path))})
+
+
 @app.route('/api/problems/<int:problem_id>', methods=['GET'])
 def get_problem(problem_id):
     """获取问题详情"""
@@ -233,18 +361,20 @@ def create_problem():
     )
     
     db.session.add(problem)
-    db.session.commit()
+    with tracing.span('commit'):
+        db.session.commit()
     
     # 触发AI分析
     try:
         # 获取设备类型名称
         equipment_type_name = problem.equipment_type.name if problem.equipment_type else None
-        ai_result = analyze_problem_with_ai(
-            problem.title, 
-            problem.description,
-            equipment_type=equipment_type_name,
-            phase=problem.phase
-        )
+        with tracing.span('ai_analysis'):
+            ai_result = analyze_problem_with_ai(
+                problem.title, 
+                problem.description,
+                equipment_type=equipment_type_name,
+                phase=problem.phase
+            )
         problem.ai_analyzed = True
         problem.ai_analysis = ai_result.get('analysis', '')
         
@@ -259,19 +389,13 @@ def create_problem():
         problem.solution_category_id = category_info.get('solution_category_id', 1)
         problem.priority = category_info.get('priority', 'medium')
         
-        db.session.commit()
+        with tracing.span('commit'):
+            db.session.commit()
     except Exception as e:
         app.logger.error(f'AI分析失败: {str(e)}')
         # 即使AI分析失败，问题仍然被创建
     
-    # 将问题添加到向量数据库
-    try:
-        success = problem.save_to_vector_db()
-        if not success:
-            app.logger.error(f"无法将问题 {problem.id} 保存到向量数据库")
-    except Exception as e:
-        app.logger.error(f"保存问题到向量数据库失败: {str(e)}")
-    
+    # 向量数据库由发件箱后台任务同步（发件箱记录与问题在同一事务中写入）
     return jsonify({'id': problem.id, 'message': '问题添加成功'})
 
 
@@ -317,18 +441,91 @@ def get_solution_categories():
     return jsonify(result)
 
 
+def _check_csv_upload(temp_file_path, filename):
+    """检查上传的CSV（.csv.gz或Parquet/Arrow）文件内容和列头，不通过时返回错误响应，通过时返回None"""
+    if columnar_format(temp_file_path) is None:
+        error_response = _check_csv_text(temp_file_path, filename)
+        if error_response is not None:
+            return error_response
+    elif not PYARROW_AVAILABLE:
+        app.logger.warning(f'未安装pyarrow，无法导入列式文件: {filename}')
+        return jsonify({'error': '服务器未安装pyarrow，不支持Parquet/Arrow文件'}), 400
+
+    # 验证CSV文件格式
+    from csv_import import validate_csv_headers
+    try:
+        validation_result = validate_csv_headers(temp_file_path)
+    except Exception as validation_error:
+        app.logger.error(f'文件列头验证失败: {str(validation_error)}')
+        return jsonify({'error': '文件验证失败'}), 400
+    if not validation_result['valid']:
+        app.logger.warning(f'CSV文件格式验证失败: {validation_result["message"]}')
+        return jsonify({'error': f'CSV文件格式错误: {validation_result["message"]}'}), 400
+    return None
+
+
+def _check_csv_text(temp_file_path, filename):
+    """检查上传的CSV文本能否识别编码和分隔符且不为空，不通过时返回错误响应"""
+    # 额外的文件内容验证：检查文件是否真的是CSV格式
+    try:
+        # 使用与csv_import.py中相同的编码检测方法
+        encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin-1']
+        file_valid = False
+        used_encoding = None
+
+        for encoding in encodings:
+            try:
+                with open_csv_text(temp_file_path, encoding) as test_file:
+                    # 读取前1024字节用于检测CSV格式
+                    sample = test_file.read(1024)
+                    used_encoding = encoding
+                    file_valid = True
+                    break
+            except UnicodeDecodeError:
+                continue
+
+        if not file_valid:
+            app.logger.warning(f'上传的文件不是有效的文本文件: {filename}')
+            return jsonify({'error': '文件格式错误，不是有效的CSV文件'}), 400
+
+        # 额外验证：使用csv模块检测文件格式
+        import csv
+        delimiter = _detect_csv_delimiter(sample)
+        if delimiter is None:
+            app.logger.warning(f'无法检测CSV文件分隔符: {filename}')
+            return jsonify({'error': '无法检测CSV文件分隔符，请确保文件是有效的CSV格式'}), 400
+
+        # 验证CSV文件是否为空
+        with open_csv_text(temp_file_path, used_encoding) as file:
+            reader = csv.DictReader(file, delimiter=delimiter)
+            first_row = next(reader, None)
+            if first_row is None:
+                app.logger.warning(f'上传的CSV文件为空: {filename}')
+                return jsonify({'error': 'CSV文件为空'}), 400
+
+    except Exception as file_check_error:
+        app.logger.error(f'文件内容验证失败: {str(file_check_error)}')
+        return jsonify({'error': '文件验证失败'}), 400
+    return None
+
+
 @app.route('/api/import-csv', methods=['POST'])
 def import_csv():
     """上传并导入CSV文件"""
     import time
     start_time = time.time()  # 记录开始时间用于性能监控
     
-    # 检查请求中是否包含文件
-    if 'csvFile' not in request.files:
+    # 检查请求中是否包含文件（解析请求时上传文件已流式写入上传目录）
+    try:
+        files = request.files
+    except RequestEntityTooLarge:
+        app.logger.warning(f'上传文件大小超出限制 (限制: {app.config.get("CSV_FILE_SIZE_LIMIT")} bytes)')
+        return jsonify({'error': '文件大小超出限制'}), 413
+    if 'csvFile' not in files:
         app.logger.warning('CSV上传请求中未包含文件')
         return jsonify({'error': '请上传CSV文件'}), 400
     
-    file = request.files['csvFile']
+    file = files['csvFile']
     if file.filename == '':
         app.logger.warning('CSV上传请求中文件名为空')
         return jsonify({'error': '请上传CSV文件'}), 400
@@ -338,13 +535,8 @@ def import_csv():
         return jsonify({'error': '只允许上传CSV文件'}), 400
     
     temp_file_path = None  # 初始化临时文件路径，用于错误处理
-    failed_records_path = None  # 初始化失败记录文件路径
     
     try:
-        # 记录上传信息用于性能监控
-        app.logger.info(f'开始处理CSV上传: {file.filename}, 大小: {len(file.read())} bytes')
-        file.seek(0)  # 重置文件指针
-        
         # 安全地处理文件名
         filename = secure_filename(file.filename)
         
@@ -353,7 +545,7 @@ def import_csv():
             app.logger.warning(f'CSV上传文件名无效: {file.filename}')
             return jsonify({'error': '无效的文件名'}), 400
             
-        file_ext = filename.rsplit('.', 1)[1].lower()
+        file_ext = source_extension(filename)
         if file_ext not in app.config.get('CSV_ALLOWED_EXTENSIONS', {'csv'}):
             app.logger.warning(f'CSV上传文件类型不允许: {file_ext}')
             return jsonify({'error': '只允许上传CSV文件'}), 400
@@ -363,88 +555,88 @@ def import_csv():
         unique_filename = f"{uuid.uuid4().hex}_{filename}"
         temp_file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
         
-        # 保存上传的文件到临时位置
-        file.save(temp_file_path)
+        # 流式上传的文件已在上传目录中，直接重命名；大小和哈希在写入时已计算
+        if isinstance(file.stream, HashingUploadFile):
+            file_size, file_hash = file.stream.size, file.stream.hexdigest()
+            file.stream.persist(temp_file_path)
+        else:
+            file.save(temp_file_path)
+            file_size, file_hash = os.path.getsize(temp_file_path), None
+        
+        # 记录上传信息用于性能监控
+        app.logger.info(f'开始处理CSV上传: {file.filename}, 大小: {file_size} bytes')
         
         # 验证文件大小（使用配置中的限制）
-        file_size = os.path.getsize(temp_file_path)
         max_size = app.config.get('CSV_FILE_SIZE_LIMIT', 100 * 1024 * 1024)  # 从配置中获取限制
         if file_size > max_size:
             app.logger.warning(f'上传文件大小超出限制: {file_size} bytes (限制: {max_size} bytes)')
             return jsonify({'error': '文件大小超出限制'}), 400
         
-        # 额外的文件内容验证：检查文件是否真的是CSV格式
-        try:
-            # 使用与csv_import.py中相同的编码检测方法
-            encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin-1']
-            file_valid = False
-            used_encoding = None
-            
-            for encoding in encodings:
-                try:
-                    with open(temp_file_path, 'r', encoding=encoding) as test_file:
-                        # 读取前1024字节用于检测CSV格式
-                        sample = test_file.read(1024)
-                        used_encoding = encoding
-                        file_valid = True
-                        break
-                except UnicodeDecodeError:
-                    continue
-            
-            if not file_valid:
-                app.logger.warning(f'上传的文件不是有效的文本文件: {filename}')
-                return jsonify({'error': '文件格式错误，不是有效的CSV文件'}), 400
-            
-            # 额外验证：使用csv模块检测文件格式
-            import csv
-            delimiter = _detect_csv_delimiter(sample)
-            if delimiter is None:
-                app.logger.warning(f'无法检测CSV文件分隔符: {filename}')
-                return jsonify({'error': '无法检测CSV文件分隔符，请确保文件是有效的CSV格式'}), 400
-            
-            # 验证CSV文件是否为空
-            with open(temp_file_path, 'r', encoding=used_encoding) as file:
-                reader = csv.DictReader(file, delimiter=delimiter)
-                first_row = next(reader, None)
-                if first_row is None:
-                    app.logger.warning(f'上传的CSV文件为空: {filename}')
-                    return jsonify({'error': 'CSV文件为空'}), 400
-                    
-        except Exception as file_check_error:
-            app.logger.error(f'文件内容验证失败: {str(file_check_error)}')
-            return jsonify({'error': '文件验证失败'}), 400
+        # zip压缩包中的每个CSV文件在导入时分别验证
+        if file_ext != 'zip':
+            error_response = _check_csv_upload(temp_file_path, filename)
+            if error_response is not None:
+                return error_response
         
-        # 验证CSV文件格式
-        from csv_import import validate_csv_headers, save_failed_records_to_csv
-        validation_result = validate_csv_headers(temp_file_path)
-        if not validation_result['valid']:
-            app.logger.warning(f'CSV文件格式验证失败: {validation_result["message"]}')
-            return jsonify({'error': f'CSV文件格式错误: {validation_result["message"]}'}), 400
+        # 重复检测选项
+        from csv_import import DUPLICATE_MODES
+        duplicate_mode = (request.form.get('duplicateMode') or app.config.get('CSV_DUPLICATE_MODE', 'off')).lower()
+        if duplicate_mode not in DUPLICATE_MODES:
+            return jsonify({'error': f'无效的重复处理模式，有效值: {", ".join(DUPLICATE_MODES)}'}), 400
+        duplicate_threshold = request.form.get('duplicateThreshold', type=float)
+        if duplicate_threshold is not None and not 0 < duplicate_threshold <= 1:
+            return jsonify({'error': '重复相似度阈值必须在0到1之间'}), 400
+
+        # 清理验证引擎选项
+        from csv_import import IMPORT_ENGINES
+        engine = (request.form.get('engine') or app.config.get('CSV_IMPORT_ENGINE', 'python')).lower()
+        if engine not in IMPORT_ENGINES:
+            return jsonify({'error': f'无效的导入引擎，有效值: {", ".join(IMPORT_ENGINES)}'}), 400
+        
+        # 相同内容的文件已导入时默认返回之前的结果，forceReimport为真时重新导入
+        force_reimport = request.form.get('forceReimport', 'false').lower() == 'true'
+        # validateOnly为真时只验证，返回验证报告，不写入数据库、不调用AI
+        validate_only = request.form.get('validateOnly', 'false').lower() == 'true'
+        # skipAi为真时导入时不做AI分析，由后台补充分析任务按速率限制补充
+        skip_ai = request.form.get('skipAi', 'false').lower() == 'true'
         
         app.logger.info(f'开始CSV数据导入处理: {filename}')
         
         # 在应用上下文中导入CSV数据 - 这里使用当前应用上下文，无需重新创建
         # 使用fail_on_error=False，以便继续处理有效记录
-        result = import_csv_file(temp_file_path, fail_on_error=False)
+        if file_ext == 'zip':
+            # 压缩包中的每个CSV文件作为子导入并行处理
+            from csv_import import import_csv_archive
+            result = import_csv_archive(temp_file_path, fail_on_error=False, duplicate_mode=duplicate_mode,
+                                        duplicate_threshold=duplicate_threshold, engine=engine,
+                                        force_reimport=force_reimport, validate_only=validate_only,
+                                        skip_ai=skip_ai)
+        else:
+            result = import_csv_file(temp_file_path, fail_on_error=False, duplicate_mode=duplicate_mode,
+                                     duplicate_threshold=duplicate_threshold, engine=engine, file_hash=file_hash,
+                                     force_reimport=force_reimport, validate_only=validate_only,
+                                     skip_ai=skip_ai)
         
-        # 如果有失败的记录，保存到单独的文件中
-        if 'failedRecords' in result and result['failedRecords']:
-            failed_records_path = save_failed_records_to_csv(result['failedRecords'])
-            app.logger.info(f'已保存 {len(result["failedRecords"])} 条失败记录到: {failed_records_path}')
-            result['failed_records_file'] = failed_records_path  # 添加失败记录文件路径到结果中
+        # 失败记录已在导入过程中写入拒绝文件，响应中只返回预览和分页/下载链接
+        for file_result in result.get('files', [result]):
+            file_result.pop('rejectFile', None)
+            if file_result.get('failedCount') and file_result.get('historyId'):
+                file_result['rejectsUrl'] = url_for('list_import_rejects', history_id=file_result['historyId'])
+                file_result['rejectsDownloadUrl'] = url_for('download_import_rejects',
+                                                            history_id=file_result['historyId'])
 
         # 计算处理时间
         processing_time = time.time() - start_time
         
         app.logger.info(f'CSV文件导入完成: {filename}, 成功导入 {result.get("importedCount", 0)} 条记录, '
-                       f'失败 {result.get("failedCount", 0)} 条, 总行数 {result.get("totalCount", 0)}, '
-                       f'处理时间 {processing_time:.2f} 秒')
+                       f'失败 {result.get("failedCount", 0)} 条, 重复 {result.get("duplicateCount", 0)} 条, '
+                       f'总行数 {result.get("totalCount", 0)}, 处理时间 {processing_time:.2f} 秒')
         
         return jsonify({
             **result,
             'processing_time': round(processing_time, 2),  # 添加处理时间信息
             'file_size': file_size  # 添加文件大小信息
-        })
+        }), 202 if result.get('inProgress') else 200
     
     except FileNotFoundError:
         processing_time = time.time() - start_time
@@ -457,22 +649,106 @@ def import_csv():
     except Exception as e:
         processing_time = time.time() - start_time
         app.logger.error(f'CSV导入失败: {str(e)}, 处理时间: {processing_time:.2f} 秒', exc_info=True)
-        return jsonify({'error': '导入CSV文件失败', 'details': str(e), 'processing_time': round(processing_time, 2)}), 500
+        response = {'error': '导入CSV文件失败', 'details': str(e), 'processing_time': round(processing_time, 2)}
+        # 导入中途失败时保留上传文件，可通过续传接口从检查点继续
+        failed_history = _find_unfinished_import(temp_file_path)
+        if failed_history is not None:
+            response.update({'historyId': failed_history.id, 'resumable': True,
+                             'checkpointRow': failed_history.checkpoint_row})
+        return jsonify(response), 500
     finally:
-        # 确保临时文件被删除（如果存在）
-        if temp_file_path and os.path.exists(temp_file_path):
+        # 确保临时文件被删除（如果存在）；未完成、可续传的导入保留源文件
+        if temp_file_path and os.path.exists(temp_file_path) and _find_unfinished_import(temp_file_path) is None:
             try:
                 os.remove(temp_file_path)
                 app.logger.debug(f'临时CSV文件已删除: {temp_file_path}')
             except OSError as e:
                 app.logger.error(f'删除临时CSV文件失败: {str(e)}')
-        # 如果失败记录文件不需要长期保存，也可以在此删除（可选）
-        # if failed_records_path and os.path.exists(failed_records_path):
-        #     try:
-        #         os.remove(failed_records_path)
-        #         app.logger.debug(f'失败记录文件已删除: {failed_records_path}')
-        #     except OSError as e:
-        #         app.logger.error(f'删除失败记录文件失败: {str(e)}')
+
+
+def _find_unfinished_import(source_path):
+    """查找以该文件为源、尚未完成的导入历史记录"""
+    if not source_path:
+        return None
+    try:
+        return ImportHistory.query.filter(ImportHistory.source_path == source_path,
+                                          ImportHistory.status != 'completed').first()
+    except Exception as e:
+        app.logger.error(f'查询导入历史记录失败: {str(e)}')
+        db.session.rollback()
+        return None
+
+
+@app.route('/api/import-history/resumable', methods=['GET'])
+def list_resumable_imports():
+    """列出可续传的导入"""
+    from csv_import import find_resumable_imports
+
+    return jsonify([{
+        'id': history.id,
+        'filename': history.filename,
+        'status': history.status,
+        'checkpoint_row': history.checkpoint_row,
+        'processed_records': history.processed_records,
+        'failed_records': history.failed_records,
+        'started_at': history.started_at.isoformat() if history.started_at else None,
+        'checkpoint_at': history.checkpoint_at.isoformat() if history.checkpoint_at else None
+    } for history in find_resumable_imports()])
+
+
+@app.route('/api/import-history/<int:history_id>/resume', methods=['POST'])
+def resume_csv_import(history_id):
+    """从检查点之后续传中断的CSV导入"""
+    from csv_import import resume_import
+
+    force = str(request.args.get('force') or request.form.get('force') or '').lower() in ('1', 'true', 'yes')
+    try:
+        result = resume_import(history_id, force=force)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        app.logger.error(f'续传CSV导入失败: {str(e)}', exc_info=True)
+        return jsonify({'error': '续传CSV导入失败', 'details': str(e), 'historyId': history_id}), 500
+    app.logger.info(f'CSV导入 {history_id} 续传完成: 从第 {result["resumedFromRow"]} 行之后继续, '
+                    f'累计成功 {result["importedCount"]} 条')
+    return jsonify(result)
+
+
+@app.route('/api/import-history/<int:history_id>/rejects', methods=['GET'])
+def list_import_rejects(history_id):
+    """分页浏览导入的失败记录"""
+    from import_rejects import read_rejects
+
+    history = ImportHistory.query.get_or_404(history_id)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+    return jsonify({
+        'historyId': history_id,
+        'total': history.failed_records or 0,
+        'page': page,
+        'per_page': per_page,
+        'items': read_rejects(history_id, (page - 1) * per_page, per_page)
+    })
+
+
+@app.route('/api/import-history/<int:history_id>/rejects/download', methods=['GET'])
+def download_import_rejects(history_id):
+    """下载导入的全部失败记录（默认CSV，format=jsonl时下载原始JSON Lines文件）"""
+    from import_rejects import reject_file_path, iter_rejects_csv
+
+    ImportHistory.query.get_or_404(history_id)
+    path = reject_file_path(history_id)
+    if not os.path.exists(path):
+        return jsonify({'error': '该导入没有失败记录'}), 404
+    if request.args.get('format') == 'jsonl':
+        return send_from_directory(os.path.abspath(os.path.dirname(path)), os.path.basename(path),
+                                   as_attachment=True, mimetype='application/x-ndjson')
+    return Response(iter_rejects_csv(history_id), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=import_{history_id}_rejects.csv'})
 
 
 @app.route('/api/dashboard-stats', methods=['GET'])
@@ -668,48 +944,18 @@ def dashboard_page():
 def initialize_vector_db():
     """
     初始化向量数据库
-    将现有问题数据添加到向量数据库中
+    增量同步上次同步之后新增或修改的问题，并清理已删除问题的向量
     """
     init_vector_db()
     
-    # 将现有的问题导入到向量数据库中
     try:
-        existing_problems = Problem.query.all()
-        app.logger.info(f"开始同步 {len(existing_problems)} 个现有问题到向量数据库")
-        
-        # 批量处理现有问题
-        problems_data = []
-        for problem in existing_problems:
-            metadata = {
-                'equipment_type_id': problem.equipment_type_id,
-                'problem_category_id': problem.problem_category_id,
-                'solution_category_id': problem.solution_category_id,
-                'status': problem.status,
-                'priority': problem.priority,
-                'phase': problem.phase,
-                'discovered_by': problem.discovered_by,
-                'discovered_at': str(problem.discovered_at) if problem.discovered_at else None,
-                'ai_analyzed': problem.ai_analyzed,
-                'ai_analysis': problem.ai_analysis,
-                'solution_description': problem.solution_description,
-                'created_at': str(problem.created_at),
-                'updated_at': str(problem.updated_at)
-            }
-            problems_data.append({
-                'id': str(problem.id),
-                'title': problem.title,
-                'description': problem.description or "",
-                'metadata': metadata
-            })
+        from vector_sync import sync_vector_db
+        result = sync_vector_db()
+        app.logger.info(f"向量数据库同步完成: 成功 {result['synced_count']} 个, 待重试 {len(result['failed_ids'])} 个, "
+                        f"清理 {result['removed_count']} 个")
         
-        if problems_data:
-            from vector_db import get_vector_db
-            vector_db = get_vector_db()
-            result = vector_db.batch_add_problems(problems_data)
-            app.logger.info(f"批量同步完成: 成功 {result['success_count']} 个, 失败 {len(result['failed_ids'])} 个")
-            
-            if result['failed_ids']:
-                app.logger.error(f"以下问题同步失败: {result['failed_ids']}")
+        if result['failed_ids']:
+            app.logger.error(f"以下问题同步失败，下次同步时重试: {result['failed_ids']}")
     except Exception as e:
         app.logger.error(f"同步现有问题到向量数据库时出错: {str(e)}")
 
@@ -758,6 +1004,67 @@ def search_similar_problems():
         return jsonify({'error': '搜索相似问题失败', 'details': str(e)}), 500
 
 
+@app.route('/api/search-similar-problems/batch', methods=['POST'])
+def search_similar_problems_batch():
+    """批量搜索相似问题 - 整批查询一次编码、一次向量检索"""
+    data = request.get_json() or {}
+    queries = data.get('queries') or []
+    k = data.get('k', 10)
+    filters = data.get('filters')
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': '查询列表不能为空'}), 400
+    if any(not isinstance(q, str) or not q.strip() for q in queries):
+        return jsonify({'error': '查询内容不能为空'}), 400
+    max_queries = app.config.get('VECTOR_DB_BATCH_QUERY_LIMIT', 100)
+    if len(queries) > max_queries:
+        return jsonify({'error': f'单次最多查询 {max_queries} 条'}), 400
+    if filters is not None and not isinstance(filters, dict):
+        return jsonify({'error': '过滤条件格式错误'}), 400
+
+    try:
+        k = int(k)
+    except (TypeError, ValueError):
+        return jsonify({'error': '参数k必须为整数'}), 400
+    if k < 1:
+        return jsonify({'error': '参数k必须大于0'}), 400
+
+    try:
+        batch_results = Problem.search_similar_problems_many(queries, n_results=k, filters=filters)
+
+        # 一次查询加载所有命中的问题，避免逐条查询数据库
+        problem_ids = {int(r['id']) for results in batch_results for r in results if str(r['id']).isdigit()}
+        problems = {p.id: p for p in Problem.query.filter(Problem.id.in_(problem_ids)).all()} if problem_ids else {}
+
+        response = []
+        for query, results in zip(queries, batch_results):
+            detailed_results = []
+            for result in results:
+                problem = problems.get(int(result['id'])) if str(result['id']).isdigit() else None
+                if problem:
+                    detailed_results.append({
+                        'id': problem.id,
+                        'title': problem.title,
+                        'description': problem.description,
+                        'equipment_type_name': problem.equipment_type.name if problem.equipment_type else None,
+                        'problem_category_name': problem.problem_category.name if problem.problem_category else None,
+                        'solution_category_name': problem.solution_category.name if problem.solution_category else None,
+                        'status': problem.status,
+                        'priority': problem.priority,
+                        'phase': problem.phase,
+                        'distance': result.get('distance'),
+                        'similarity_score': result.get('similarity_score')
+                    })
+            response.append({
+                'query': query,
+                'similar_problems': detailed_results,
+                'count': len(detailed_results)
+            })
+
+        return jsonify({'results': response, 'count': len(response)})
+    except Exception as e:
+        app.logger.error(f'批量搜索相似问题失败: {str(e)}')
+        return jsonify({'error': '批量搜索相似问题失败', 'details': str(e)}), 500
 
 
 
@@ -798,16 +1105,9 @@ def update_problem(problem_id):
         problem.solution_verification = data['solution_verification']
     
     problem.updated_at = datetime.utcnow()
+    # 提交时同时写入发件箱记录，由后台任务更新向量数据库
     db.session.commit()
     
-    # 更新向量数据库中的问题
-    try:
-        success = problem.update_vector_db()
-        if not success:
-            app.logger.error(f"无法更新向量数据库中的问题 {problem.id}")
-    except Exception as e:
-        app.logger.error(f"更新向量数据库失败: {str(e)}")
-    
     return jsonify({'id': problem.id, 'message': '问题更新成功'})
 
 
@@ -817,16 +1117,9 @@ def delete_problem(problem_id):
     problem = Problem.query.get_or_404(problem_id)
     
     db.session.delete(problem)
+    # 提交时同时写入发件箱记录，由后台任务从向量数据库删除
     db.session.commit()
     
-    # 从向量数据库中删除问题
-    try:
-        success = problem.delete_from_vector_db()
-        if not success:
-            app.logger.error(f"无法从向量数据库中删除问题 {problem.id}")
-    except Exception as e:
-        app.logger.error(f"从向量数据库删除问题失败: {str(e)}")
-    
     return jsonify({'message': '问题删除成功'})
 
 
@@ -836,4 +1129,12 @@ if __name__ == '__main__':
         # 初始化向量数据库
         initialize_vector_db()
     
+    # 启动向量数据库发件箱后台处理、定时增量同步和AI补充分析（间隔为0时不启动）
+    from vector_outbox import start_outbox_worker
+    from vector_sync import start_vector_sync_scheduler
+    from ai_backfill import start_backfill_worker
+    start_outbox_worker(app)
+    start_vector_sync_scheduler(app)
+    start_backfill_worker(app)
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+性能基准测试工具包
+
+- synthetic_data: 生成中英文混合的合成问题数据（可复现）
+- seed_database: 向SQLite/MySQL批量写入合成数据
+- load_test: 并发驱动真实HTTP接口，输出包含p50/p95/p99和吞吐量的JSON报告
+- import_benchmark: CSV导入分阶段耗时和峰值内存基准
+- sanitizer_benchmark: 输入清理新旧实现的耗时对比和输出一致性校验
+- parallel_validation_benchmark: CSV多进程验证随进程数的扩展性
+- compare: 比较两次报告（例如两个提交之间）的差异
+"""
@@ -0,0 +1,64 @@
+"""
+压测报告对比
+对比两份load_test.py报告中各场景的延迟百分位和吞吐量变化
+"""
+import json
+from typing import Dict, List, Optional
+
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'errors')
+
+
+def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    """变化百分比，基线为空或为0时返回None"""
+    if before in (None, 0) or after is None:
+        return None
+    return round((after - before) / before * 100, 1)
+
+
+def compare_reports(baseline: Dict, candidate: Dict) -> List[Dict]:
+    """
+    逐场景对比两份报告
+
+    Args:
+        baseline: 基线报告
+        candidate: 待比较报告
+
+    Returns:
+        List[Dict]: 每个场景、每个指标一行，包含基线值、新值和变化百分比
+    """
+    rows = []
+    base_scenarios = dict(baseline['results']['scenarios'], overall=baseline['results']['overall'])
+    new_scenarios = dict(candidate['results']['scenarios'], overall=candidate['results']['overall'])
+    for name in sorted(set(base_scenarios) & set(new_scenarios)):
+        for metric in COMPARED_METRICS:
+            before = base_scenarios[name].get(metric)
+            after = new_scenarios[name].get(metric)
+            rows.append({'scenario': name, 'metric': metric, 'baseline': before,
+                         'candidate': after, 'change_percent': _change(before, after)})
+    return rows
+
+
+def format_table(rows: List[Dict]) -> str:
+    """格式化为纯文本表格"""
+    lines = [f'{"scenario":<18}{"metric":<16}{"baseline":>12}{"candidate":>12}{"change":>10}']
+    for row in rows:
+        change = f'{row["change_percent"]:+.1f}%' if row['change_percent'] is not None else '-'
+        lines.append(f'{row["scenario"]:<18}{row["metric"]:<16}{str(row["baseline"]):>12}'
+                     f'{str(row["candidate"]):>12}{change:>10}')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对比两份压测报告')
+    parser.add_argument('baseline', help='基线报告路径')
+    parser.add_argument('candidate', help='待比较报告路径')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline_report = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate_report = json.load(f)
+    print(f'基线: {baseline_report.get("git_commit")}  对比: {candidate_report.get("git_commit")}')
+    print(format_table(compare_reports(baseline_report, candidate_report)))
@@ -0,0 +1,292 @@
+"""
+CSV导入基准测试
+生成不同行数、编码、分隔符和错误率的CSV文件，使用模拟AI和桩向量库调用import_csv_file()，
+按阶段统计耗时和峰值内存，作为导入优化前后对比的基线
+
+阶段说明（与导入结果中的stageStats一致）：
+    decode       编码识别和分隔符检测
+    validate     _clean_and_validate_data 清理和验证
+    dedupe       重复检测（仅duplicate_mode不为off时）
+    build        构建问题对象，包含下面的lookup和ai
+    lookup       设备类型、问题分类、解决方案分类解析
+    ai           AI分析和分类提取
+    write        SQL flush/commit
+    vector_sync  导入后发件箱同步到向量库（由本脚本计时）
+"""
+import csv
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+from flask import Flask
+
+import csv_import
+import vector_outbox
+from config import Config
+from models import db
+from benchmarks.synthetic_data import CSV_FIELDS, generate_problems
+from benchmarks.load_test import build_report
+
+# 错误行的几种形态，按行号轮流使用
+_ERROR_KINDS = ('invalid_phase', 'invalid_date', 'script_tag', 'empty', 'special_chars')
+
+
+def _inject_error(row: Dict, kind: str) -> Dict:
+    """把一行数据改造成指定类型的问题行"""
+    if kind == 'invalid_phase':
+        row['phase'] = 'unknown-phase'
+        row['priority'] = 'urgent'
+    elif kind == 'invalid_date':
+        row['discovered_at'] = '31/31/2020'
+    elif kind == 'script_tag':
+        row['title'] = f'<script>alert(1)</script>{row["title"]}'
+        row['description'] = f'{row["description"]} <iframe src="javascript:evil()"></iframe> onload=eval(x)'
+    elif kind == 'empty':
+        row['title'] = ''
+        row['description'] = ''
+    elif kind == 'special_chars':
+        row['title'] = '!!@@##$$%%^^&&**' * 4
+    return row
+
+
+def write_import_csv(path: str, rows: int, encoding: str = 'utf-8', delimiter: str = ',',
+                     error_rate: float = 0.0, seed: int = 42) -> str:
+    """
+    生成导入基准用的CSV文件
+
+    Args:
+        path: 输出路径
+        rows: 行数
+        encoding: 文件编码（utf-8/utf-8-sig/gbk等）
+        delimiter: 分隔符
+        error_rate: 问题行比例（0-1），问题行轮流包含无效枚举、无效日期、脚本标签、空内容和大量特殊字符
+        seed: 随机种子
+
+    Returns:
+        str: 输出路径
+    """
+    error_every = int(round(1 / error_rate)) if error_rate > 0 else 0
+    with open(path, 'w', encoding=encoding, errors='replace', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, delimiter=delimiter, extrasaction='ignore')
+        writer.writeheader()
+        for index, problem in enumerate(generate_problems(rows, seed)):
+            row = dict(problem, discovered_at=problem['discovered_at'].isoformat())
+            if error_every and index % error_every == 0:
+                row = _inject_error(row, _ERROR_KINDS[(index // error_every) % len(_ERROR_KINDS)])
+            writer.writerow(row)
+    return path
+
+
+class _StubVectorStore:
+    """桩向量库：不计算嵌入，只记录调用次数"""
+
+    def __init__(self):
+        self.upserted = 0
+        self.deleted = 0
+
+    def search_many(self, queries, k=1, min_similarity=0.0, **kwargs):
+        return [[] for _ in queries]
+
+    def upsert_problems(self, documents):
+        self.upserted += len(documents)
+        return {'success_count': len(documents), 'failed_ids': [], 'errors': []}
+
+    def delete_problems(self, ids):
+        self.deleted += len(ids)
+
+
+class _StageMemoryTracker:
+    """
+    按阶段记录tracemalloc峰值：进入和离开每个阶段时把当前峰值计入所有未结束的阶段并重置峰值，
+    因此嵌套阶段（如build内的lookup和ai）也能各自得到正确的峰值
+    """
+
+    def __init__(self):
+        self.peaks: Dict[str, int] = {}
+        self._open_stages: List[str] = []
+        self.baseline = 0
+
+    def _checkpoint(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage in self._open_stages:
+            self.peaks[stage] = max(self.peaks.get(stage, 0), peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def stage(self, stage: str):
+        self._checkpoint()
+        self._open_stages.append(stage)
+        try:
+            yield
+        finally:
+            self._checkpoint()
+            self._open_stages.pop()
+
+    def wrap(self, import_stage):
+        """包装csv_import._import_stage，在原有计时之外记录内存"""
+        tracker = self
+
+        @contextmanager
+        def _tracked_stage(state, stage, rows):
+            with tracker.stage(stage), import_stage(state, stage, rows):
+                yield
+        return _tracked_stage
+
+    def report(self) -> Dict[str, float]:
+        """各阶段峰值相对导入开始时的增量（KB）"""
+        return {stage: round(max(0, peak - self.baseline) / 1024, 1) for stage, peak in self.peaks.items()}
+
+
+def _create_benchmark_app(database_url: str) -> Flask:
+    """使用独立数据库创建应用，避免修改正在使用的数据库"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+    return app
+
+
+def run_import_case(rows: int, encoding: str = 'utf-8', delimiter: str = ',', error_rate: float = 0.0,
+                    track_memory: bool = False, duplicate_mode: str = 'off', database_url: Optional[str] = None,
+                    seed: int = 42, engine: str = 'python') -> Dict:
+    """
+    运行一次导入基准
+
+    Args:
+        rows: CSV行数
+        encoding: 文件编码
+        delimiter: 分隔符
+        error_rate: 问题行比例
+        track_memory: 是否统计各阶段峰值内存（tracemalloc会明显拖慢导入，耗时请以不统计内存的运行为准）
+        duplicate_mode: 重复处理模式
+        database_url: 数据库URL，默认使用临时SQLite文件
+        seed: 随机种子
+        engine: 导入清理验证引擎（python/pandas）
+
+    Returns:
+        Dict: 本次运行的参数、导入结果统计、各阶段耗时和（可选的）峰值内存
+    """
+    # import_csv_file只接受相对路径，临时目录建在当前目录下
+    work_dir = tempfile.mkdtemp(prefix='import-bench-', dir='.')
+    csv_path = os.path.relpath(os.path.join(work_dir, 'bench.csv'))
+    database_url = database_url or 'sqlite:///' + os.path.abspath(os.path.join(work_dir, 'bench.db'))
+    write_import_csv(csv_path, rows, encoding, delimiter, error_rate, seed)
+
+    app = _create_benchmark_app(database_url)
+    vector_store = _StubVectorStore()
+    tracker = _StageMemoryTracker()
+    stage_patch = (patch.object(csv_import, '_import_stage', tracker.wrap(csv_import._import_stage))
+                   if track_memory else nullcontext())
+    try:
+        with app.app_context(), stage_patch, \
+                patch.object(Config, 'AI_PROVIDER', 'mock'), \
+                patch.object(Config, 'CSV_MAX_ROWS', max(rows, Config.CSV_MAX_ROWS)), \
+                patch.object(csv_import, 'get_vector_db', return_value=vector_store), \
+                patch.object(vector_outbox, 'get_vector_db', return_value=vector_store), \
+                patch.object(vector_outbox, 'is_vector_db_available', return_value=True):
+            db.drop_all()
+            db.create_all()
+            if track_memory:
+                tracemalloc.start()
+                tracker.baseline = tracemalloc.get_traced_memory()[0]
+
+            start_time = time.perf_counter()
+            result = csv_import.import_csv_file(csv_path, duplicate_mode=duplicate_mode, engine=engine)
+            import_seconds = time.perf_counter() - start_time
+
+            sync_start = time.perf_counter()
+            with tracker.stage('vector_sync') if track_memory else nullcontext():
+                sync_stats = vector_outbox.drain_outbox()
+            sync_seconds = time.perf_counter() - sync_start
+
+            if track_memory:
+                overall_peak = max([tracemalloc.get_traced_memory()[1]] + list(tracker.peaks.values()))
+                tracemalloc.stop()
+            db.session.remove()
+            db.drop_all()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    stages = dict(result.get('stageStats', {}))
+    stages['vector_sync'] = {'rows': sync_stats['processed_count'], 'seconds': round(sync_seconds, 4)}
+    case = {
+        'rows': rows,
+        'engine': engine,
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'error_rate': error_rate,
+        'duplicate_mode': duplicate_mode,
+        'imported': result['importedCount'],
+        'failed': result['failedCount'],
+        'duplicates': result.get('duplicateCount', 0),
+        'vectors_upserted': vector_store.upserted,
+        'import_seconds': round(import_seconds, 3),
+        'rows_per_second': round(rows / import_seconds, 1) if import_seconds > 0 else None,
+        'stages': stages
+    }
+    if track_memory:
+        case['peak_memory_kb'] = dict(tracker.report(), overall=round((overall_peak - tracker.baseline) / 1024, 1))
+    return case
+
+
+def run_matrix(row_counts: List[int], encodings: List[str], delimiters: List[str], error_rates: List[float],
+               track_memory: bool = False, duplicate_mode: str = 'off', database_url: Optional[str] = None,
+               engines: Optional[List[str]] = None) -> List[Dict]:
+    """按参数组合依次运行导入基准（开启内存统计时每个组合额外运行一次，耗时取未统计内存的运行）"""
+    cases = []
+    for rows, engine in itertools.product(row_counts, engines or ['python']):
+        for encoding in encodings:
+            for delimiter in delimiters:
+                for error_rate in error_rates:
+                    case = run_import_case(rows, encoding, delimiter, error_rate, False, duplicate_mode, database_url,
+                                           engine=engine)
+                    if track_memory:
+                        memory_case = run_import_case(rows, encoding, delimiter, error_rate, True,
+                                                      duplicate_mode, database_url, engine=engine)
+                        case['peak_memory_kb'] = memory_case['peak_memory_kb']
+                    print(f"rows={rows} engine={engine} encoding={encoding} delimiter={delimiter!r} error_rate={error_rate}: "
+                          f"{case['import_seconds']}s, {case['rows_per_second']} 行/秒")
+                    cases.append(case)
+    return cases
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='CSV导入分阶段基准测试')
+    parser.add_argument('--rows', default='1000,10000', help='行数列表，逗号分隔')
+    parser.add_argument('--encodings', default='utf-8,utf-8-sig,gbk', help='编码列表，逗号分隔')
+    parser.add_argument('--delimiters', default=',;', help='分隔符，每个字符一种（\\t表示制表符）')
+    parser.add_argument('--error-rates', default='0,0.05', help='问题行比例列表，逗号分隔')
+    parser.add_argument('--engines', default='python', help='导入引擎列表，逗号分隔（python/pandas）')
+    parser.add_argument('--duplicate-mode', default='off', help='重复处理模式（off/skip/merge/flag）')
+    parser.add_argument('--memory', action='store_true', help='额外统计各阶段峰值内存')
+    parser.add_argument('--database-url', default=None, help='数据库URL（默认每次使用临时SQLite文件；注意会清空表）')
+    parser.add_argument('--output', default=None, help='JSON报告输出路径（默认打印到标准输出）')
+    args = parser.parse_args()
+
+    config = {
+        'rows': [int(value) for value in args.rows.split(',')],
+        'encodings': args.encodings.split(','),
+        'delimiters': list(args.delimiters.replace('\\t', '\t')),
+        'error_rates': [float(value) for value in args.error_rates.split(',')],
+        'engines': args.engines.split(','),
+        'duplicate_mode': args.duplicate_mode,
+        'memory': args.memory
+    }
+    cases = run_matrix(config['rows'], config['encodings'], config['delimiters'], config['error_rates'],
+                       args.memory, args.duplicate_mode, args.database_url, config['engines'])
+    report = json.dumps(build_report({'cases': cases}, config), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f'报告已写入: {args.output}')
+    else:
+        print(report)
@@ -0,0 +1,245 @@
+"""
+HTTP接口压测
+按权重混合多个场景并发请求真实的Flask接口，统计各场景p50/p95/p99延迟、吞吐量和错误数，
+输出带git提交号的JSON报告，便于用compare.py在不同提交之间对比
+"""
+import csv
+import io
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic_data import CSV_FIELDS, generate_problems, generate_queries
+
+PERCENTILES = (50, 95, 99)
+
+
+def _list_problems(rng: random.Random, context: Dict) -> Dict:
+    return {'method': 'GET', 'path': '/api/problems',
+            'params': {'page': rng.randint(1, context['max_page']), 'limit': context['page_size']}}
+
+
+def _dashboard_stats(rng: random.Random, context: Dict) -> Dict:
+    return {'method': 'GET', 'path': '/api/dashboard-stats'}
+
+
+def _search_similar(rng: random.Random, context: Dict) -> Dict:
+    return {'method': 'POST', 'path': '/api/search-similar-problems', 'json': {'query': rng.choice(context['queries'])}}
+
+
+def _create_problem(rng: random.Random, context: Dict) -> Dict:
+    problem = next(generate_problems(1, rng.randrange(2 ** 31)))
+    return {'method': 'POST', 'path': '/api/problems',
+            'json': {'title': problem['title'], 'description': problem['description'], 'phase': problem['phase'],
+                     'priority': problem['priority'], 'discovered_by': problem['discovered_by']}}
+
+
+def _import_csv(rng: random.Random, context: Dict) -> Dict:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for problem in generate_problems(context['csv_rows'], rng.randrange(2 ** 31)):
+        writer.writerow(dict(problem, discovered_at=problem['discovered_at'].isoformat()))
+    return {'method': 'POST', 'path': '/api/import-csv',
+            'files': {'csvFile': ('benchmark.csv', buffer.getvalue().encode('utf-8'), 'text/csv')}}
+
+
+# 场景名称 -> 请求构造函数（在计时开始前调用）
+SCENARIOS: Dict[str, Callable[[random.Random, Dict], Dict]] = {
+    'list_problems': _list_problems,
+    'dashboard_stats': _dashboard_stats,
+    'search_similar': _search_similar,
+    'create_problem': _create_problem,
+    'import_csv': _import_csv
+}
+
+# 默认混合比例：以读为主
+DEFAULT_MIX = {'list_problems': 50, 'dashboard_stats': 20, 'search_similar': 25, 'create_problem': 5}
+
+
+class HttpSender:
+    """基于requests的请求发送器，每个线程复用一个Session（保持长连接）"""
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        import requests
+
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self, spec: Dict) -> int:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.request(spec['method'], self.base_url + spec['path'], params=spec.get('params'),
+                                   json=spec.get('json'), files=spec.get('files'), timeout=self.timeout)
+        return response.status_code
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """解析场景权重参数，例如 list_problems=50,search_similar=25"""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f'未知场景: {name}，可选: {", ".join(SCENARIOS)}')
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """最近秩法计算百分位数，输入需已排序"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))  # 向上取整
+    return sorted_values[int(rank) - 1]
+
+
+def run_load(send: Callable[[Dict], int], mix: Dict[str, int], concurrency: int = 8,
+             duration: Optional[float] = 30, total_requests: Optional[int] = None,
+             seed: int = 1, context: Optional[Dict] = None) -> Dict:
+    """
+    并发执行压测
+
+    Args:
+        send: 发送请求并返回HTTP状态码的函数
+        mix: 场景权重
+        concurrency: 并发线程数
+        duration: 持续时间（秒），与total_requests同时给出时先达到者为准
+        total_requests: 总请求数
+        seed: 随机种子（每个线程使用seed+线程序号）
+        context: 场景参数（分页范围、查询文本、CSV行数等）
+
+    Returns:
+        Dict: 按场景汇总的统计结果
+    """
+    if duration is None and total_requests is None:
+        raise ValueError('duration和total_requests至少需要指定一个')
+    context = dict({'max_page': 100, 'page_size': 20, 'csv_rows': 1000}, **(context or {}))
+    context.setdefault('queries', generate_queries(200))
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    lock = threading.Lock()
+    issued = [0]
+    start_time = time.perf_counter()
+    deadline = start_time + duration if duration is not None else None
+
+    def _take_ticket() -> bool:
+        with lock:
+            if total_requests is not None and issued[0] >= total_requests:
+                return False
+            issued[0] += 1
+            return True
+
+    def _worker(index: int):
+        rng = random.Random(seed + index)
+        while (deadline is None or time.perf_counter() < deadline) and _take_ticket():
+            name = rng.choices(names, weights)[0]
+            spec = SCENARIOS[name](rng, context)
+            request_start = time.perf_counter()
+            try:
+                ok = send(spec) < 400
+            except Exception:
+                ok = False
+            latency = time.perf_counter() - request_start
+            with lock:
+                samples[name].append(latency)
+                if not ok:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=_worker, args=(i,), name=f'load-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, errors, time.perf_counter() - start_time)
+
+
+def _latency_stats(latencies: List[float], elapsed: float) -> Dict:
+    latencies = sorted(latencies)
+    stats = {'count': len(latencies), 'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else None}
+    for p in PERCENTILES:
+        value = percentile(latencies, p)
+        stats[f'p{p}_ms'] = round(value * 1000, 2) if value is not None else None
+    stats['mean_ms'] = round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None
+    return stats
+
+
+def summarize(samples: Dict[str, List[float]], errors: Dict[str, int], elapsed: float) -> Dict:
+    """汇总各场景及整体的延迟百分位、吞吐量和错误数"""
+    scenarios = {}
+    for name, latencies in samples.items():
+        scenarios[name] = dict(_latency_stats(latencies, elapsed), errors=errors.get(name, 0))
+    all_latencies = [latency for latencies in samples.values() for latency in latencies]
+    overall = dict(_latency_stats(all_latencies, elapsed), errors=sum(errors.values()))
+    return {'elapsed_seconds': round(elapsed, 2), 'overall': overall, 'scenarios': scenarios}
+
+
+def git_commit() -> Optional[str]:
+    """当前代码的git提交号，不在git仓库中时返回None"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: Dict, config: Dict) -> Dict:
+    """生成可跨提交对比的压测报告"""
+    return {
+        'git_commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='并发压测问题管理接口')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000', help='被测服务地址')
+    parser.add_argument('--concurrency', type=int, default=8, help='并发线程数')
+    parser.add_argument('--duration', type=float, default=30, help='持续时间（秒），0表示只按请求数')
+    parser.add_argument('--requests', type=int, default=None, help='总请求数')
+    parser.add_argument('--mix', default=None,
+                        help='场景权重，例如 list_problems=50,search_similar=25,import_csv=1'
+                             f'（默认 {",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items())}）')
+    parser.add_argument('--max-page', type=int, default=100, help='列表场景随机翻页的最大页码')
+    parser.add_argument('--page-size', type=int, default=20, help='列表场景每页条数')
+    parser.add_argument('--csv-rows', type=int, default=1000, help='导入场景每个CSV的行数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--output', default=None, help='JSON报告输出路径（默认打印到标准输出）')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    config = {
+        'base_url': args.base_url,
+        'concurrency': args.concurrency,
+        'duration': args.duration or None,
+        'requests': args.requests,
+        'mix': mix,
+        'max_page': args.max_page,
+        'page_size': args.page_size,
+        'csv_rows': args.csv_rows,
+        'seed': args.seed
+    }
+    results = run_load(HttpSender(args.base_url), mix, args.concurrency, config['duration'], args.requests,
+                       args.seed, {'max_page': args.max_page, 'page_size': args.page_size, 'csv_rows': args.csv_rows})
+    report = json.dumps(build_report(results, config), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f'报告已写入: {args.output}')
+    else:
+        print(report)
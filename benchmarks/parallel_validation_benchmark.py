@@ -0,0 +1,91 @@
+"""
+多进程验证扩展性基准
+在合成CSV数据上对比逐行_clean_and_validate_data与不同进程数的进程池验证耗时（不含数据库写入），
+并校验各进程数下的结果与逐行处理完全一致
+"""
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+from csv_import import _clean_and_validate_data, _DateParser, _infer_date_format
+from csv_import_parallel import validate_rows_in_pool
+from benchmarks.import_benchmark import write_import_csv
+from benchmarks.load_test import build_report
+
+
+def _load_rows(rows: int, error_rate: float, seed: int) -> List[Dict]:
+    """生成合成CSV并用csv.DictReader读回（与导入时的原始行一致）"""
+    temp_dir = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(temp_dir, 'parallel.csv')
+        write_import_csv(csv_path, rows, error_rate=error_rate, seed=seed)
+        with open(csv_path, encoding='utf-8', newline='') as f:
+            return list(csv.DictReader(f))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def run_benchmark(rows: int = 100_000, worker_counts: List[int] = None, chunk_size: int = 1000,
+                  error_rate: float = 0.05, seed: int = 42) -> Dict:
+    """
+    运行逐行验证与各进程数的进程池验证
+
+    Returns:
+        Dict: 逐行耗时，以及每个进程数的耗时、相对逐行的加速比和结果是否一致
+    """
+    worker_counts = worker_counts or sorted({1, 2, 4, os.cpu_count() or 1})
+    data = _load_rows(rows, error_rate, seed)
+    date_format = _infer_date_format(row.get('discovered_at') for row in data[:200])
+
+    date_parser = _DateParser(date_format)
+    start_time = time.perf_counter()
+    expected = [(row_num, row) + _clean_and_validate_data(row, row_num, date_parser)
+                for row_num, row in enumerate(data, 1)]
+    serial_seconds = time.perf_counter() - start_time
+
+    cases = []
+    for workers in worker_counts:
+        start_time = time.perf_counter()
+        actual = []
+        for validated_rows, _ in validate_rows_in_pool(iter(data), date_format, workers, chunk_size):
+            actual.extend(validated_rows)
+        seconds = time.perf_counter() - start_time
+        cases.append({
+            'workers': workers,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(rows / seconds, 1) if seconds > 0 else None,
+            'speedup': round(serial_seconds / seconds, 2) if seconds > 0 else None,
+            'identical': actual == expected
+        })
+        print(f"workers={workers}: {cases[-1]['seconds']}s, 加速比 {cases[-1]['speedup']}")
+
+    return {
+        'rows': rows,
+        'cpu_count': os.cpu_count(),
+        'chunk_size': chunk_size,
+        'serial_seconds': round(serial_seconds, 4),
+        'cases': cases
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    import logging
+
+    parser = argparse.ArgumentParser(description='CSV多进程验证扩展性基准')
+    parser.add_argument('--rows', type=int, default=100_000, help='行数')
+    parser.add_argument('--workers', default=None, help='进程数列表，逗号分隔（默认1,2,4和CPU核数）')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='每块分发的行数')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='问题行比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    # 问题行的日期警告会刷屏，基准运行时只保留错误日志
+    logging.disable(logging.WARNING)
+    worker_counts = [int(value) for value in args.workers.split(',')] if args.workers else None
+    results = run_benchmark(args.rows, worker_counts, args.chunk_size, args.error_rate, args.seed)
+    print(json.dumps(build_report(results, vars(args)), ensure_ascii=False, indent=2))
@@ -0,0 +1,103 @@
+"""
+输入清理基准测试
+在合成CSV字段上对比原逐条re.sub实现与sanitizer模块的耗时，并校验两者输出完全一致
+"""
+import json
+import re
+import time
+from typing import Dict, List
+
+from sanitizer import sanitize_input, count_special_chars
+from benchmarks.synthetic_data import generate_problems
+from benchmarks.import_benchmark import _ERROR_KINDS, _inject_error
+from benchmarks.load_test import build_report
+
+
+def legacy_sanitize_input(input_str: str) -> str:
+    """原csv_import._sanitize_input实现（每次调用执行9次re.sub），作为对比基准和等价性参照"""
+    if input_str is None:
+        return ''
+    if not input_str:
+        return ''
+    input_str = str(input_str)
+    sanitized = re.sub(r'<script[^>]*>.*?</script>', '', input_str, flags=re.IGNORECASE | re.DOTALL)
+    sanitized = re.sub(r'javascript:', '', sanitized, flags=re.IGNORECASE)
+    sanitized = re.sub(r'vbscript:', '', sanitized, flags=re.IGNORECASE)
+    sanitized = re.sub(r'on\w+\s*=', '', sanitized, flags=re.IGNORECASE)
+    sanitized = re.sub(r'<iframe[^>]*>.*?</iframe>', '', sanitized, flags=re.IGNORECASE | re.DOTALL)
+    sanitized = re.sub(r'<object[^>]*>.*?</object>', '', sanitized, flags=re.IGNORECASE | re.DOTALL)
+    sanitized = re.sub(r'<embed[^>]*>.*?</embed>', '', sanitized, flags=re.IGNORECASE | re.DOTALL)
+    sanitized = re.sub(r'eval\s*\(', '', sanitized, flags=re.IGNORECASE)
+    sanitized = re.sub(r'document\.cookie', '', sanitized, flags=re.IGNORECASE)
+    return sanitized.strip()
+
+
+def legacy_count_special_chars(text: str) -> int:
+    """原_clean_and_validate_data中的特殊字符统计"""
+    return len(re.sub(r'[\w\u4e00-\u9fff]', '', text))
+
+
+def build_fields(rows: int, error_rate: float = 0.05, seed: int = 42) -> List[str]:
+    """生成与CSV导入相同的字段值列表（每行6个字段，包含一定比例的问题行）"""
+    error_every = int(round(1 / error_rate)) if error_rate > 0 else 0
+    fields = []
+    for index, problem in enumerate(generate_problems(rows, seed)):
+        row = dict(problem, discovered_at=problem['discovered_at'].isoformat())
+        if error_every and index % error_every == 0:
+            row = _inject_error(row, _ERROR_KINDS[(index // error_every) % len(_ERROR_KINDS)])
+        fields.extend([row['title'], row['description'], row['equipment_type'], row['phase'],
+                       row['discovered_by'], row['priority']])
+    return fields
+
+
+def _time_function(function, fields: List[str]):
+    start_time = time.perf_counter()
+    results = [function(field) for field in fields]
+    return time.perf_counter() - start_time, results
+
+
+def run_benchmark(rows: int = 100_000, error_rate: float = 0.05, seed: int = 42) -> Dict:
+    """
+    运行清理和特殊字符统计的对比基准
+
+    Returns:
+        Dict: 两种实现的耗时、加速比和输出是否一致
+    """
+    fields = build_fields(rows, error_rate, seed)
+    legacy_seconds, legacy_results = _time_function(legacy_sanitize_input, fields)
+    new_seconds, new_results = _time_function(sanitize_input, fields)
+    legacy_count_seconds, legacy_counts = _time_function(legacy_count_special_chars, fields)
+    new_count_seconds, new_counts = _time_function(count_special_chars, fields)
+
+    mismatches = [field for field, old, new in zip(fields, legacy_results, new_results) if old != new]
+    return {
+        'rows': rows,
+        'fields': len(fields),
+        'error_rate': error_rate,
+        'sanitize': {
+            'legacy_seconds': round(legacy_seconds, 4),
+            'new_seconds': round(new_seconds, 4),
+            'speedup': round(legacy_seconds / new_seconds, 2) if new_seconds > 0 else None,
+            'identical': not mismatches,
+            'mismatch_samples': mismatches[:5]
+        },
+        'special_chars': {
+            'legacy_seconds': round(legacy_count_seconds, 4),
+            'new_seconds': round(new_count_seconds, 4),
+            'speedup': round(legacy_count_seconds / new_count_seconds, 2) if new_count_seconds > 0 else None,
+            'identical': legacy_counts == new_counts
+        }
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='输入清理新旧实现对比基准')
+    parser.add_argument('--rows', type=int, default=100_000, help='行数（每行6个字段）')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='问题行比例')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.error_rate, args.seed)
+    print(json.dumps(build_report(results, vars(args)), ensure_ascii=False, indent=2))
@@ -0,0 +1,129 @@
+"""
+合成问题数据生成
+使用固定随机种子生成可复现的中英文问题记录，用于数据库填充、CSV导入和接口压测
+"""
+import csv
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+# 预置规模
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+EQUIPMENT_TYPES = ['服务器', '网络设备', '存储设备', '终端设备', '工业设备',
+                   'Hydraulic Pump', 'CNC Machine', 'Conveyor', 'Air Compressor', 'PLC Controller']
+PHASES = ['design', 'development', 'usage', 'maintenance']
+PHASE_WEIGHTS = [0.15, 0.15, 0.45, 0.25]
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+PRIORITY_WEIGHTS = [0.25, 0.45, 0.22, 0.08]
+STATUSES = ['new', 'analyzed', 'solved', 'verified']
+ENGINEERS = ['张伟', '王芳', '李强', '刘洋', '陈静', 'John Smith', 'Maria Garcia', 'Wei Chen', 'Anna Müller']
+
+_ZH_COMPONENTS = ['电源模块', '散热风扇', '主板', '密封圈', '轴承', '液压阀', '传感器', '控制板', '电机', '齿轮箱', '接口板', '硬盘']
+_ZH_SYMPTOMS = ['过热', '异响', '频繁重启', '漏油', '振动过大', '无法启动', '读数漂移', '通信中断', '磨损严重', '电压不稳']
+_ZH_CONTEXTS = ['在高负载运行时', '在夜间低温环境下', '在连续运行72小时后', '在例行维护后', '在新批次设备上',
+                '在湿度较高的车间', '在固件升级后', '在满载启动时']
+_ZH_CAUSES = ['初步判断为材料选择不当', '怀疑是装配工艺问题', '可能与散热设计余量不足有关', '现场检查发现润滑不足',
+              '与供应商批次质量波动相关', '操作人员未按规程执行', '环境粉尘导致', '设计图纸公差标注有误']
+
+_EN_COMPONENTS = ['power supply', 'cooling fan', 'mainboard', 'seal ring', 'bearing', 'hydraulic valve', 'sensor',
+                  'control board', 'motor', 'gearbox', 'spindle', 'relay']
+_EN_SYMPTOMS = ['overheating', 'abnormal noise', 'intermittent reboot', 'oil leakage', 'excessive vibration',
+                'fails to start', 'reading drift', 'communication loss', 'severe wear', 'voltage fluctuation']
+_EN_CONTEXTS = ['under peak load', 'during cold start', 'after 72 hours of continuous operation', 'after scheduled maintenance',
+                'on units from the latest batch', 'in a high-humidity workshop', 'after a firmware update']
+_EN_CAUSES = ['likely caused by an undersized heat sink', 'suspected assembly torque issue', 'lubrication interval too long',
+              'supplier batch quality variation', 'operator skipped the warm-up procedure', 'dust ingress through the vent',
+              'tolerance stack-up in the original design']
+
+CSV_FIELDS = ['title', 'description', 'equipment_type', 'phase', 'priority', 'discovered_by', 'discovered_at']
+
+
+def _generate_text(rng: random.Random) -> Dict[str, str]:
+    """生成一条问题的标题和描述（约70%中文，30%英文）"""
+    if rng.random() < 0.7:
+        component, symptom = rng.choice(_ZH_COMPONENTS), rng.choice(_ZH_SYMPTOMS)
+        title = f'{component}{symptom}'
+        sentences = [f'{rng.choice(_ZH_CONTEXTS)}，{component}出现{symptom}现象。']
+        for _ in range(rng.randint(1, 4)):
+            sentences.append(f'{rng.choice(_ZH_CAUSES)}，{rng.choice(_ZH_CONTEXTS)}复现概率约{rng.randint(5, 95)}%。')
+        description = ''.join(sentences)
+    else:
+        component, symptom = rng.choice(_EN_COMPONENTS), rng.choice(_EN_SYMPTOMS)
+        title = f'{component.capitalize()} {symptom}'
+        sentences = [f'The {component} shows {symptom} {rng.choice(_EN_CONTEXTS)}.']
+        for _ in range(rng.randint(1, 4)):
+            sentences.append(f'{rng.choice(_EN_CAUSES).capitalize()}; reproduced in {rng.randint(5, 95)}% of runs '
+                             f'{rng.choice(_EN_CONTEXTS)}.')
+        description = ' '.join(sentences)
+    return {'title': title, 'description': description}
+
+
+def generate_problems(count: int, seed: int = 42) -> Iterator[Dict]:
+    """
+    逐条生成合成问题（生成器，内存占用与数量无关）
+
+    Args:
+        count: 生成数量
+        seed: 随机种子，相同种子生成完全相同的数据
+
+    Yields:
+        Dict: 问题字段（title, description, equipment_type, phase, priority, status, discovered_by, discovered_at）
+    """
+    rng = random.Random(seed)
+    start_date = date(2020, 1, 1)
+    for _ in range(count):
+        problem = _generate_text(rng)
+        problem.update({
+            'equipment_type': rng.choice(EQUIPMENT_TYPES),
+            'phase': rng.choices(PHASES, PHASE_WEIGHTS)[0],
+            'priority': rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+            'status': rng.choice(STATUSES),
+            'discovered_by': rng.choice(ENGINEERS),
+            'discovered_at': start_date + timedelta(days=rng.randint(0, 2000))
+        })
+        yield problem
+
+
+def generate_queries(count: int, seed: int = 7) -> List[str]:
+    """生成相似问题搜索用的查询文本"""
+    return [problem['title'] for problem in generate_problems(count, seed)]
+
+
+def write_csv(path: str, count: int, seed: int = 42) -> str:
+    """
+    生成可直接用于/api/import-csv的CSV文件
+
+    Args:
+        path: 输出路径
+        count: 行数
+        seed: 随机种子
+
+    Returns:
+        str: 输出路径
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for problem in generate_problems(count, seed):
+            writer.writerow(dict(problem, discovered_at=problem['discovered_at'].isoformat()))
+    return path
+
+
+def parse_scale(value: str) -> int:
+    """解析规模参数，支持10k/100k/1m或具体数字"""
+    value = str(value).lower()
+    if value in SCALES:
+        return SCALES[value]
+    return int(value)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成合成问题CSV文件')
+    parser.add_argument('output', help='输出CSV路径')
+    parser.add_argument('--count', default='10k', help='行数（10k/100k/1m或具体数字）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+    print(write_csv(args.output, parse_scale(args.count), args.seed))
@@ -0,0 +1,156 @@
+"""
+列式数据源模块（Parquet / Arrow IPC）
+系统间传输时使用带类型的列式文件代替CSV：导入时按记录批读取，不需要检测编码和分隔符，
+日期等列直接以对应类型进入清理验证；导出时按批写出问题数据，列名与CSV导入的字段一致，导出的文件可直接重新导入
+
+需要安装pyarrow，未安装时PYARROW_AVAILABLE为False，读写函数抛出RuntimeError
+"""
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import Config
+from models import db, Problem, EquipmentType, ProblemCategory, SolutionCategory
+
+# 尝试导入依赖，如果失败则不支持列式文件
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 扩展名 -> 列式格式（.feather即Arrow IPC文件格式）
+COLUMNAR_EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow', 'feather': 'arrow'}
+
+# 导出列：(列名, pyarrow类型名)，前几列与CSV导入的字段名一致
+EXPORT_COLUMNS = [
+    ('title', 'string'),
+    ('description', 'string'),
+    ('equipment_type', 'string'),
+    ('phase', 'string'),
+    ('priority', 'string'),
+    ('discovered_by', 'string'),
+    ('discovered_at', 'date32'),
+    ('id', 'int64'),
+    ('status', 'string'),
+    ('problem_category', 'string'),
+    ('solution_category', 'string'),
+    ('ai_analysis', 'string'),
+    ('created_at', 'timestamp'),
+]
+
+
+def columnar_format(file_path: str) -> Optional[str]:
+    """返回文件对应的列式格式（parquet或arrow），不是列式文件时返回None"""
+    extension = file_path.rsplit('.', 1)[-1].lower() if '.' in file_path else ''
+    return COLUMNAR_EXTENSIONS.get(extension)
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("读写Parquet/Arrow文件需要安装pyarrow")
+
+
+def _open_arrow_reader(file_path: str):
+    """打开Arrow IPC文件，先按文件格式（Feather V2）打开，失败时按流格式打开"""
+    try:
+        return pa.ipc.open_file(pa.memory_map(file_path))
+    except pa.ArrowInvalid:
+        return pa.ipc.open_stream(pa.memory_map(file_path))
+
+
+def iter_record_batches(file_path: str, batch_size: int = None) -> Iterator['pa.RecordBatch']:
+    """
+    按记录批读取列式文件
+
+    Args:
+        file_path: Parquet或Arrow IPC文件路径
+        batch_size: Parquet每批读取的行数（Arrow文件按写入时的批读取），默认使用配置值
+    """
+    _require_pyarrow()
+    batch_size = batch_size or getattr(Config, 'CSV_COLUMNAR_BATCH_SIZE', 5000)
+    if columnar_format(file_path) == 'parquet':
+        yield from pq.ParquetFile(file_path).iter_batches(batch_size=batch_size)
+        return
+    reader = _open_arrow_reader(file_path)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index)
+    else:
+        yield from reader
+
+
+def iter_rows(file_path: str, batch_size: int = None) -> Iterator[Dict[str, Any]]:
+    """
+    逐行返回列名到Python值的字典，对应csv.DictReader的一行
+    值保持列的类型（字符串、数字、date/datetime），空值为None
+    """
+    for batch in iter_record_batches(file_path, batch_size):
+        yield from batch.to_pylist()
+
+
+def read_column_names(file_path: str) -> List[str]:
+    """读取列式文件的列名（只读取元数据）"""
+    _require_pyarrow()
+    if columnar_format(file_path) == 'parquet':
+        return pq.read_schema(file_path).names
+    return _open_arrow_reader(file_path).schema.names
+
+
+def _export_schema() -> 'pa.Schema':
+    types = {'string': pa.string(), 'int64': pa.int64(), 'date32': pa.date32(), 'timestamp': pa.timestamp('us')}
+    return pa.schema([(name, types[type_name]) for name, type_name in EXPORT_COLUMNS])
+
+
+def export_problems(file_path: str, fmt: str = 'parquet', batch_size: int = None) -> int:
+    """
+    按批导出全部问题到Parquet或Arrow IPC文件，不把全部问题读入内存
+
+    Args:
+        file_path: 输出文件路径
+        fmt: 输出格式（parquet或arrow）
+        batch_size: 每批查询和写出的行数，默认使用配置值
+
+    Returns:
+        int: 导出的问题数
+    """
+    _require_pyarrow()
+    if fmt not in ('parquet', 'arrow'):
+        raise ValueError(f"无效的导出格式 '{fmt}'，有效值: ['parquet', 'arrow']")
+    batch_size = batch_size or getattr(Config, 'CSV_COLUMNAR_BATCH_SIZE', 5000)
+    schema = _export_schema()
+
+    # 分类和设备类型表很小，先整体读取，避免逐行关联查询
+    equipment_types = dict(db.session.query(EquipmentType.id, EquipmentType.name))
+    problem_categories = dict(db.session.query(ProblemCategory.id, ProblemCategory.name))
+    solution_categories = dict(db.session.query(SolutionCategory.id, SolutionCategory.name))
+
+    rows = iter(db.session.query(
+        Problem.title, Problem.description, Problem.equipment_type_id, Problem.phase, Problem.priority,
+        Problem.discovered_by, Problem.discovered_at, Problem.id, Problem.status, Problem.problem_category_id,
+        Problem.solution_category_id, Problem.ai_analysis, Problem.created_at
+    ).order_by(Problem.id).yield_per(batch_size))
+
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(file_path, schema)
+    else:
+        writer = pa.ipc.new_file(file_path, schema)
+    exported = 0
+    with writer:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            columns = [list(column) for column in zip(*batch)]
+            columns[2] = [equipment_types.get(type_id) for type_id in columns[2]]
+            columns[9] = [problem_categories.get(category_id) for category_id in columns[9]]
+            columns[10] = [solution_categories.get(category_id) for category_id in columns[10]]
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            exported += len(batch)
+    logger.info(f'已导出 {exported} 个问题到{fmt}文件: {file_path}')
+    return exported
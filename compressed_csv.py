@@ -0,0 +1,121 @@
+"""
+压缩CSV数据源模块
+支持.csv.gz和.zip（可包含多个CSV）上传：导入时边读边解压，不把解压后的文件写入磁盘，
+并按解压后的字节数限制大小，防止压缩炸弹
+"""
+import gzip
+import hashlib
+import io
+import os
+import zipfile
+from typing import BinaryIO, List, Optional, TextIO
+
+from config import Config
+
+# 支持的数据源扩展名（Parquet/Arrow列式文件由columnar_io读取）
+SOURCE_EXTENSIONS = ('csv.gz', 'csv', 'zip', 'parquet', 'arrow', 'feather')
+
+
+def source_extension(filename: str) -> Optional[str]:
+    """返回文件名对应的数据源扩展名（csv、csv.gz、zip或列式文件扩展名），不支持的文件返回None"""
+    lowered = filename.lower()
+    for extension in SOURCE_EXTENSIONS:
+        if lowered.endswith('.' + extension):
+            return extension
+    return None
+
+
+def decompressed_size_limit() -> int:
+    """解压后数据的大小限制（字节）"""
+    return getattr(Config, 'CSV_DECOMPRESSED_SIZE_LIMIT', 500 * 1024 * 1024)
+
+
+class _DecompressedSizeLimiter(io.RawIOBase):
+    """读取解压流时检查已解压的字节数，超过限制时抛出ValueError"""
+
+    def __init__(self, stream, limit: int):
+        self._stream = stream
+        self._limit = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return self._stream.seekable()
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        if self._limit and self._stream.tell() > self._limit:
+            raise ValueError(f"解压后的CSV数据超过大小限制 ({self._limit} bytes)")
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._stream.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._stream.tell()
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+        super().close()
+
+
+def open_csv_binary(file_path: str, archive_member: str = None) -> BinaryIO:
+    """
+    打开CSV数据源的二进制流：普通CSV直接打开，.gz和zip成员边读边解压
+
+    Args:
+        file_path: 数据源文件路径
+        archive_member: zip压缩包内的CSV文件名（file_path为zip时必须指定）
+    """
+    if archive_member is not None:
+        # 关闭ZipFile后已打开的成员流仍然可读，关闭成员流时才关闭底层文件
+        with zipfile.ZipFile(file_path) as archive:
+            stream = archive.open(archive_member)
+    elif source_extension(file_path) == 'csv.gz':
+        stream = gzip.open(file_path, 'rb')
+    else:
+        return open(file_path, 'rb')
+    return io.BufferedReader(_DecompressedSizeLimiter(stream, decompressed_size_limit()))
+
+
+def open_csv_text(file_path: str, encoding: str, archive_member: str = None) -> TextIO:
+    """以指定编码打开CSV数据源（与open(file_path, 'r', encoding=encoding)相同的文本流）"""
+    return io.TextIOWrapper(open_csv_binary(file_path, archive_member), encoding=encoding)
+
+
+def list_archive_csv_members(file_path: str) -> List[str]:
+    """
+    列出zip压缩包中的CSV文件
+
+    Raises:
+        ValueError: 不是有效的zip文件、CSV文件数超过限制，或声明的解压后总大小超过限制
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith('.csv')
+                       and not info.filename.startswith('__MACOSX/')
+                       and not os.path.basename(info.filename).startswith('.')]
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"无效的zip文件: {str(e)}") from e
+
+    max_members = getattr(Config, 'CSV_ARCHIVE_MAX_MEMBERS', 20)
+    if len(members) > max_members:
+        raise ValueError(f"压缩包中的CSV文件数超过限制 ({max_members})")
+    # 声明的大小可能不实，读取时仍按实际解压字节数检查
+    limit = decompressed_size_limit()
+    if sum(info.file_size for info in members) > limit:
+        raise ValueError(f"解压后的CSV数据超过大小限制 ({limit} bytes)")
+    return [info.filename for info in members]
+
+
+def compute_member_hash(file_path: str, archive_member: str, chunk_size: int = 1024 * 1024) -> str:
+    """按块计算zip成员解压后内容的SHA-256（同时检查解压后大小）"""
+    digest = hashlib.sha256()
+    with open_csv_binary(file_path, archive_member) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -39,6 +39,19 @@ class Config:
     AI_TEMPERATURE = float(os.environ.get('AI_TEMPERATURE', '0.7'))
     AI_TOP_P = float(os.environ.get('AI_TOP_P', '0.8'))
     
+    # AI调度配置（交互式分析优先于导入，导入优先于补充分析）
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', '4'))  # 同时进行的大模型调用数（共用名额目录的所有进程合计）
+    AI_INTERACTIVE_CONCURRENCY = int(os.environ.get('AI_INTERACTIVE_CONCURRENCY', '0'))  # 交互式分析的并发上限，0表示不超过总数即可
+    AI_IMPORT_CONCURRENCY = int(os.environ.get('AI_IMPORT_CONCURRENCY', '2'))  # CSV导入分析的并发上限（小于总数，为交互式分析保留名额）
+    AI_BACKFILL_CONCURRENCY = int(os.environ.get('AI_BACKFILL_CONCURRENCY', '1'))  # 补充分析/重新分析的并发上限
+    AI_SCHEDULER_LOCK_DIR = os.environ.get('AI_SCHEDULER_LOCK_DIR', 'ai_slots')  # 多进程共享AI调用名额的文件锁目录，为空表示只在进程内调度
+    
+    # AI补充分析配置（导入时跳过AI分析的问题由后台补充）
+    AI_BACKFILL_RPM = float(os.environ.get('AI_BACKFILL_RPM', '30'))  # 补充分析每分钟最多调用AI的次数
+    AI_BACKFILL_BURST = int(os.environ.get('AI_BACKFILL_BURST', '1'))  # 令牌桶容量（空闲后允许连续调用的次数）
+    AI_BACKFILL_BATCH_SIZE = int(os.environ.get('AI_BACKFILL_BATCH_SIZE', '50'))  # 每次查询待补充分析的问题数
+    AI_BACKFILL_POLL_INTERVAL = float(os.environ.get('AI_BACKFILL_POLL_INTERVAL', '0'))  # 后台补充分析轮询间隔（秒），0表示不启用（多进程部署时只在一个进程中启用）
+    
     # 分页配置
     ITEMS_PER_PAGE = int(os.environ.get('ITEMS_PER_PAGE', '10'))
     
@@ -49,10 +62,21 @@ class Config:
     VECTOR_DB_PERSIST_DIR = os.environ.get('VECTOR_DB_PERSIST_DIR', './chroma_data')
     EMBEDDING_MODEL_NAME = os.environ.get('EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
     VECTOR_DB_SEARCH_LIMIT = int(os.environ.get('VECTOR_DB_SEARCH_LIMIT', '5'))
+    VECTOR_DB_BATCH_QUERY_LIMIT = int(os.environ.get('VECTOR_DB_BATCH_QUERY_LIMIT', '100'))  # 批量相似搜索单次最大查询数
     
     # 向量数据库配置
     VECTOR_DB_PATH = os.environ.get('VECTOR_DB_PATH', './chroma_data')
     EMBEDDING_MODEL = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+    VECTOR_SYNC_CHUNK_SIZE = int(os.environ.get('VECTOR_SYNC_CHUNK_SIZE', '500'))  # 增量同步每块处理的问题数量
+    VECTOR_SYNC_INTERVAL = int(os.environ.get('VECTOR_SYNC_INTERVAL', '0'))  # 定时增量同步间隔（秒），0表示不启用
+    VECTOR_ORPHAN_SWEEP_INTERVAL = int(os.environ.get('VECTOR_ORPHAN_SWEEP_INTERVAL', '86400'))  # 定时同步中遍历向量库清理遗留向量的间隔（秒），0表示不清理
+    VECTOR_CONSISTENCY_CHUNK_SIZE = int(os.environ.get('VECTOR_CONSISTENCY_CHUNK_SIZE', '1000'))  # 一致性检查每块比较的数量
+    VECTOR_OUTBOX_POLL_INTERVAL = float(os.environ.get('VECTOR_OUTBOX_POLL_INTERVAL', '2'))  # 发件箱轮询间隔（秒），0表示不启用后台处理
+    VECTOR_OUTBOX_BATCH_SIZE = int(os.environ.get('VECTOR_OUTBOX_BATCH_SIZE', '200'))  # 发件箱每批处理的记录数
+    VECTOR_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('VECTOR_OUTBOX_MAX_ATTEMPTS', '10'))  # 发件箱记录最大重试次数
+    VECTOR_OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('VECTOR_OUTBOX_RETRY_BASE_SECONDS', '5'))  # 重试退避基础时间（秒）
+    VECTOR_OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get('VECTOR_OUTBOX_RETRY_MAX_SECONDS', '3600'))  # 重试退避最长时间（秒）
+    VECTOR_OUTBOX_LEASE_SECONDS = int(os.environ.get('VECTOR_OUTBOX_LEASE_SECONDS', '300'))  # 处理中记录的租约时间（秒），超时可被重新领取
     
     # CSV导入配置
     CSV_MAX_ROWS = int(os.environ.get('CSV_MAX_ROWS', '10000'))  # CSV最大行数
@@ -61,8 +85,37 @@ class Config:
     CSV_EQUIPMENT_TYPE_MAX_LENGTH = int(os.environ.get('CSV_EQUIPMENT_TYPE_MAX_LENGTH', '100'))  # 设备类型最大长度
     CSV_BATCH_SIZE = int(os.environ.get('CSV_BATCH_SIZE', '100'))  # CSV批量处理大小
     CSV_FILE_SIZE_LIMIT = int(os.environ.get('CSV_FILE_SIZE_LIMIT', '104857600'))  # CSV文件大小限制（100MB）
-    CSV_ALLOWED_EXTENSIONS = set(os.environ.get('CSV_ALLOWED_EXTENSIONS', 'csv').lower().split(','))  # 允许的文件扩展名
+    CSV_ALLOWED_EXTENSIONS = set(os.environ.get('CSV_ALLOWED_EXTENSIONS', 'csv,csv.gz,zip,parquet,arrow,feather').lower().split(','))  # 允许的文件扩展名（csv, csv.gz, zip, 需要pyarrow的parquet/arrow/feather）
+    CSV_DECOMPRESSED_SIZE_LIMIT = int(os.environ.get('CSV_DECOMPRESSED_SIZE_LIMIT', '524288000'))  # .csv.gz/.zip解压后数据大小限制（500MB）
+    CSV_ARCHIVE_MAX_MEMBERS = int(os.environ.get('CSV_ARCHIVE_MAX_MEMBERS', '20'))  # zip压缩包中最多包含的CSV文件数
+    CSV_ARCHIVE_WORKERS = int(os.environ.get('CSV_ARCHIVE_WORKERS', '4'))  # 并行导入zip中CSV文件的线程数（SQLite数据库时依次导入）
+    CSV_COLUMNAR_BATCH_SIZE = int(os.environ.get('CSV_COLUMNAR_BATCH_SIZE', '5000'))  # Parquet/Arrow导入导出每批的行数
     CSV_SPECIAL_CHAR_THRESHOLD = float(os.environ.get('CSV_SPECIAL_CHAR_THRESHOLD', '0.5'))  # 特殊字符比例阈值
+    CSV_DATE_SAMPLE_ROWS = int(os.environ.get('CSV_DATE_SAMPLE_ROWS', '200'))  # 推断发现时间格式时读取的样本行数
+    CSV_IMPORT_ENGINE = os.environ.get('CSV_IMPORT_ENGINE', 'python').lower()  # 清理验证引擎: python, pandas, process
+    CSV_PANDAS_CHUNK_SIZE = int(os.environ.get('CSV_PANDAS_CHUNK_SIZE', '5000'))  # pandas引擎每块读取的行数
+    CSV_PROCESS_WORKERS = int(os.environ.get('CSV_PROCESS_WORKERS', '0'))  # 多进程引擎的进程数（0表示CPU核数）
+    CSV_PROCESS_CHUNK_SIZE = int(os.environ.get('CSV_PROCESS_CHUNK_SIZE', '1000'))  # 多进程引擎每块分发的行数
+    CSV_REJECT_FOLDER = os.environ.get('CSV_REJECT_FOLDER') or os.path.join(UPLOAD_FOLDER, 'rejects')  # 导入失败记录（拒绝文件）目录
+    CSV_FAILED_RECORDS_PREVIEW = int(os.environ.get('CSV_FAILED_RECORDS_PREVIEW', '20'))  # 导入结果中返回的失败记录条数
+    CSV_VALIDATE_MAX_ROWS = int(os.environ.get('CSV_VALIDATE_MAX_ROWS', '1000000'))  # 只验证模式最多验证的行数（不受CSV_MAX_ROWS限制）
+    CSV_VALIDATE_MAX_ISSUES = int(os.environ.get('CSV_VALIDATE_MAX_ISSUES', '10000'))  # 验证报告中返回的失败行、警告行各自的最大条数
+    CSV_RESUME_STALE_SECONDS = int(os.environ.get('CSV_RESUME_STALE_SECONDS', '600'))  # 处理中的导入超过该时间无检查点更新视为中断，可续传
+    CSV_DEDUPE_ENABLED = os.environ.get('CSV_DEDUPE_ENABLED', 'true').lower() == 'true'  # 相同内容的文件已导入或正在导入时复用其结果
+    CSV_DEDUPE_WAIT_SECONDS = float(os.environ.get('CSV_DEDUPE_WAIT_SECONDS', '30'))  # 等待相同文件的进行中导入完成的最长时间
+    CSV_DEDUPE_POLL_INTERVAL = float(os.environ.get('CSV_DEDUPE_POLL_INTERVAL', '0.5'))  # 等待期间查询导入状态的间隔（秒）
+    CSV_DUPLICATE_MODE = os.environ.get('CSV_DUPLICATE_MODE', 'off').lower()  # 重复问题处理模式: off, skip, merge, flag
+    CSV_DUPLICATE_SIMILARITY_THRESHOLD = float(os.environ.get('CSV_DUPLICATE_SIMILARITY_THRESHOLD', '0.95'))  # 近似重复相似度阈值
+    
+    # 性能诊断配置
+    TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'false').lower() == 'true'  # 是否启用请求追踪（Server-Timing响应头）
+    TRACE_LOG_PATH = os.environ.get('TRACE_LOG_PATH', '')  # 追踪日志文件路径（JSONL），为空表示不写日志
+    TRACE_LOG_MIN_DURATION_MS = float(os.environ.get('TRACE_LOG_MIN_DURATION_MS', '0'))  # 只记录耗时不低于该值的请求
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')  # 管理接口令牌（X-Admin-Token请求头），为空表示禁用管理接口
+    PROFILE_OUTPUT_DIR = os.environ.get('PROFILE_OUTPUT_DIR', 'profiles')  # 采样结果输出目录
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))  # 采样间隔（毫秒）
+    PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '60'))  # 管理接口单次采样最长时间（秒）
+    PROFILE_SIGNAL_SECONDS = float(os.environ.get('PROFILE_SIGNAL_SECONDS', '30'))  # SIGUSR2触发的采样时长（秒）
 
 
 class DevelopmentConfig(Config):
@@ -4,13 +4,27 @@ CSV导入功能模块
 """
 
 import csv
+import hashlib
+import json
 import os
 import logging
-from datetime import datetime
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import closing, contextmanager
+from datetime import date, datetime
+from itertools import islice
 from enum import Enum
 from typing import Optional, Dict, Any, List, Tuple
-from models import db, Problem, EquipmentType, ImportHistory, ProblemCategory, SolutionCategory
-from ai_analysis import analyze_problem_with_ai, extract_category_from_ai_response
+from models import db, Problem, EquipmentType, ImportHistory, ProblemCategory, SolutionCategory, compute_content_hash
+from ai_analysis import analyze_problem_with_ai, extract_category_from_ai_response, ai_work_class
+from vector_db import get_vector_db
+from metrics import record_import_stage
+from sanitizer import sanitize_input, count_special_chars
+from import_rejects import RejectWriter, reject_file_path
+from compressed_csv import open_csv_binary, open_csv_text, list_archive_csv_members, compute_member_hash
+from columnar_io import columnar_format, iter_rows as iter_columnar_rows, read_column_names
 
 
 def _detect_csv_delimiter(sample_text: str) -> Optional[str]:
@@ -118,25 +132,69 @@ def _detect_csv_delimiter(sample_text: str) -> Optional[str]:
 logger = logging.getLogger(__name__)
 
 
-def import_csv_file(file_path: str, fail_on_error: bool = False):
+# 重复问题处理模式：off-不检测，skip-跳过重复行，merge-合并到已有问题，flag-照常导入但标记
+DUPLICATE_MODES = ('off', 'skip', 'merge', 'flag')
+
+# 清理验证引擎：python-逐行处理，pandas-按块列式处理，process-按块分发到进程池（结果一致）
+IMPORT_ENGINES = ('python', 'pandas', 'process')
+
+# 查找重复上传与创建导入历史记录之间加锁，避免同一进程内并发上传相同文件时都开始导入
+_import_dedupe_lock = threading.Lock()
+
+# validate_csv_headers读取的文件开头字符数（足够包含列头和第一行）
+HEADER_SAMPLE_SIZE = 64 * 1024
+
+
+def import_csv_file(file_path: str, fail_on_error: bool = False, duplicate_mode: str = None,
+                    duplicate_threshold: float = None, engine: str = None, resume_from: ImportHistory = None,
+                    file_hash: str = None, force_reimport: bool = False, archive_member: str = None,
+                    validate_only: bool = False, skip_ai: bool = False):
     """
     从CSV文件导入问题数据（改进版本，使用批量事务处理和更好的错误处理）
     添加枚举值验证、数据验证和清理功能
     实现不合格记录分离处理和统计功能，错误严重程度区分
     
     Args:
-        file_path: CSV文件路径
+        file_path: CSV文件路径（.csv.gz边读边解压；zip压缩包需同时指定archive_member）
         fail_on_error: 是否在遇到错误时立即失败，默认False继续处理有效记录
+        duplicate_mode: 重复问题处理模式（off/skip/merge/flag），默认使用配置值
+        duplicate_threshold: 判定近似重复的最小相似度（0-1），默认使用配置值
+        engine: 清理验证引擎（python-逐行处理，pandas-按块列式处理，process-多进程并行验证），默认使用配置值
+        resume_from: 要续传的导入历史记录（由resume_import()传入），从其检查点之后继续导入
+        file_hash: 源文件的SHA-256（上传时已边写入边计算），为None时读取文件计算
+        force_reimport: 相同内容的文件已导入完成或正在导入时仍然重新导入
+        archive_member: 要导入的zip压缩包内CSV文件名（由import_csv_archive()传入）
+        validate_only: 只验证不导入：执行列头检查、清理、枚举值/日期验证和内容哈希精确重复检测，
+            不写入数据库、不记录导入历史、不调用AI和向量检索，返回完整的验证报告
+        skip_ai: 不调用AI分析，问题以ai_analyzed=False写入，由AI补充分析任务（ai_backfill）按速率限制在后台补充
     
     Returns:
-        dict: 包含导入结果的字典，包括成功和失败的记录统计
+        dict: 包含导入结果的字典，包括成功、失败和重复的记录统计（validate_only时为验证报告）
     """
-    import time
     start_time = time.time()  # 记录开始时间用于性能监控
     
     # 导入配置
     from config import Config
     
+    if duplicate_mode is None:
+        duplicate_mode = getattr(Config, 'CSV_DUPLICATE_MODE', 'off')
+    duplicate_mode = str(duplicate_mode).lower()
+    if duplicate_mode not in DUPLICATE_MODES:
+        raise ValueError(f"无效的重复处理模式 '{duplicate_mode}'，有效值: {list(DUPLICATE_MODES)}")
+    if duplicate_threshold is None:
+        duplicate_threshold = getattr(Config, 'CSV_DUPLICATE_SIMILARITY_THRESHOLD', 0.95)
+    engine = str(engine or getattr(Config, 'CSV_IMPORT_ENGINE', 'python')).lower()
+    if engine not in IMPORT_ENGINES:
+        raise ValueError(f"无效的导入引擎 '{engine}'，有效值: {list(IMPORT_ENGINES)}")
+    columnar = columnar_format(file_path) is not None
+    if columnar and engine == 'pandas':
+        engine = 'python'  # 列式文件按记录批读取、值已带类型，不使用pandas引擎的文本按块解析
+    if validate_only:
+        if resume_from is not None:
+            raise ValueError("续传导入不支持只验证模式")
+        if duplicate_mode == 'off':
+            duplicate_mode = 'flag'  # 只验证时始终报告重复，off按flag处理（仅报告）
+    
     # 安全检查：验证文件路径，防止路径遍历攻击
     if '..' in file_path or file_path.startswith('/') or ':/' in file_path:
         logger.warning(f"非法文件路径检测: {file_path}")
@@ -153,363 +211,992 @@ def import_csv_file(file_path: str, fail_on_error: bool = False):
     if file_size > max_size:
         logger.error(f"CSV文件大小超过限制: {file_size} > {max_size}")
         raise ValueError(f"CSV文件大小超过限制 ({max_size} bytes)")
+
+    # 续传前校验源文件未变化，否则检查点的行号和偏移没有意义（只验证时不需要文件哈希）
+    if file_hash is None and not validate_only:
+        file_hash = (compute_member_hash(file_path, archive_member) if archive_member is not None
+                     else compute_file_hash(file_path))
+    if resume_from is not None and resume_from.file_hash != file_hash:
+        raise ValueError("源文件内容与原导入不一致，无法续传")
     
-    # 尝试不同的编码格式读取CSV文件
-    encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin-1']
-    used_encoding = None
-    sample = ''
-    
-    for encoding in encodings:
-        try:
-            with open(file_path, 'r', encoding=encoding) as test_file:
-                # 读取前2048字节用于检测CSV格式
-                sample = test_file.read(2048)
-                used_encoding = encoding
-                break
-        except UnicodeDecodeError:
-            continue
-    
-    if used_encoding is None:
-        logger.error("无法识别文件编码")
-        raise ValueError("无法识别文件编码，请确保文件为文本格式")
-    
-    # 检测CSV格式
-    delimiter = _detect_csv_delimiter(sample)
-    if delimiter is None:
-        logger.error("无法检测CSV文件分隔符")
-        raise ValueError("无法检测CSV文件分隔符，请确保文件为有效的CSV格式")
+    state = _ImportState(fail_on_error, duplicate_mode, duplicate_threshold,
+                         getattr(Config, 'CSV_VALIDATE_MAX_ISSUES', 10000) if validate_only
+                         else getattr(Config, 'CSV_FAILED_RECORDS_PREVIEW', 20))
+    state.validate_only = validate_only
+    state.skip_ai = skip_ai
+
+    if validate_only:
+        # 只验证：先检查列头，缺少必需的列时不再逐行验证
+        header_check = validate_csv_headers(file_path, archive_member=archive_member)
+        if not header_check['valid']:
+            return _build_validation_report(state, 0, [f"CSV文件格式错误: {header_check['message']}"], start_time)
+
+    # 检测编码和分隔符（列式文件不需要），读取样本行
+    if columnar:
+        used_encoding = delimiter = None
+        with _import_stage(state, 'decode', 0):
+            sample_rows = list(islice(iter_columnar_rows(file_path), getattr(Config, 'CSV_DATE_SAMPLE_ROWS', 200)))
+    else:
+        used_encoding, delimiter, sample_rows = _read_text_sample(file_path, archive_member, state)
+    if not sample_rows:
+        logger.info("CSV文件为空")
+        return {'message': 'CSV文件为空', 'importedCount': 0, 'totalCount': 0, 'failedCount': 0, 'failedRecords': [],
+                'duplicateCount': 0, 'duplicateRecords': []}
+
+    # 根据发现时间列的样本推断日期格式（列式文件中已是日期类型的值无需推断）
+    with _import_stage(state, 'decode', 0):
+        date_values = (row.get('discovered_at') or row.get('发现时间') for row in sample_rows)
+        state.date_parser = _DateParser(_infer_date_format(value for value in date_values if isinstance(value, str)))
     
-    # 验证CSV文件是否为空
-    with open(file_path, 'r', encoding=used_encoding) as file:
-        reader = csv.DictReader(file, delimiter=delimiter)
-        first_row = next(reader, None)
-        if first_row is None:
-            logger.info("CSV文件为空")
-            return {'message': 'CSV文件为空', 'importedCount': 0, 'totalCount': 0, 'failedCount': 0, 'failedRecords': []}
-    
-    # 记录导入历史 - 在事务中创建
-    import_history = ImportHistory(
-        filename=os.path.basename(file_path),
-        imported_by=1,  # 默认用户ID
-        total_records=0,  # 临时值，稍后更新
-        status='processing',
-        started_at=datetime.now()
-    )
-    db.session.add(import_history)
-    try:
-        db.session.flush()  # 获取ID但不提交
-        history_id = import_history.id
-    except Exception as e:
-        logger.error(f"创建导入历史记录失败: {str(e)}")
-        db.session.rollback()
-        raise
+    # 记录导入历史；续传时沿用原记录，计数从检查点恢复
+    options = {'fail_on_error': fail_on_error, 'duplicate_mode': duplicate_mode,
+               'duplicate_threshold': duplicate_threshold, 'engine': engine}
+    if archive_member is not None:
+        options['archive_member'] = archive_member
+    if skip_ai:
+        options['skip_ai'] = True
+    import_options = json.dumps(options)
+    existing_import = None
+    history_id = None
+    with _import_dedupe_lock:
+        if validate_only:
+            import_history = None  # 只验证：不记录导入历史
+        elif resume_from is None:
+            # 相同内容的文件已按相同选项导入完成或正在导入时复用其结果，不重复导入
+            if not force_reimport and getattr(Config, 'CSV_DEDUPE_ENABLED', True):
+                existing_import = _find_import_by_hash(file_hash, import_options)
+            if existing_import is None:
+                import_history = ImportHistory(
+                    filename=os.path.basename(file_path) + (f'/{archive_member}' if archive_member is not None else ''),
+                    imported_by=1,  # 默认用户ID
+                    total_records=0,  # 临时值，稍后更新
+                    status='processing',
+                    started_at=datetime.now(),
+                    source_path=file_path,
+                    file_hash=file_hash,
+                    import_options=import_options,
+                    checkpoint_row=0,
+                    checkpoint_failed=0
+                )
+                db.session.add(import_history)
+        else:
+            import_history = resume_from
+            import_history.status = 'processing'
+            import_history.completed_at = None
+            import_history.result_summary = None
+            state.processed_count = import_history.processed_records or 0
+            state.failed_count = import_history.checkpoint_failed or 0
+            logger.info(f'从第 {import_history.checkpoint_row or 0} 行之后续传导入 {import_history.id}: {file_path}')
+        if existing_import is None and import_history is not None:
+            try:
+                # 立即提交，进程在第一批提交前退出时也能找到该记录并续传
+                db.session.commit()
+                history_id = import_history.id
+            except Exception as e:
+                logger.error(f"创建导入历史记录失败: {str(e)}")
+                db.session.rollback()
+                raise
+
+    if existing_import is not None:
+        logger.info(f'相同内容的文件已由导入 {existing_import.id} 处理（状态: {existing_import.status}），复用其结果: {file_path}')
+        return _wait_for_import_result(existing_import, getattr(Config, 'CSV_DEDUPE_WAIT_SECONDS', 30),
+                                       getattr(Config, 'CSV_DEDUPE_POLL_INTERVAL', 0.5))
+
+    state.import_history = import_history
+    start_row = (import_history.checkpoint_row or 0) if import_history is not None else 0
+    start_offset = import_history.checkpoint_offset if start_row else None
+
+    # 失败记录逐条写入拒绝文件；续传时保留检查点及之前的记录（只验证时失败记录全部在报告中返回）
+    if not validate_only:
+        state.reject_writer = RejectWriter(history_id, start_row if resume_from is not None else None)
 
     # 重新用检测到的编码打开文件进行处理
-    processed_count = 0
     total_count = 0
-    failed_count = 0
     errors = []
-    failed_records = []  # 存储失败的记录
-    equipment_types_cache = {}  # 缓存设备类型，避免重复查询
-    problem_categories_cache = {}  # 缓存问题分类，避免重复查询
-    solution_categories_cache = {}  # 缓存解决方案分类，避免重复查询
 
     try:
-        with open(file_path, 'r', encoding=used_encoding) as file:
-            reader = csv.DictReader(file, delimiter=delimiter)
+        with _open_row_reader(file_path, used_encoding, delimiter, archive_member) as (file, reader):
+
+            # 续传：逐行引擎记录了字节偏移时直接定位，否则按行数跳过已处理的行（只解析不验证）
+            if start_row:
+                if start_offset is not None and engine == 'python':
+                    _ = reader.fieldnames  # 先读取表头
+                    file.seek(start_offset)
+                elif engine != 'pandas':
+                    for _ in islice(reader, start_row):
+                        pass
+                total_count = start_row
             
             # 批量处理数据，避免单个事务过大
             batch_size = getattr(Config, 'CSV_BATCH_SIZE', 100)
-            batch_problems = []
+            pending_rows = []  # 已清理、待写入的行: (行号, 原始数据, 清理后数据, 警告)
             
-            for row in reader:
-                total_count += 1
-                
-                # 安全检查：限制处理的总行数，防止内存耗尽攻击
-                if total_count > getattr(Config, 'CSV_MAX_ROWS', 10000):  # 限制最大行数，从配置中读取
-                    logger.warning(f'CSV文件行数超过限制({getattr(Config, "CSV_MAX_ROWS", 10000)})，停止处理: {file_path}')
-                    errors.append(f'CSV文件行数超过限制({getattr(Config, "CSV_MAX_ROWS", 10000)})，停止处理')
-                    break
+            max_rows = getattr(Config, 'CSV_MAX_ROWS', 10000)  # 限制最大行数，从配置中读取
+            if validate_only:
+                # 只验证时不保留已验证的行，可以验证超过导入行数限制的文件，超出部分在报告中指出
+                max_rows = max(max_rows, getattr(Config, 'CSV_VALIDATE_MAX_ROWS', 1000000))
+
+            if engine == 'pandas':
+                # pandas引擎：按块读取，整块列式清理验证后逐行进入相同的写入流程
+                from csv_import_pandas import read_csv_chunks, clean_and_validate_frame
+
+                chunk_size = getattr(Config, 'CSV_PANDAS_CHUNK_SIZE', 5000)
+                rows_to_skip = start_row
+                for chunk in read_csv_chunks(open_csv_binary(file_path, archive_member), used_encoding,
+                                             delimiter, chunk_size):
+                    if rows_to_skip:
+                        # 续传：丢弃检查点及之前的行
+                        skipped = min(rows_to_skip, len(chunk))
+                        chunk = chunk.iloc[skipped:]
+                        rows_to_skip -= skipped
+                        if not len(chunk):
+                            continue
+
+                    # 安全检查：与逐行处理相同的总行数限制
+                    exceeded = len(chunk) > max_rows - total_count
+                    if exceeded:
+                        chunk = chunk.iloc[:max_rows - total_count]
+
+                    validated_rows = []
+                    if len(chunk):
+                        with _import_stage(state, 'validate', len(chunk)):
+                            validated_rows = clean_and_validate_frame(chunk, total_count + 1, state.date_parser)
+                    total_count += len(validated_rows)
+                    pending_rows = _accept_validated_rows(validated_rows, pending_rows, batch_size, state)
+
+                    if exceeded:
+                        total_count = max_rows + 1  # 与逐行处理一致，计入触发限制的那一行
+                        logger.warning(f'CSV文件行数超过限制({max_rows})，停止处理: {file_path}')
+                        errors.append(f'CSV文件行数超过限制({max_rows})，停止处理')
+                        break
+            elif engine == 'process':
+                # 多进程引擎：按块分发到进程池清理验证，按提交顺序取回结果后由本进程依次写入
+                from csv_import_parallel import validate_rows_in_pool
+
+                with closing(validate_rows_in_pool(islice(reader, max(max_rows - total_count, 0)),
+                                                   state.date_parser.date_format,
+                                                   first_row_num=total_count + 1)) as validated_chunks:
+                    while True:
+                        # 主进程等待结果的时间计入验证阶段
+                        wait_start = time.perf_counter()
+                        validated = next(validated_chunks, None)
+                        if validated is None:
+                            break
+                        validated_rows, fallback_count = validated
+                        state.add_stage_time('validate', len(validated_rows), time.perf_counter() - wait_start)
+                        state.date_parser.fallback_count += fallback_count
+                        total_count += len(validated_rows)
+                        pending_rows = _accept_validated_rows(validated_rows, pending_rows, batch_size, state)
+
+                # 安全检查：与逐行处理相同的总行数限制
+                if total_count == max_rows and next(reader, None) is not None:
+                    total_count = max_rows + 1  # 与逐行处理一致，计入触发限制的那一行
+                    logger.warning(f'CSV文件行数超过限制({max_rows})，停止处理: {file_path}')
+                    errors.append(f'CSV文件行数超过限制({max_rows})，停止处理')
+            else:
+                for row in reader:
+                    total_count += 1
+
+                    # 安全检查：限制处理的总行数，防止内存耗尽攻击
+                    if total_count > max_rows:
+                        logger.warning(f'CSV文件行数超过限制({max_rows})，停止处理: {file_path}')
+                        errors.append(f'CSV文件行数超过限制({max_rows})，停止处理')
+                        break
 
-                try:
-                    # 清理和验证数据
-                    cleaned_data, row_errors = _clean_and_validate_data(row, total_count)
-                    # 区分错误严重程度：致命错误和警告
-                    fatal_errors = [error for error in row_errors if _is_fatal_error(error)]
-                    warnings = [error for error in row_errors if not _is_fatal_error(error)]
-
-                    # 如果有致命错误，根据fail_on_error参数决定是否继续
-                    if fatal_errors:
-                        failed_count += 1
-                        failed_records.append({
-                            'row': total_count,
-                            'data': row,
-                            'errors': fatal_errors,
-                            'warnings': warnings
-                        })
-                        logger.error(f'第 {total_count} 行存在致命错误: {fatal_errors}')
-                        
-                        if fail_on_error:
-                            raise ValueError(f"第 {total_count} 行存在致命错误: {fatal_errors}")
-                        else:
-                            continue  # 跳过此行，继续处理下一行
-
-                    # 获取清理后的数据
-                    title = cleaned_data['title']
-                    description = cleaned_data['description']
-                    equipment_type_name = cleaned_data['equipment_type_name']
-                    phase = cleaned_data['phase']
-                    discovered_by = cleaned_data['discovered_by']
-                    discovered_at = cleaned_data['discovered_at']
-                    priority = cleaned_data['priority']
-
-                    # 如果标题和描述都为空则跳过
-                    if not title and not description:
-                        logger.debug(f"跳过第 {total_count} 行：标题和描述都为空")
-                        continue
-                    
-                    # 根据设备类型名称获取ID，使用缓存
-                    equipment_type_id = None
-                    if equipment_type_name:
-                        if equipment_type_name in equipment_types_cache:
-                            equipment_type_id = equipment_types_cache[equipment_type_name]
-                        else:
-                            equipment_type = EquipmentType.query.filter_by(name=equipment_type_name).first()
-                            if equipment_type:
-                                equipment_type_id = equipment_type.id
-                                equipment_types_cache[equipment_type_name] = equipment_type_id
-                            else:
-                                # 如果设备类型不存在，创建新的
-                                equipment_type = EquipmentType(name=equipment_type_name)
-                                db.session.add(equipment_type)
-                                try:
-                                    db.session.flush()  # 获取ID
-                                    equipment_type_id = equipment_type.id
-                                    equipment_types_cache[equipment_type_name] = equipment_type_id
-                                except Exception as et_error:
-                                    logger.error(f"创建设备类型失败: {str(et_error)}")
-                                    fatal_error_msg = f"第 {total_count} 行: 创建设备类型失败 - {str(et_error)}"
-                                    failed_count += 1
-                                    failed_records.append({
-                                        'row': total_count,
-                                        'data': row,
-                                        'errors': [fatal_error_msg],
-                                        'warnings': warnings
-                                    })
-                                    if fail_on_error:
-                                        raise ValueError(fatal_error_msg)
-                                    continue  # 跳过此行，继续处理下一行
-
-                    # 创建问题记录
-                    problem = Problem(
-                        title=title,
-                        description=description,
-                        equipment_type_id=equipment_type_id,
-                        phase=phase,
-                        discovered_by=discovered_by,
-                        discovered_at=discovered_at,
-                        priority=priority  # 添加优先级字段
-                    )
-                    
-                    # 使用AI分析和分类
                     try:
-                        ai_result = analyze_problem_with_ai(title, description, equipment_type=equipment_type_name, phase=phase)
-                        problem.ai_analyzed = True
-                        problem.ai_analysis = ai_result.get('analysis', '')
-                        
-                        # 从AI响应中提取分类信息
-                        category_info = extract_category_from_ai_response(
-                            ai_result.get('analysis', ''), 
-                            title, 
-                            description
-                        )
-                        
-                        # 获取问题分类ID（使用缓存避免重复查询）
-                        problem_category_id = category_info.get('problem_category_id')
-                        if problem_category_id:
-                            problem.problem_category_id = problem_category_id
-                        else:
-                            # 尝试从缓存中查找，如果不存在则创建默认分类
-                            category_name = category_info.get('problem_category_name', '默认分类')
-                            if category_name in problem_categories_cache:
-                                problem.problem_category_id = problem_categories_cache[category_name]
-                            else:
-                                problem_category = ProblemCategory.query.filter_by(name=category_name).first()
-                                if not problem_category:
-                                    problem_category = ProblemCategory(name=category_name, description='系统默认分类')
-                                    db.session.add(problem_category)
-                                    db.session.flush()
-                                problem.problem_category_id = problem_category.id
-                                problem_categories_cache[category_name] = problem_category.id
-
-                        # 获取解决方案分类ID（使用缓存避免重复查询）
-                        solution_category_id = category_info.get('solution_category_id')
-                        if solution_category_id:
-                            problem.solution_category_id = solution_category_id
-                        else:
-                            # 尝试从缓存中查找，如果不存在则创建默认分类
-                            category_name = category_info.get('solution_category_name', '默认解决方案')
-                            if category_name in solution_categories_cache:
-                                problem.solution_category_id = solution_categories_cache[category_name]
-                            else:
-                                solution_category = SolutionCategory.query.filter_by(name=category_name).first()
-                                if not solution_category:
-                                    solution_category = SolutionCategory(name=category_name, description='系统默认解决方案')
-                                    db.session.add(solution_category)
-                                    db.session.flush()
-                                problem.solution_category_id = solution_category.id
-                                solution_categories_cache[category_name] = solution_category.id
-
-                        # 使用AI返回的优先级，但要验证它是否有效
-                        ai_priority = category_info.get('priority', priority)  # 使用验证过的默认优先级
-                        is_valid, error_msg = _validate_enum_value(ai_priority, ['low', 'medium', 'high', 'critical'], 'priority')
-                        if is_valid:
-                            problem.priority = ai_priority
-                        else:
-                            problem.priority = priority  # 使用验证过的默认优先级
-
-                    except Exception as ai_error:
-                        logger.error(f'AI分析失败: {str(ai_error)}', exc_info=True)
-                        # AI分析失败时，仍然保存基础问题信息，但标记为未分析
-                        problem.ai_analyzed = False
-                        problem.ai_analysis = None
-                        # 使用默认的分类ID（ID=1，通常是通用分类）或从数据库中获取一个有效ID
-                        try:
-                            # 确保问题分类有有效ID
-                            if ProblemCategory.query.first() is None:
-                                # 如果没有分类，创建一个默认分类
-                                default_category = ProblemCategory(name='默认分类', description='系统默认问题分类')
-                                db.session.add(default_category)
-                                db.session.flush()
-                                problem.problem_category_id = default_category.id
-                            else:
-                                # 使用第一个可用的问题分类
-                                default_category = ProblemCategory.query.first()
-                                problem.problem_category_id = default_category.id
-
-                            # 确保解决方案分类有有效ID
-                            if SolutionCategory.query.first() is None:
-                                # 如果没有分类，创建一个默认分类
-                                default_solution = SolutionCategory(name='默认解决方案', description='系统默认解决方案')
-                                db.session.add(default_solution)
-                                db.session.flush()
-                                problem.solution_category_id = default_solution.id
-                            else:
-                                # 使用第一个可用的解决方案分类
-                                default_solution = SolutionCategory.query.first()
-                                problem.solution_category_id = default_solution.id
-                        except Exception as cat_error:
-                            logger.error(f'设置默认分类失败: {str(cat_error)}', exc_info=True)
-
-                    # 添加到批量处理列表
-                    batch_problems.append(problem)
-                    
-                    # 当批量达到指定大小时，提交事务
-                    if len(batch_problems) >= batch_size:
-                        _process_batch(batch_problems, logger)
-                        processed_count += len(batch_problems)
-                        batch_problems = []  # 清空批量列表
-                        
-                except Exception as row_error:
-                    logger.error(f'处理CSV第 {total_count} 行时出错: {str(row_error)}', exc_info=True)
-                    fatal_error_msg = f'第 {total_count} 行处理失败: {str(row_error)}'
-                    failed_count += 1
-                    failed_records.append({
-                        'row': total_count,
-                        'data': row,
-                        'errors': [fatal_error_msg],
-                        'warnings': []
-                    })
-                    if fail_on_error:
-                        raise
-                    continue  # 继续处理下一行
+                        # 清理和验证数据
+                        with _import_stage(state, 'validate', 1):
+                            cleaned_data, row_errors = _clean_and_validate_data(row, total_count, state.date_parser)
+                        _accept_validated_row(total_count, row, cleaned_data, row_errors, pending_rows, state)
+                    except Exception as row_error:
+                        _record_row_error(total_count, row, row_error, state)
+                        continue  # 继续处理下一行
+
+                    # 当批量达到指定大小时，处理并提交事务（检查点随该批一起提交）
+                    if len(pending_rows) >= batch_size:
+                        state.set_checkpoint(total_count, file.tell() if file is not None else None)
+                        _import_pending_rows(pending_rows, state)
+                        pending_rows = []  # 清空批量列表
 
             # 处理最后一批数据
-            if batch_problems:
-                _process_batch(batch_problems, logger)
-                processed_count += len(batch_problems)
+            if pending_rows:
+                state.set_checkpoint(min(total_count, max_rows))
+                _import_pending_rows(pending_rows, state)
 
     except Exception as e:
         logger.error(f'CSV文件处理过程中发生错误: {str(e)}', exc_info=True)
         # 回滚整个事务
         db.session.rollback()
+        if import_history is None:
+            raise  # 只验证：没有导入历史需要更新
         # 更新导入历史记录状态为失败
         try:
+            # 检查点字段保持最后一次提交的值，可从该处续传
             import_history.status = 'failed'
             import_history.total_records = total_count
-            import_history.processed_records = processed_count
-            import_history.failed_records = failed_count
+            import_history.processed_records = state.processed_count
+            import_history.failed_records = state.failed_count
             import_history.error_log = '; '.join(errors[:20] + [str(e)]) if errors else str(e)  # 记录错误
             import_history.completed_at = datetime.now()
             db.session.commit()
         except Exception as rollback_error:
             logger.error(f'更新导入历史记录失败: {str(rollback_error)}')
         raise
+    finally:
+        if state.reject_writer is not None:
+            state.reject_writer.close()
+
+    state.flush_stage_metrics()
+    if validate_only:
+        import_limit = getattr(Config, 'CSV_MAX_ROWS', 10000)
+        if total_count > import_limit:
+            errors.append(f'CSV文件行数({total_count})超过导入限制({import_limit})，导入时超出部分不会处理')
+        return _build_validation_report(state, total_count, errors, start_time)
+    processed_count = state.processed_count
+    failed_count = state.failed_count
+    duplicate_count = len(state.duplicate_records)
+
+    # 计算总处理时间
+    total_processing_time = time.time() - start_time
+    
+    message = f'CSV文件导入完成，成功处理 {processed_count} 条，失败 {failed_count} 条'
+    if duplicate_count:
+        message += f'，重复 {duplicate_count} 条'
+    
+    result = {
+        'message': message,
+        'importedCount': processed_count,
+        'failedCount': failed_count,
+        'totalCount': total_count,
+        'historyId': history_id,
+        'processingTime': round(total_processing_time, 2),  # 添加处理时间信息
+        'errorCount': len(errors),  # 添加错误计数
+        'failedRecords': state.failed_records,  # 前CSV_FAILED_RECORDS_PREVIEW条失败记录详情，完整记录见拒绝文件
+        'failedRecordsTruncated': failed_count > len(state.failed_records),  # 失败记录详情是否被截断
+        'rejectFile': reject_file_path(history_id) if failed_count else None,  # 全部失败记录（JSON Lines）
+        'duplicateCount': duplicate_count,
+        'duplicateRecords': state.duplicate_records,  # 返回重复记录详情
+        'detectedDateFormat': state.date_parser.date_format,  # 推断出的发现时间日期格式
+        'dateFallbackCount': state.date_parser.fallback_count,  # 未能用推断格式解析、回退逐格式尝试的行数
+        'resumedFromRow': start_row,  # 续传时跳过的已处理行数（非续传为0）
+        'reusedResult': False,  # 是否为相同文件之前导入的结果
+        'stageStats': {stage: {'rows': entry['rows'], 'seconds': round(entry['seconds'], 4)}
+                       for stage, entry in state.stage_stats.items()}  # 各阶段处理行数和耗时
+    }
 
-    # 更新导入历史记录状态
+    # 更新导入历史记录状态，同时保存结果供相同文件再次上传时返回
     try:
         import_history.total_records = total_count
         import_history.status = 'completed'
         import_history.processed_records = processed_count
         import_history.failed_records = failed_count
         import_history.completed_at = datetime.now()
+        import_history.result_summary = json.dumps(result, ensure_ascii=False, default=str)
         if errors:
             import_history.error_log = '; '.join(errors[:20]) + ('...' if len(errors) > 20 else '')  # 只记录前20个错误，避免日志过长
         db.session.commit()
-        logger.info(f'CSV导入完成: 总共 {total_count} 行，成功处理 {processed_count} 行，失败 {failed_count} 行')
+        logger.info(f'CSV导入完成: 总共 {total_count} 行，成功处理 {processed_count} 行，失败 {failed_count} 行，'
+                    f'重复 {duplicate_count} 行')
     except Exception as final_error:
         logger.error(f'更新导入历史记录失败: {str(final_error)}')
         db.session.rollback()
         raise
 
-    # 计算总处理时间
-    total_processing_time = time.time() - start_time
     logger.info(f'CSV导入完成，总处理时间: {total_processing_time:.2f} 秒, '
                 f'处理记录: {processed_count}/{total_count}，失败: {failed_count}')
-    
+    return result
+
+
+def _build_validation_report(state: '_ImportState', total_count: int, errors: List[str],
+                             start_time: float) -> Dict[str, Any]:
+    """
+    生成只验证模式的报告：存在致命错误的行导入时会失败，只有警告的行导入时按默认值处理
+
+    Returns:
+        dict: 验证报告，valid表示没有失败行和文件级错误
+    """
+    failed_count = state.failed_count
+    duplicate_count = len(state.duplicate_records)
+    valid = not failed_count and not errors
+    message = f'CSV文件验证完成，可导入 {state.processed_count} 条，失败 {failed_count} 条，警告 {state.warning_count} 条'
+    if duplicate_count:
+        message += f'，重复 {duplicate_count} 条'
+    if errors:
+        message += f'，文件错误 {len(errors)} 个'
+    logger.info(f'{message}，总共 {total_count} 行')
     return {
-        'message': f'CSV文件导入完成，成功处理 {processed_count} 条，失败 {failed_count} 条',
-        'importedCount': processed_count,
+        'message': message,
+        'validateOnly': True,
+        'valid': valid,
+        'importedCount': 0,  # 只验证，没有写入
+        'validCount': state.processed_count,  # 导入时会写入的新问题行数，合并到已有问题的行见duplicateRecords
         'failedCount': failed_count,
         'totalCount': total_count,
-        'historyId': history_id,
-        'processingTime': round(total_processing_time, 2),  # 添加处理时间信息
-        'errorCount': len(errors),  # 添加错误计数
-        'failedRecords': failed_records  # 返回失败记录详情
+        'errors': errors,  # 文件级错误（列头、行数限制等）
+        'errorCount': len(errors),
+        'failedRecords': state.failed_records,  # 存在致命错误的行，最多CSV_VALIDATE_MAX_ISSUES条
+        'failedRecordsTruncated': failed_count > len(state.failed_records),
+        'warningCount': state.warning_count,
+        'warningRecords': state.warning_records,  # 只有警告（如无效枚举值、日期）的行，最多CSV_VALIDATE_MAX_ISSUES条
+        'warningRecordsTruncated': state.warning_count > len(state.warning_records),
+        'duplicateCount': duplicate_count,
+        'duplicateRecords': state.duplicate_records,
+        'detectedDateFormat': state.date_parser.date_format,
+        'dateFallbackCount': state.date_parser.fallback_count,
+        'processingTime': round(time.time() - start_time, 2),
+        'stageStats': {stage: {'rows': entry['rows'], 'seconds': round(entry['seconds'], 4)}
+                       for stage, entry in state.stage_stats.items()}
     }
 
 
-def _process_batch(batch_problems, logger):
+def _find_import_by_hash(file_hash: str, import_options: str) -> Optional[ImportHistory]:
+    """查找相同内容文件按相同选项的最近一次导入：已完成且保存了结果，或仍在处理中（未超时）"""
+    from config import Config
+
+    stale_seconds = getattr(Config, 'CSV_RESUME_STALE_SECONDS', 600)
+    histories = ImportHistory.query.filter(ImportHistory.file_hash == file_hash,
+                                           ImportHistory.import_options == import_options,
+                                           ImportHistory.status.in_(['completed', 'processing']))\
+        .order_by(ImportHistory.id.desc()).all()
+    for history in histories:
+        if history.status == 'completed' and history.result_summary:
+            return history
+        if history.status == 'processing' and not _is_resumable(history, stale_seconds):
+            return history
+    return None
+
+
+def _wait_for_import_result(history: ImportHistory, wait_seconds: float, poll_interval: float) -> Dict[str, Any]:
+    """
+    返回相同文件之前导入的结果；该导入仍在处理中时最多等待wait_seconds秒
+
+    Returns:
+        dict: 已完成导入保存的结果（reusedResult为True）；等待超时时返回inProgress为True的当前进度
+
+    Raises:
+        RuntimeError: 等待期间该导入失败
+    """
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        db.session.refresh(history)
+        status, result_summary = history.status, history.result_summary
+        # 结束读事务，避免SQLite的共享锁阻塞正在导入的进程提交
+        db.session.commit()
+        if status != 'processing' or time.monotonic() >= deadline:
+            break
+        time.sleep(poll_interval)
+
+    if status == 'completed' and result_summary:
+        result = json.loads(result_summary)
+        result['reusedResult'] = True
+        return result
+    if status == 'processing':
+        return {
+            'message': f'相同内容的文件正在导入中（导入记录 {history.id}）',
+            'inProgress': True,
+            'historyId': history.id,
+            'importedCount': history.processed_records or 0,
+            'failedCount': history.failed_records or 0,
+            'totalCount': history.total_records or 0,
+            'checkpointRow': history.checkpoint_row or 0,
+            'failedRecords': [],
+            'duplicateCount': 0,
+            'duplicateRecords': [],
+            'reusedResult': True
+        }
+    raise RuntimeError(f"相同内容文件的导入 {history.id} 失败，请续传该导入或重新上传并强制导入")
+
+def _read_text_sample(file_path: str, archive_member: Optional[str],
+                      state: '_ImportState') -> Tuple[str, str, List[Dict[str, Any]]]:
+    """
+    检测CSV文本的编码和分隔符，并读取用于推断日期格式的样本行
+
+    Returns:
+        Tuple: (编码, 分隔符, 样本行)，文件没有数据行时样本行为空列表
+
+    Raises:
+        ValueError: 无法识别编码或分隔符
+    """
+    from config import Config
+
+    # 尝试不同的编码格式读取CSV文件
+    encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin-1']
+    used_encoding = None
+    sample = ''
+    
+    with _import_stage(state, 'decode', 0):
+        for encoding in encodings:
+            try:
+                with open_csv_text(file_path, encoding, archive_member) as test_file:
+                    # 读取前2048字节用于检测CSV格式
+                    sample = test_file.read(2048)
+                    used_encoding = encoding
+                    break
+            except UnicodeDecodeError:
+                continue
+    
+        if used_encoding is None:
+            logger.error("无法识别文件编码")
+            raise ValueError("无法识别文件编码，请确保文件为文本格式")
+    
+        # 检测CSV格式
+        delimiter = _detect_csv_delimiter(sample)
+    if delimiter is None:
+        logger.error("无法检测CSV文件分隔符")
+        raise ValueError("无法检测CSV文件分隔符，请确保文件为有效的CSV格式")
+    
+    with _import_stage(state, 'decode', 0):
+        with open_csv_text(file_path, used_encoding, archive_member) as file:
+            reader = csv.DictReader(file, delimiter=delimiter)
+            sample_rows = list(islice(reader, getattr(Config, 'CSV_DATE_SAMPLE_ROWS', 200)))
+    return used_encoding, delimiter, sample_rows
+
+
+@contextmanager
+def _open_row_reader(file_path: str, encoding: Optional[str], delimiter: Optional[str], archive_member: Optional[str]):
+    """
+    打开数据源，返回 (文本文件, 逐行读取器)
+    CSV用readline逐行读取而不是迭代文件对象，以便通过file.tell()记录检查点的字节偏移；
+    列式文件（encoding为None）按记录批读取，文本文件为None
+    """
+    if encoding is None:
+        yield None, iter_columnar_rows(file_path)
+        return
+    with open_csv_text(file_path, encoding, archive_member) as file:
+        yield file, csv.DictReader(iter(file.readline, ''), delimiter=delimiter)
+
+
+class _ImportState:
+    """单次CSV导入过程中的计数器、查询缓存以及失败/重复记录"""
+
+    def __init__(self, fail_on_error: bool, duplicate_mode: str, duplicate_threshold: float,
+                 failed_records_preview: int = 20):
+        self.fail_on_error = fail_on_error
+        self.duplicate_mode = duplicate_mode
+        self.duplicate_threshold = duplicate_threshold
+        self.processed_count = 0
+        self.failed_count = 0
+        self.failed_records = []  # 前failed_records_preview条失败记录（全部记录写入拒绝文件）
+        self.failed_records_preview = failed_records_preview
+        self.reject_writer = None  # 失败记录的拒绝文件
+        self.validate_only = False  # 只验证：不写入数据库、不调用AI
+        self.skip_ai = False  # 跳过AI分析，由后台补充分析
+        self.ai_work_class = 'import'  # AI调度器中的工作类别，排在交互式分析之后
+        self.warning_count = 0  # 只验证时只有警告的行数
+        self.warning_records = []  # 只验证时前failed_records_preview条只有警告的行
+        self.duplicate_records = []  # 存储检测到的重复记录
+        self.seen_hashes = {}  # 本次导入中已出现的内容哈希 -> 首次出现的行号
+        self.equipment_types_cache = {}  # 缓存设备类型，避免重复查询
+        self.problem_categories_cache = {}  # 缓存问题分类，避免重复查询
+        self.solution_categories_cache = {}  # 缓存解决方案分类，避免重复查询
+        self.date_parser = _DateParser(None)  # 发现时间解析器，读取样本后替换为推断格式的解析器
+        self.stage_stats = {}  # 各阶段累计的 {'rows': 行数, 'seconds': 耗时}
+        self._unreported_stage_stats = {}  # 尚未上报到指标的阶段统计
+        self.import_history = None  # 本次导入的历史记录，用于写入检查点
+        self._checkpoint = None  # 下一批提交时写入的检查点 (行号, 字节偏移)
+
+    def set_checkpoint(self, row_num: int, offset: Optional[int] = None):
+        """设置下一批提交时写入的检查点：第row_num行及之前的行在该批提交后均已处理完毕"""
+        self._checkpoint = (row_num, offset)
+
+    def apply_checkpoint(self, written_count: int, failed_count: int = 0):
+        """
+        在当前事务中更新导入历史的检查点和计数，与该批数据一起提交（回滚时一起撤销）
+
+        Args:
+            written_count: 本批成功写入的行数
+            failed_count: 本批写入失败、尚未计入failed_count的行数
+        """
+        if self.import_history is None or self._checkpoint is None:
+            return
+        row_num, offset = self._checkpoint
+        self.import_history.checkpoint_row = row_num
+        self.import_history.checkpoint_offset = offset
+        self.import_history.checkpoint_failed = self.failed_count + failed_count
+        self.import_history.checkpoint_at = datetime.now()
+        self.import_history.processed_records = self.processed_count + written_count
+        self.import_history.failed_records = self.failed_count + failed_count
+        if self.reject_writer is not None:
+            self.reject_writer.flush()
+
+    def add_stage_time(self, stage: str, rows: int, seconds: float):
+        """累计某阶段的处理行数和耗时"""
+        for stats in (self.stage_stats, self._unreported_stage_stats):
+            entry = stats.setdefault(stage, {'rows': 0, 'seconds': 0.0})
+            entry['rows'] += rows
+            entry['seconds'] += seconds
+
+    def flush_stage_metrics(self):
+        """将累计的阶段统计上报到指标（按批上报，避免逐行更新指标）"""
+        for stage, entry in self._unreported_stage_stats.items():
+            record_import_stage(stage, entry['rows'], entry['seconds'])
+        self._unreported_stage_stats = {}
+
+    def record_failure(self, row_num: int, row: Dict[str, Any], errors: List[str], warnings: List[str]):
+        """记录一条失败的行：写入拒绝文件，内存中只保留前几条用于返回预览"""
+        self.failed_count += 1
+        record = {
+            'row': row_num,
+            'data': row,
+            'errors': errors,
+            'warnings': warnings
+        }
+        if self.reject_writer is not None:
+            self.reject_writer.write(record)
+        if len(self.failed_records) < self.failed_records_preview:
+            self.failed_records.append(record)
+
+
+@contextmanager
+def _import_stage(state: _ImportState, stage: str, rows: int):
+    """统计导入阶段的耗时，计入state.stage_stats"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        state.add_stage_time(stage, rows, time.perf_counter() - start_time)
+
+
+def _accept_validated_row(row_num: int, row: Dict[str, Any], cleaned_data: Dict[str, Any], row_errors: List[str],
+                          pending_rows: List[Tuple], state: _ImportState):
+    """
+    处理一行的清理验证结果：存在致命错误时记录失败（fail_on_error时抛出异常），
+    标题和描述都为空时跳过，否则加入待写入列表
+    """
+    # 区分错误严重程度：致命错误和警告
+    fatal_errors = [error for error in row_errors if _is_fatal_error(error)]
+    warnings = [error for error in row_errors if not _is_fatal_error(error)]
+
+    # 如果有致命错误，根据fail_on_error参数决定是否继续
+    if fatal_errors:
+        state.record_failure(row_num, row, fatal_errors, warnings)
+        logger.error(f'第 {row_num} 行存在致命错误: {fatal_errors}')
+        if state.fail_on_error:
+            raise ValueError(f"第 {row_num} 行存在致命错误: {fatal_errors}")
+        return  # 跳过此行，继续处理下一行
+
+    if warnings and state.validate_only:
+        state.warning_count += 1
+        if len(state.warning_records) < state.failed_records_preview:
+            state.warning_records.append({'row': row_num, 'warnings': warnings})
+
+    # 如果标题和描述都为空则跳过
+    if not cleaned_data['title'] and not cleaned_data['description']:
+        logger.debug(f"跳过第 {row_num} 行：标题和描述都为空")
+        return
+
+    pending_rows.append((row_num, row, cleaned_data, warnings))
+
+
+def _accept_validated_rows(validated_rows: List[Tuple], pending_rows: List[Tuple], batch_size: int,
+                           state: _ImportState) -> List[Tuple]:
+    """
+    按行号顺序处理一块清理验证结果，待写入行达到批量大小时写入
+
+    Args:
+        validated_rows: (行号, 原始数据, 清理后数据, 错误列表) 列表；清理后数据为None时最后一项为处理该行时的异常
+        pending_rows: 尚未写入的行
+        batch_size: 批量大小
+        state: 导入状态
+
+    Returns:
+        List[Tuple]: 剩余未写入的行
+    """
+    for row_num, row, cleaned_data, row_errors in validated_rows:
+        try:
+            if cleaned_data is None:
+                raise row_errors
+            _accept_validated_row(row_num, row, cleaned_data, row_errors, pending_rows, state)
+        except Exception as row_error:
+            _record_row_error(row_num, row, row_error, state)
+            continue
+
+        # 当批量达到指定大小时，处理并提交事务（检查点随该批一起提交）
+        if len(pending_rows) >= batch_size:
+            state.set_checkpoint(row_num)
+            _import_pending_rows(pending_rows, state)
+            pending_rows = []
+    return pending_rows
+
+
+def _record_row_error(row_num: int, row: Dict[str, Any], row_error: Exception, state: _ImportState):
+    """记录处理某一行时的异常，fail_on_error时重新抛出"""
+    logger.error(f'处理CSV第 {row_num} 行时出错: {str(row_error)}', exc_info=True)
+    state.record_failure(row_num, row, [f'第 {row_num} 行处理失败: {str(row_error)}'], [])
+    if state.fail_on_error:
+        raise row_error
+
+
+def _import_pending_rows(pending_rows: List[Tuple], state: _ImportState):
+    """
+    处理一批已清理的行：重复检测、设备类型解析、AI分析，然后批量写入数据库
+    
+    Args:
+        pending_rows: (行号, 原始数据, 清理后数据, 警告) 列表
+        state: 导入状态
+    """
+    try:
+        merged_count = 0
+        if state.duplicate_mode != 'off':
+            with _import_stage(state, 'dedupe', len(pending_rows)):
+                pending_rows, merged_count = _filter_duplicates(pending_rows, state)
+
+        if state.validate_only:
+            # 只验证：不解析设备类型、不调用AI、不写入，只统计导入时会写入的行数（与importedCount一致，不含合并的行）
+            state.processed_count += len(pending_rows)
+            return
+
+        batch_items = []  # (行号, 原始数据, 问题对象)
+        with _import_stage(state, 'build', len(pending_rows)):
+            for row_num, row, cleaned_data, warnings in pending_rows:
+                try:
+                    problem = _build_problem(row_num, row, cleaned_data, warnings, state)
+                    if problem is not None:
+                        batch_items.append((row_num, row, problem))
+                except Exception as row_error:
+                    logger.error(f'处理CSV第 {row_num} 行时出错: {str(row_error)}', exc_info=True)
+                    state.record_failure(row_num, row, [f'第 {row_num} 行处理失败: {str(row_error)}'], [])
+                    if state.fail_on_error:
+                        raise
+
+        if not batch_items and not merged_count:
+            return
+
+        try:
+            with _import_stage(state, 'write', len(batch_items)):
+                state.processed_count += _process_batch(batch_items, state)
+        except Exception as batch_error:
+            # 提交失败（或fail_on_error时整批写入失败）：批内所有行记为失败
+            for row_num, row, _ in batch_items:
+                state.record_failure(row_num, row, [f'第 {row_num} 行批量写入失败: {str(batch_error)}'], [])
+            if state.fail_on_error:
+                raise
+    finally:
+        state.flush_stage_metrics()
+
+
+def _get_equipment_type_id(equipment_type_name: str, state: _ImportState) -> Optional[int]:
+    """根据设备类型名称获取ID，不存在时自动创建，使用缓存避免重复查询"""
+    if not equipment_type_name:
+        return None
+    if equipment_type_name in state.equipment_types_cache:
+        return state.equipment_types_cache[equipment_type_name]
+    equipment_type = EquipmentType.query.filter_by(name=equipment_type_name).first()
+    if not equipment_type:
+        # 如果设备类型不存在，创建新的
+        equipment_type = EquipmentType(name=equipment_type_name)
+        db.session.add(equipment_type)
+        db.session.flush()  # 获取ID
+    state.equipment_types_cache[equipment_type_name] = equipment_type.id
+    return equipment_type.id
+
+
+def _build_problem(row_num: int, row: Dict[str, Any], cleaned_data: Dict[str, Any],
+                   warnings: List[str], state: _ImportState) -> Optional[Problem]:
     """
-    处理问题批量插入，包括向量数据库同步
+    根据清理后的行数据创建问题对象（包括设备类型解析和AI分析分类，skip_ai时不做AI分析）
+    
+    Returns:
+        Optional[Problem]: 问题对象；设备类型创建失败时返回None并记录失败
+    """
+    # 获取清理后的数据
+    title = cleaned_data['title']
+    description = cleaned_data['description']
+    equipment_type_name = cleaned_data['equipment_type_name']
+    phase = cleaned_data['phase']
+    priority = cleaned_data['priority']
+
+    # 根据设备类型名称获取ID，使用缓存
+    try:
+        with _import_stage(state, 'lookup', 1):
+            equipment_type_id = _get_equipment_type_id(equipment_type_name, state)
+    except Exception as et_error:
+        logger.error(f"创建设备类型失败: {str(et_error)}")
+        fatal_error_msg = f"第 {row_num} 行: 创建设备类型失败 - {str(et_error)}"
+        state.record_failure(row_num, row, [fatal_error_msg], warnings)
+        if state.fail_on_error:
+            raise ValueError(fatal_error_msg)
+        return None  # 跳过此行，继续处理下一行
+
+    # 创建问题记录
+    problem = Problem(
+        title=title,
+        description=description,
+        equipment_type_id=equipment_type_id,
+        phase=phase,
+        discovered_by=cleaned_data['discovered_by'],
+        discovered_at=cleaned_data['discovered_at'],
+        priority=priority  # 添加优先级字段
+    )
+
+    if state.skip_ai:
+        # 跳过AI分析：先写入使问题可被检索，分析和分类由后台补充分析任务完成
+        problem.ai_analyzed = False
+        return problem
+
+    _apply_ai_analysis(problem, equipment_type_name, state)
+    return problem
+
+
+def _apply_ai_analysis(problem: Problem, equipment_type_name: Optional[str], state: _ImportState):
+    """
+    使用AI分析问题，并按分析结果设置问题分类、解决方案分类和优先级
+    AI分析失败时标记为未分析并使用默认分类（导入时和后台补充分析时共用）
+    """
+    title = problem.title
+    description = problem.description
+    phase = problem.phase
+    priority = problem.priority
+
+    # 使用AI分析和分类
+    try:
+        with _import_stage(state, 'ai', 1), ai_work_class(state.ai_work_class):
+            ai_result = analyze_problem_with_ai(title, description, equipment_type=equipment_type_name, phase=phase)
+            problem.ai_analyzed = True
+            problem.ai_analysis = ai_result.get('analysis', '')
+
+            # 从AI响应中提取分类信息
+            category_info = extract_category_from_ai_response(
+                ai_result.get('analysis', ''),
+                title,
+                description
+            )
+        
+        with _import_stage(state, 'lookup', 0):
+            # 获取问题分类ID（使用缓存避免重复查询）
+            problem_category_id = category_info.get('problem_category_id')
+            if problem_category_id:
+                problem.problem_category_id = problem_category_id
+            else:
+                # 尝试从缓存中查找，如果不存在则创建默认分类
+                category_name = category_info.get('problem_category_name', '默认分类')
+                if category_name in state.problem_categories_cache:
+                    problem.problem_category_id = state.problem_categories_cache[category_name]
+                else:
+                    problem_category = ProblemCategory.query.filter_by(name=category_name).first()
+                    if not problem_category:
+                        problem_category = ProblemCategory(name=category_name, description='系统默认分类')
+                        db.session.add(problem_category)
+                        db.session.flush()
+                    problem.problem_category_id = problem_category.id
+                    state.problem_categories_cache[category_name] = problem_category.id
+
+            # 获取解决方案分类ID（使用缓存避免重复查询）
+            solution_category_id = category_info.get('solution_category_id')
+            if solution_category_id:
+                problem.solution_category_id = solution_category_id
+            else:
+                # 尝试从缓存中查找，如果不存在则创建默认分类
+                category_name = category_info.get('solution_category_name', '默认解决方案')
+                if category_name in state.solution_categories_cache:
+                    problem.solution_category_id = state.solution_categories_cache[category_name]
+                else:
+                    solution_category = SolutionCategory.query.filter_by(name=category_name).first()
+                    if not solution_category:
+                        solution_category = SolutionCategory(name=category_name, description='系统默认解决方案')
+                        db.session.add(solution_category)
+                        db.session.flush()
+                    problem.solution_category_id = solution_category.id
+                    state.solution_categories_cache[category_name] = solution_category.id
+
+        # 使用AI返回的优先级，但要验证它是否有效
+        ai_priority = category_info.get('priority', priority)  # 使用验证过的默认优先级
+        is_valid, error_msg = _validate_enum_value(ai_priority, ['low', 'medium', 'high', 'critical'], 'priority')
+        if is_valid:
+            problem.priority = ai_priority
+        else:
+            problem.priority = priority  # 使用验证过的默认优先级
+
+    except Exception as ai_error:
+        logger.error(f'AI分析失败: {str(ai_error)}', exc_info=True)
+        # AI分析失败时，仍然保存基础问题信息，但标记为未分析
+        problem.ai_analyzed = False
+        problem.ai_analysis = None
+        # 使用默认的分类ID（ID=1，通常是通用分类）或从数据库中获取一个有效ID
+        try:
+            # 确保问题分类有有效ID
+            if ProblemCategory.query.first() is None:
+                # 如果没有分类，创建一个默认分类
+                default_category = ProblemCategory(name='默认分类', description='系统默认问题分类')
+                db.session.add(default_category)
+                db.session.flush()
+                problem.problem_category_id = default_category.id
+            else:
+                # 使用第一个可用的问题分类
+                default_category = ProblemCategory.query.first()
+                problem.problem_category_id = default_category.id
+
+            # 确保解决方案分类有有效ID
+            if SolutionCategory.query.first() is None:
+                # 如果没有分类，创建一个默认分类
+                default_solution = SolutionCategory(name='默认解决方案', description='系统默认解决方案')
+                db.session.add(default_solution)
+                db.session.flush()
+                problem.solution_category_id = default_solution.id
+            else:
+                # 使用第一个可用的解决方案分类
+                default_solution = SolutionCategory.query.first()
+                problem.solution_category_id = default_solution.id
+        except Exception as cat_error:
+            logger.error(f'设置默认分类失败: {str(cat_error)}', exc_info=True)
+
+
+def _filter_duplicates(pending_rows: List[Tuple], state: _ImportState) -> Tuple[List[Tuple], int]:
+    """
+    检测一批待写入行中的重复问题
+    先按内容哈希精确匹配（数据库中已有问题 + 本次导入中已出现的行），
+    再对剩余行通过一次批量向量检索查找相似度超过阈值的近似重复（只验证时不做向量检索，也不合并）
     
     Args:
-        batch_problems: 问题列表
-        logger: 日志记录器
+        pending_rows: (行号, 原始数据, 清理后数据, 警告) 列表
+        state: 导入状态，包含重复处理模式（skip/merge/flag）和相似度阈值
+    
+    Returns:
+        Tuple[List[Tuple], int]: (仍需插入的行, 合并到已有问题的行数)
+    """
+    hashes = [compute_content_hash(cleaned['title'], cleaned['description']) for _, _, cleaned, _ in pending_rows]
+
+    # 精确匹配：一次查询取出所有命中的已有问题
+    existing_by_hash = dict(
+        db.session.query(Problem.content_hash, Problem.id)
+        .filter(Problem.content_hash.in_(set(hashes)))
+        .all()
+    )
+
+    # 近似匹配：对未精确命中的行一次性批量检索最相近的已有问题
+    near_matches = {}
+    candidates = [i for i, content_hash in enumerate(hashes)
+                  if content_hash not in existing_by_hash and content_hash not in state.seen_hashes]
+    if candidates and not state.validate_only:
+        try:
+            queries = [f"{pending_rows[i][2]['title']} {pending_rows[i][2]['description']}".strip()
+                       for i in candidates]
+            results = get_vector_db().search_many(queries, k=1, min_similarity=state.duplicate_threshold)
+            for i, matches in zip(candidates, results):
+                if matches:
+                    near_matches[i] = matches[0]
+        except Exception as vector_error:
+            logger.warning(f'向量近似重复检测失败，仅使用内容哈希检测: {str(vector_error)}')
+
+    # 合并模式：一次查询加载所有可能合并到的已有问题
+    merge_targets = {}
+    if state.duplicate_mode == 'merge':
+        target_ids = set(existing_by_hash.values())
+        target_ids.update(int(match['id']) for match in near_matches.values() if str(match['id']).isdigit())
+        if target_ids:
+            merge_targets = {problem.id: problem
+                             for problem in Problem.query.filter(Problem.id.in_(target_ids)).all()}
+
+    remaining_rows = []
+    merged_count = 0
+    for i, (row_num, row, cleaned_data, warnings) in enumerate(pending_rows):
+        content_hash = hashes[i]
+        duplicate = None
+        if content_hash in existing_by_hash:
+            duplicate = {'match': 'exact', 'duplicate_of': existing_by_hash[content_hash], 'similarity': 1.0}
+        elif content_hash in state.seen_hashes:
+            duplicate = {'match': 'exact', 'duplicate_of_row': state.seen_hashes[content_hash], 'similarity': 1.0}
+        elif i in near_matches:
+            match = near_matches[i]
+            match_id = int(match['id']) if str(match['id']).isdigit() else match['id']
+            duplicate = {'match': 'similar', 'duplicate_of': match_id,
+                         'similarity': round(match['similarity_score'], 4)}
+        state.seen_hashes.setdefault(content_hash, row_num)
+
+        if duplicate is None:
+            remaining_rows.append((row_num, row, cleaned_data, warnings))
+            continue
+
+        if state.duplicate_mode == 'flag':
+            # 标记模式：照常导入，仅在结果中报告
+            action = 'flagged'
+            remaining_rows.append((row_num, row, cleaned_data, warnings))
+        elif state.duplicate_mode == 'merge' and duplicate.get('duplicate_of') is not None:
+            existing = merge_targets.get(duplicate['duplicate_of'])
+            if existing is not None:
+                if not state.validate_only:
+                    _merge_duplicate(existing, cleaned_data, state)
+                merged_count += 1
+                action = 'merged'
+            else:
+                action = 'skipped'
+        else:
+            action = 'skipped'
+
+        state.duplicate_records.append({'row': row_num, 'data': row, **duplicate, 'action': action})
+        logger.info(f'第 {row_num} 行为重复问题({duplicate["match"]})，处理方式: {action}')
+
+    return remaining_rows, merged_count
+
+
+_PRIORITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+def _merge_duplicate(existing: Problem, cleaned_data: Dict[str, Any], state: _ImportState):
+    """
+    将重复行的补充信息合并到已有问题：只填充已有问题中的空字段，优先级取两者中较高者
     """
+    if not existing.description and cleaned_data['description']:
+        existing.description = cleaned_data['description']
+    if not existing.equipment_type_id and cleaned_data['equipment_type_name']:
+        existing.equipment_type_id = _get_equipment_type_id(cleaned_data['equipment_type_name'], state)
+    if not existing.discovered_by and cleaned_data['discovered_by']:
+        existing.discovered_by = cleaned_data['discovered_by']
+    if not existing.discovered_at and cleaned_data['discovered_at']:
+        existing.discovered_at = cleaned_data['discovered_at']
+    new_priority = (cleaned_data['priority'] or '').lower()
+    if _PRIORITY_RANK.get(new_priority, -1) > _PRIORITY_RANK.get(existing.priority, -1):
+        existing.priority = new_priority
+
+
+def _process_batch(batch_items: List[Tuple], state: _ImportState) -> int:
+    """
+    批量写入一批问题并提交
+    向量数据库同步记录由发件箱在同一事务中写入，由后台任务批量处理；导入检查点随该批一起提交
+    整批先在一个保存点中写入；失败（如违反约束）时只回滚该保存点，再逐行在各自的保存点中重试，
+    出错的行记为失败，其余行照常提交，本批之前创建的设备类型、分类不受影响
+    
+    Args:
+        batch_items: (行号, 原始数据, 问题对象) 列表
+        state: 导入状态
+    
+    Returns:
+        int: 成功写入的行数
+    """
+    row_failures = []  # (行号, 原始数据, 异常)
     try:
-        # 批量添加问题到数据库
-        for problem in batch_problems:
-            db.session.add(problem)
-        db.session.flush()  # 获取问题ID但不提交事务
+        try:
+            with db.session.begin_nested():
+                db.session.add_all([problem for _, _, problem in batch_items])
+                db.session.flush()  # 获取问题ID但不提交事务
+        except Exception as batch_error:
+            if state.fail_on_error:
+                raise
+            logger.warning(f'整批写入失败，改为逐行写入以隔离出错的行: {str(batch_error)}')
+            for row_num, row, problem in batch_items:
+                try:
+                    with db.session.begin_nested():
+                        db.session.add(problem)
+                        db.session.flush()
+                except Exception as row_error:
+                    logger.error(f'第 {row_num} 行写入失败: {str(row_error)}')
+                    row_failures.append((row_num, row, row_error))
 
-        # 提交数据库事务
-        db.session.commit()
+        written_count = len(batch_items) - len(row_failures)
+        state.apply_checkpoint(written_count, len(row_failures))
 
-        # 将问题添加到向量数据库（异步处理或批量处理以提高性能）
-        for problem in batch_problems:
-            try:
-                success = problem.save_to_vector_db()
-                if not success:
-                    logger.warning(f"无法将问题 {problem.id} 保存到向量数据库")
-            except Exception as vector_error:
-                logger.error(f"保存问题 {problem.id} 到向量数据库失败: {str(vector_error)}")
+        # 提交数据库事务（问题与发件箱记录、检查点一起提交）
+        db.session.commit()
 
     except Exception as batch_error:
         logger.error(f'批量处理问题时出错: {str(batch_error)}', exc_info=True)
         db.session.rollback()
         raise
 
+    for row_num, row, row_error in row_failures:
+        state.record_failure(row_num, row, [f'第 {row_num} 行写入失败: {str(row_error)}'], [])
+    return written_count
+
 
 def _validate_enum_value(value: str, valid_values: List[str], field_name: str) -> Tuple[bool, str]:
     """
@@ -532,13 +1219,15 @@ def _validate_enum_value(value: str, valid_values: List[str], field_name: str) -
         return False, f"字段 '{field_name}' 包含无效的枚举值 '{value}'，有效值: {valid_values}"
 
 
-def _clean_and_validate_data(row_data: Dict[str, Any], row_num: int) -> Tuple[Dict[str, Any], List[str]]:
+def _clean_and_validate_data(row_data: Dict[str, Any], row_num: int,
+                             date_parser: '_DateParser' = None) -> Tuple[Dict[str, Any], List[str]]:
     """
     清理和验证CSV行数据，增强错误处理和边界情况处理
 
     Args:
         row_data: CSV行数据字典
         row_num: 行号，用于错误报告
+        date_parser: 发现时间解析器（按文件推断的日期格式），为None时逐个格式尝试
 
     Returns:
         Tuple[Dict[str, Any], List[str]]: (清理后的数据, 错误列表)
@@ -573,16 +1262,15 @@ def _clean_and_validate_data(row_data: Dict[str, Any], row_num: int) -> Tuple[Di
     # 解析并验证发现时间
     discovered_at_str = row_data.get('discovered_at') or row_data.get('发现时间')
     discovered_at = None
-    if discovered_at_str:
+    if isinstance(discovered_at_str, date):
+        # 列式文件中的日期/时间戳列已带类型，无需解析
+        discovered_at = discovered_at_str.date() if isinstance(discovered_at_str, datetime) else discovered_at_str
+    elif discovered_at_str:
         try:
-            # 尝试多种日期格式
-            date_formats = ['%Y-%m-%d', '%Y/%m/%d', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S', '%Y.%m.%d']
-            for fmt in date_formats:
-                try:
-                    discovered_at = datetime.strptime(str(discovered_at_str), fmt).date()
-                    break
-                except ValueError:
-                    continue
+            if date_parser is not None:
+                discovered_at = date_parser.parse(str(discovered_at_str))
+            else:
+                discovered_at = _parse_date_any_format(str(discovered_at_str))[0]
             if discovered_at is None:
                 logger.warning(f"第 {row_num} 行: 日期格式无效 '{discovered_at_str}'，使用默认值")
         except Exception as date_error:
@@ -604,10 +1292,8 @@ def _clean_and_validate_data(row_data: Dict[str, Any], row_num: int) -> Tuple[Di
     total_chars = 0
     for field in text_fields:
         if field:
-            import re
             # 计算特殊字符数量（除字母、数字、中文外的字符）
-            special_chars = re.sub(r'[\w\u4e00-\u9fff]', '', field)
-            special_chars_count += len(special_chars)
+            special_chars_count += count_special_chars(field)
             total_chars += len(field)
 
     if total_chars > 0 and special_chars_count / total_chars > special_char_threshold:
@@ -627,6 +1313,77 @@ def _clean_and_validate_data(row_data: Dict[str, Any], row_num: int) -> Tuple[Di
     return cleaned_data, errors
 
 
+# 支持的发现时间格式，逐个尝试时按此顺序取第一个能解析的格式
+DATE_FORMATS = ['%Y-%m-%d', '%Y/%m/%d', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S', '%Y.%m.%d']
+
+# 各格式的快速解析正则：只接受标准位数的ASCII数字。能匹配时，排在前面的格式都无法解析该值，
+# 因此结果与逐个格式尝试一致；不匹配（如单位数月份）时回退到逐个格式尝试
+_FAST_DATE_PATTERNS = {
+    '%Y-%m-%d': re.compile(r'(?P<y>[0-9]{4})-(?P<m>[0-9]{2})-(?P<d>[0-9]{2})'),
+    '%Y/%m/%d': re.compile(r'(?P<y>[0-9]{4})/(?P<m>[0-9]{2})/(?P<d>[0-9]{2})'),
+    '%d/%m/%Y': re.compile(r'(?P<d>[0-9]{2})/(?P<m>[0-9]{2})/(?P<y>[0-9]{4})'),
+    '%d-%m-%Y': re.compile(r'(?P<d>[0-9]{2})-(?P<m>[0-9]{2})-(?P<y>[0-9]{4})'),
+    '%Y-%m-%d %H:%M:%S': re.compile(r'(?P<y>[0-9]{4})-(?P<m>[0-9]{2})-(?P<d>[0-9]{2}) '
+                                    r'(?P<H>[01][0-9]|2[0-3]):(?P<M>[0-5][0-9]):(?P<S>[0-5][0-9])'),
+    '%Y.%m.%d': re.compile(r'(?P<y>[0-9]{4})\.(?P<m>[0-9]{2})\.(?P<d>[0-9]{2})'),
+}
+
+
+def _parse_date_any_format(value: str) -> Tuple[Optional[date], Optional[str]]:
+    """
+    依次尝试所有支持的日期格式
+
+    Returns:
+        Tuple[Optional[date], Optional[str]]: (解析结果, 匹配的格式)，都无法解析时返回 (None, None)
+    """
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date(), fmt
+        except ValueError:
+            continue
+    return None, None
+
+
+def _infer_date_format(values) -> Optional[str]:
+    """
+    根据列样本推断日期格式：取样本中各值首个可解析格式里出现最多的一个
+
+    Args:
+        values: 样本值（空值会被忽略）
+
+    Returns:
+        Optional[str]: 推断的格式，样本中没有可解析的值时返回None
+    """
+    counts = Counter()
+    for value in values:
+        if value:
+            fmt = _parse_date_any_format(str(value))[1]
+            if fmt is not None:
+                counts[fmt] += 1
+    return counts.most_common(1)[0][0] if counts else None
+
+
+class _DateParser:
+    """按文件推断的日期格式解析发现时间：先用该格式的快速解析，不匹配时回退到逐个格式尝试"""
+
+    def __init__(self, date_format: Optional[str]):
+        self.date_format = date_format
+        self.fast_pattern = _FAST_DATE_PATTERNS.get(date_format)
+        self.fallback_count = 0  # 回退到逐个格式尝试的次数
+
+    def parse(self, value: str) -> Optional[date]:
+        """解析日期，无法解析时返回None"""
+        if self.fast_pattern is not None:
+            match = self.fast_pattern.fullmatch(value)
+            if match is not None:
+                try:
+                    return date(int(match.group('y')), int(match.group('m')), int(match.group('d')))
+                except ValueError:
+                    pass  # 日期不存在（如2月30日），交给逐个格式尝试得出相同结论
+        self.fallback_count += 1
+        return _parse_date_any_format(value)[0]
+
+
 def _is_fatal_error(error_msg: str) -> bool:
     """
     判断错误是否为致命错误，需要阻止记录导入
@@ -654,7 +1411,7 @@ def _is_fatal_error(error_msg: str) -> bool:
 
 def _sanitize_input(input_str: str) -> str:
     """
-    清理输入字符串，移除潜在的危险字符
+    清理输入字符串，移除潜在的危险字符（实现见sanitizer模块）
 
     Args:
         input_str: 输入字符串
@@ -662,30 +1419,7 @@ def _sanitize_input(input_str: str) -> str:
     Returns:
         str: 清理后的字符串
     """
-    if input_str is None:
-        return ''  # 统一返回空字符串而不是None，避免后续处理问题
-
-    if not input_str:
-        return ''
-
-    # 确保输入是字符串
-    input_str = str(input_str)
-
-    # 移除潜在的危险字符和脚本标签
-    import re
-    # 移除潜在的恶意内容
-    sanitized = re.sub(r'<script[^>]*>.*?</script>', '', input_str, flags=re.IGNORECASE|re.DOTALL)
-    sanitized = re.sub(r'javascript:', '', sanitized, flags=re.IGNORECASE)
-    sanitized = re.sub(r'vbscript:', '', sanitized, flags=re.IGNORECASE)
-    sanitized = re.sub(r'on\w+\s*=', '', sanitized, flags=re.IGNORECASE)  # 移除事件处理器
-    sanitized = re.sub(r'<iframe[^>]*>.*?</iframe>', '', sanitized, flags=re.IGNORECASE|re.DOTALL)  # 移除iframe
-    sanitized = re.sub(r'<object[^>]*>.*?</object>', '', sanitized, flags=re.IGNORECASE|re.DOTALL)  # 移除object
-    sanitized = re.sub(r'<embed[^>]*>.*?</embed>', '', sanitized, flags=re.IGNORECASE|re.DOTALL)  # 移除embed
-    sanitized = re.sub(r'eval\s*\(', '', sanitized, flags=re.IGNORECASE)  # 移除eval函数调用
-    sanitized = re.sub(r'document\.cookie', '', sanitized, flags=re.IGNORECASE)  # 移除document.cookie访问
-
-    # 返回清理后的字符串，防止其他类型的注入
-    return sanitized.strip()
+    return sanitize_input(input_str)
 
 
 def save_failed_records_to_csv(failed_records: List[Dict], output_file_path: str = None) -> str:
@@ -734,12 +1468,13 @@ def save_failed_records_to_csv(failed_records: List[Dict], output_file_path: str
     return output_file_path
 
 
-def validate_csv_headers(file_path: str) -> Dict[str, Any]:
+def validate_csv_headers(file_path: str, archive_member: str = None) -> Dict[str, Any]:
     """
     验证CSV文件的列头是否符合要求，包括枚举值验证
 
     Args:
-        file_path: CSV文件路径
+        file_path: CSV文件路径（支持.csv.gz和Parquet/Arrow列式文件）
+        archive_member: file_path为zip压缩包时要验证的CSV文件名
 
     Returns:
         dict: 包含验证结果的字典
@@ -748,15 +1483,24 @@ def validate_csv_headers(file_path: str) -> Dict[str, Any]:
         ['title', 'problem', 'issue', '标题', '问题', 'title*', 'problem*', 'issue*'],  # 至少包含其中之一
         ['description', 'reason', 'analysis', '描述', '原因', '分析', 'description*', 'reason*', 'analysis*']  # 至少包含其中之一
     ]
+
+    if columnar_format(file_path) is not None:
+        # 列式文件只读取元数据中的列名，值已带类型，不检查第一行
+        headers = [name.strip().lower() for name in read_column_names(file_path)]
+        missing_required = [' 或 '.join(group) for group in required_headers if not any(h in headers for h in group)]
+        if missing_required:
+            logger.info(f"列式文件缺少必需的列: {', '.join(missing_required)}")
+            return {'valid': False, 'message': f'缺少必需的列: {", ".join(missing_required)}', 'headers': headers}
+        return {'valid': True, 'message': 'CSV文件格式验证通过', 'headers': headers}
     
-    # 尝试不同的编码格式读取CSV文件
+    # 尝试不同的编码格式读取CSV文件开头（只检查列头和第一行，不读取整个文件）
     encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'latin-1']
     file_content = None
     
     for encoding in encodings:
         try:
-            with open(file_path, 'r', encoding=encoding) as file:
-                file_content = file.read()
+            with open_csv_text(file_path, encoding, archive_member) as file:
+                file_content = file.read(HEADER_SAMPLE_SIZE)
                 break
         except UnicodeDecodeError:
             continue
@@ -804,7 +1548,7 @@ def validate_csv_headers(file_path: str) -> Dict[str, Any]:
 
     # 额外验证：检查可选列是否使用了正确的枚举值
     validation_warnings = []
-    for row in csv.DictReader(io.StringIO(file_content), delimiter=delimiter):
+    for row in reader:
         # 验证阶段字段
         phase_value = row.get('phase') or row.get('stage') or row.get('阶段')
         if phase_value:
@@ -836,3 +1580,169 @@ def validate_csv_headers(file_path: str) -> Dict[str, Any]:
         'message': 'CSV文件格式验证通过',
         'headers': headers
     }
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """按块计算文件的SHA-256（不一次性读入内存）"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_resumable(history: ImportHistory, stale_seconds: int) -> bool:
+    """失败的导入，或检查点（没有检查点时为开始时间）超过stale_seconds未更新、视为进程已退出的处理中导入"""
+    if history.status == 'failed':
+        return True
+    if history.status != 'processing':
+        return False
+    last_activity = history.checkpoint_at or history.started_at
+    return last_activity is None or (datetime.now() - last_activity).total_seconds() >= stale_seconds
+
+
+def find_resumable_imports() -> List[ImportHistory]:
+    """列出源文件仍然存在、可以续传的导入历史记录"""
+    from config import Config
+
+    stale_seconds = getattr(Config, 'CSV_RESUME_STALE_SECONDS', 600)
+    histories = ImportHistory.query.filter(ImportHistory.status.in_(['processing', 'failed']),
+                                           ImportHistory.source_path.isnot(None))\
+        .order_by(ImportHistory.id).all()
+    return [history for history in histories
+            if _is_resumable(history, stale_seconds) and os.path.exists(history.source_path)]
+
+
+def resume_import(history_id: int, force: bool = False, remove_source: bool = True) -> Dict[str, Any]:
+    """
+    从检查点之后继续一次中断的CSV导入，已提交的行不会重新分析或写入
+
+    Args:
+        history_id: 导入历史记录ID
+        force: 是否跳过“处理中”导入的超时检查（确认原进程已经退出时使用）
+        remove_source: 续传完成后是否删除源文件
+
+    Returns:
+        dict: 与import_csv_file()相同的导入结果（计数包含检查点之前的部分）
+
+    Raises:
+        LookupError: 导入历史记录不存在
+        ValueError: 导入已完成、仍在处理中或源文件已变化
+        FileNotFoundError: 源文件不存在
+    """
+    from config import Config
+
+    history = db.session.get(ImportHistory, history_id)
+    if history is None:
+        raise LookupError(f"导入记录不存在: {history_id}")
+    stale_seconds = 0 if force else getattr(Config, 'CSV_RESUME_STALE_SECONDS', 600)
+    if not _is_resumable(history, stale_seconds):
+        raise ValueError(f"导入记录 {history_id} 状态为 {history.status}，无法续传")
+    if not history.source_path or not os.path.exists(history.source_path):
+        raise FileNotFoundError(f"导入源文件不存在: {history.source_path}")
+
+    options = json.loads(history.import_options or '{}')
+    result = import_csv_file(history.source_path, fail_on_error=options.get('fail_on_error', False),
+                             duplicate_mode=options.get('duplicate_mode'),
+                             duplicate_threshold=options.get('duplicate_threshold'),
+                             engine=options.get('engine'), resume_from=history,
+                             archive_member=options.get('archive_member'), skip_ai=options.get('skip_ai', False))
+    # 压缩包中其他CSV文件的导入尚未完成时保留源文件
+    unfinished = ImportHistory.query.filter(ImportHistory.source_path == history.source_path,
+                                            ImportHistory.status != 'completed').count()
+    if remove_source and not unfinished:
+        try:
+            os.remove(history.source_path)
+        except OSError as e:
+            logger.error(f'删除导入源文件失败: {str(e)}')
+    return result
+
+
+def import_csv_archive(file_path: str, workers: int = None, **import_options) -> Dict[str, Any]:
+    """
+    导入zip压缩包中的全部CSV文件：每个CSV作为独立的子导入（各自的导入历史、检查点和拒绝文件），
+    在线程池中并行处理，成员数据边读边解压，不写入磁盘
+
+    Args:
+        file_path: zip压缩包路径
+        workers: 并行处理的CSV文件数，默认使用配置值CSV_ARCHIVE_WORKERS（SQLite数据库时固定为1）
+        **import_options: 传给import_csv_file()的其他选项
+
+    Returns:
+        dict: 各子导入计数的合计，files中为每个CSV文件的导入结果（失败时为error）
+
+    Raises:
+        ValueError: 不是有效的zip文件、不包含CSV文件或超过数量/大小限制
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from flask import current_app
+    from config import Config
+
+    members = list_archive_csv_members(file_path)
+    if not members:
+        raise ValueError("压缩包中没有CSV文件")
+    workers = max(1, min(workers or getattr(Config, 'CSV_ARCHIVE_WORKERS', 4), len(members)))
+    if db.engine.dialect.name == 'sqlite' and workers > 1:
+        # SQLite同一时间只允许一个写事务，并行的子导入批量提交时会因数据库被锁而失败
+        logger.info('SQLite数据库不支持并行写入，压缩包中的CSV文件依次导入')
+        workers = 1
+    app = current_app._get_current_object()
+
+    def import_member(member: str) -> Dict[str, Any]:
+        # 每个线程使用独立的应用上下文和数据库会话
+        with app.app_context():
+            try:
+                validation = validate_csv_headers(file_path, archive_member=member)
+                if not validation['valid']:
+                    return {'file': member, 'error': f"CSV文件格式错误: {validation['message']}"}
+                return {'file': member, **import_csv_file(file_path, archive_member=member, **import_options)}
+            except Exception as e:
+                logger.error(f'导入压缩包中的CSV文件失败: {member}: {str(e)}', exc_info=True)
+                return {'file': member, 'error': str(e)}
+
+    logger.info(f'开始导入压缩包 {file_path}: {len(members)} 个CSV文件，并行数 {workers}')
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(import_member, members))
+
+    totals = {key: sum(result.get(key, 0) for result in results)
+              for key in ('importedCount', 'failedCount', 'totalCount', 'duplicateCount')}
+    failed_files = sum(1 for result in results if 'error' in result)
+    message = (f'压缩包导入完成，共 {len(members)} 个CSV文件，成功处理 {totals["importedCount"]} 条，'
+               f'失败 {totals["failedCount"]} 条')
+    if failed_files:
+        message += f'，{failed_files} 个文件导入失败'
+    return {
+        'message': message,
+        **totals,
+        'fileCount': len(members),
+        'failedFileCount': failed_files,
+        'files': results
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description='续传中断的CSV导入，或只验证CSV文件')
+    parser.add_argument('history_id', type=int, nargs='?', help='要续传的导入历史记录ID（省略时列出可续传的导入）')
+    parser.add_argument('--force', action='store_true', help='不等待超时，直接续传处于处理中状态的导入')
+    parser.add_argument('--keep-file', action='store_true', help='续传完成后保留源文件')
+    parser.add_argument('--validate', metavar='CSV_FILE', help='只验证指定的CSV文件（相对路径），输出验证报告，不导入')
+    parser.add_argument('--engine', help='只验证时使用的清理验证引擎（python/pandas/process）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        if args.validate:
+            summary = import_csv_file(args.validate, engine=args.engine, validate_only=True)
+        elif args.history_id is None:
+            summary = [{'id': history.id, 'filename': history.filename, 'status': history.status,
+                        'checkpointRow': history.checkpoint_row, 'processedRecords': history.processed_records,
+                        'checkpointAt': history.checkpoint_at.isoformat() if history.checkpoint_at else None}
+                       for history in find_resumable_imports()]
+        else:
+            summary = resume_import(args.history_id, force=args.force, remove_source=not args.keep_file)
+            summary.pop('failedRecords', None)
+            summary.pop('duplicateRecords', None)
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
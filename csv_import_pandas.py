@@ -0,0 +1,176 @@
+"""
+CSV导入的pandas引擎
+按块读取CSV，以列为单位完成别名解析、输入清理、枚举验证、长度截断、日期解析和特殊字符比例检查，
+结果（清理后数据、错误信息及其顺序）与逐行的_clean_and_validate_data()一致，之后交给相同的批量写入流程
+"""
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple, Union
+
+import pandas as pd
+
+from config import Config
+from csv_import import _DateParser, _validate_enum_value
+from sanitizer import sanitize_input
+
+logger = logging.getLogger(__name__)
+
+# 各字段的列别名，顺序与_clean_and_validate_data中的 row.get(a) or row.get(b) 一致
+TITLE_COLUMNS = ('title', 'problem', 'issue', '标题', '问题')
+DESCRIPTION_COLUMNS = ('description', 'reason', 'analysis', '描述', '原因', '分析')
+EQUIPMENT_TYPE_COLUMNS = ('equipment_type', 'device_type', '设备类型')
+PHASE_COLUMNS = ('phase', 'stage', '阶段')
+DISCOVERED_BY_COLUMNS = ('discovered_by', '发现者')
+DISCOVERED_AT_COLUMNS = ('discovered_at', '发现时间')
+PRIORITY_COLUMNS = ('priority', '优先级')
+
+VALID_PHASES = ['design', 'development', 'usage', 'maintenance']
+VALID_PRIORITIES = ['low', 'medium', 'high', 'critical']
+
+# 可能需要清理的字段（包含任一清理规则必需的字符），其余字段只需去除首尾空白
+_SANITIZE_CANDIDATE_PATTERN = r'[<:=(.]'
+_SPECIAL_CHAR_PATTERN = r'[^\w\u4e00-\u9fff]'
+
+
+def read_csv_chunks(source: Union[str, BinaryIO], encoding: str, delimiter: str,
+                    chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    按块读取CSV，所有值保持为字符串
+    与csv.DictReader的差异：行内缺少的字段为''（csv.DictReader为None），字段数多于表头的行无法解析，此时抛出ValueError
+
+    Args:
+        source: CSV文件路径或二进制流（如边读边解压的压缩文件），读取结束后关闭
+    """
+    try:
+        reader = pd.read_csv(source, encoding=encoding, sep=delimiter, dtype=object, keep_default_na=False,
+                             chunksize=chunk_size, skip_blank_lines=True)
+        with reader:
+            yield from reader
+    except pd.errors.ParserError as e:
+        raise ValueError(f"CSV解析失败: {str(e)}") from e
+    finally:
+        if not isinstance(source, str):
+            source.close()
+
+
+def _coalesce(frame: pd.DataFrame, columns: Tuple[str, ...]) -> pd.Series:
+    """按别名优先级取第一个非空值，都为空时为''"""
+    result = pd.Series('', index=frame.index, dtype=object)
+    for column in reversed(columns):
+        if column in frame.columns:
+            values = frame[column]
+            result = values.where(values != '', result)
+    return result
+
+
+def _sanitize_column(values: pd.Series) -> pd.Series:
+    """逐列清理：只对可能命中清理规则的值调用sanitize_input，其余值直接去除首尾空白"""
+    result = values.str.strip()
+    candidates = values.str.contains(_SANITIZE_CANDIDATE_PATTERN, regex=True)
+    if candidates.any():
+        result[candidates] = values[candidates].map(sanitize_input)
+    return result
+
+
+def _validate_enum_column(values: pd.Series, valid_values: List[str], field_name: str,
+                          default: str) -> Tuple[pd.Series, pd.Series]:
+    """
+    逐列枚举验证（空值视为有效，大小写不敏感）
+
+    Returns:
+        Tuple[pd.Series, pd.Series]: (无效值替换为默认值后的列, 无效行的错误信息列（有效行为None）)
+    """
+    valid = (values == '') | values.str.lower().isin([value.lower() for value in valid_values])
+    messages = pd.Series([None] * len(values), index=values.index, dtype=object)
+    if not valid.all():
+        messages[~valid] = values[~valid].map(lambda value: _validate_enum_value(value, valid_values, field_name)[1])
+    return values.where(valid, default), messages
+
+
+def _parse_date_column(values: pd.Series, date_parser: _DateParser) -> pd.Series:
+    """
+    逐列解析发现时间：符合推断格式的值整列转换，其余非空值逐个交给date_parser（与逐行解析结果一致）
+    """
+    result = pd.Series([None] * len(values), index=values.index, dtype=object)
+    pending = values != ''
+    if date_parser.fast_pattern is not None and pending.any():
+        parts = values[pending].str.extract(rf'^(?:{date_parser.fast_pattern.pattern})\Z')
+        matched = parts['y'].notna()
+        if matched.any():
+            components = parts.loc[matched, ['y', 'm', 'd']].astype(int)
+            components.columns = ['year', 'month', 'day']
+            # 不存在的日期或超出pandas时间范围的年份为NaT，交给逐个解析
+            parsed = pd.to_datetime(components, errors='coerce')
+            parsed = parsed[parsed.notna()]
+            result[parsed.index] = parsed.dt.date
+            pending[parsed.index] = False
+    if pending.any():
+        result[pending] = values[pending].map(date_parser.parse)
+    return result
+
+
+def clean_and_validate_frame(frame: pd.DataFrame, first_row_num: int,
+                             date_parser: _DateParser) -> List[Tuple[int, Dict[str, Any], Dict[str, Any], List[str]]]:
+    """
+    以列为单位清理和验证一块CSV数据
+
+    Args:
+        frame: read_csv_chunks读取的一块数据
+        first_row_num: 该块第一行的行号
+        date_parser: 发现时间解析器
+
+    Returns:
+        List[Tuple]: 每行一个 (行号, 原始数据, 清理后数据, 错误列表)，与逐行调用_clean_and_validate_data的结果一致
+    """
+    columns = list(frame.columns)
+    raw_rows = [dict(zip(columns, values)) for values in frame.itertuples(index=False, name=None)]
+
+    title = _sanitize_column(_coalesce(frame, TITLE_COLUMNS)).str.slice(0, getattr(Config, 'CSV_TITLE_MAX_LENGTH', 500))
+    description = _sanitize_column(_coalesce(frame, DESCRIPTION_COLUMNS)).str.slice(
+        0, getattr(Config, 'CSV_DESCRIPTION_MAX_LENGTH', 2000))
+    equipment_type_name = _sanitize_column(_coalesce(frame, EQUIPMENT_TYPE_COLUMNS)).str.slice(
+        0, getattr(Config, 'CSV_EQUIPMENT_TYPE_MAX_LENGTH', 100))
+    discovered_by = _sanitize_column(_coalesce(frame, DISCOVERED_BY_COLUMNS))
+
+    phase = _sanitize_column(_coalesce(frame, PHASE_COLUMNS).replace('', 'design'))
+    phase, phase_errors = _validate_enum_column(phase, VALID_PHASES, 'phase', 'design')
+    priority = _sanitize_column(_coalesce(frame, PRIORITY_COLUMNS).replace('', 'medium'))
+    priority, priority_errors = _validate_enum_column(priority, VALID_PRIORITIES, 'priority', 'medium')
+
+    discovered_at_str = _coalesce(frame, DISCOVERED_AT_COLUMNS)
+    discovered_at = _parse_date_column(discovered_at_str, date_parser)
+
+    # 特殊字符比例：标题、描述、设备类型、发现者合计（拼接后统一统计一次）
+    combined_text = title + description + equipment_type_name + discovered_by
+    special_chars_count = combined_text.str.count(_SPECIAL_CHAR_PATTERN)
+    total_chars = combined_text.str.len()
+    special_char_threshold = getattr(Config, 'CSV_SPECIAL_CHAR_THRESHOLD', 0.5)
+    polluted = (special_chars_count / total_chars.where(total_chars > 0)) > special_char_threshold
+
+    results = []
+    for offset, values in enumerate(zip(raw_rows, title.str.strip(), description.str.strip(),
+                                        equipment_type_name.str.strip(), phase, discovered_by.str.strip(),
+                                        discovered_at, priority, phase_errors, priority_errors, polluted,
+                                        discovered_at_str)):
+        (raw_row, row_title, row_description, row_equipment_type, row_phase, row_discovered_by, row_discovered_at,
+         row_priority, phase_error, priority_error, row_polluted, row_discovered_at_str) = values
+        row_num = first_row_num + offset
+        errors = []
+        if phase_error is not None:
+            errors.append(f"第 {row_num} 行: {phase_error}")
+        if row_discovered_at_str and row_discovered_at is None:
+            logger.warning(f"第 {row_num} 行: 日期格式无效 '{row_discovered_at_str}'，使用默认值")
+        if priority_error is not None:
+            errors.append(f"第 {row_num} 行: {priority_error}")
+        if row_polluted:
+            errors.append(f"第 {row_num} 行: 文本中特殊字符比例过高，可能存在数据污染")
+        cleaned_data = {
+            'title': row_title,
+            'description': row_description,
+            'equipment_type_name': row_equipment_type,
+            'phase': row_phase,
+            'discovered_by': row_discovered_by,
+            'discovered_at': row_discovered_at,
+            'priority': row_priority
+        }
+        results.append((row_num, raw_row, cleaned_data, errors))
+    return results
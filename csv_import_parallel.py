@@ -0,0 +1,99 @@
+"""
+CSV导入的多进程验证
+将解析出的行按块分发到进程池执行_clean_and_validate_data（含输入清理），按块提交的顺序取回结果，
+由主进程按原有行号顺序写入数据库；错误信息中的行号与逐行处理一致
+"""
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# 子进程中_clean_and_validate_data读取的配置项，创建进程池时从主进程复制（运行时修改的值同样生效）
+WORKER_SETTINGS = ('CSV_TITLE_MAX_LENGTH', 'CSV_DESCRIPTION_MAX_LENGTH', 'CSV_EQUIPMENT_TYPE_MAX_LENGTH',
+                   'CSV_SPECIAL_CHAR_THRESHOLD')
+
+
+def _init_worker(settings: Dict[str, Any]):
+    """子进程初始化：应用主进程的配置值"""
+    for name, value in settings.items():
+        setattr(Config, name, value)
+
+
+def validate_chunk(rows: List[Dict[str, Any]], first_row_num: int,
+                   date_format: Optional[str]) -> Tuple[List[Tuple], int]:
+    """
+    在子进程中清理和验证一块数据
+
+    Args:
+        rows: 原始行数据
+        first_row_num: 第一行的行号
+        date_format: 推断的发现时间格式
+
+    Returns:
+        Tuple[List[Tuple], int]: (每行一个 (行号, 原始数据, 清理后数据, 错误列表)，日期回退解析次数)；
+        某行处理抛出异常时该行为 (行号, 原始数据, None, 异常)
+    """
+    from csv_import import _clean_and_validate_data, _DateParser
+
+    date_parser = _DateParser(date_format)
+    results = []
+    for row_num, row in enumerate(rows, first_row_num):
+        try:
+            cleaned_data, row_errors = _clean_and_validate_data(row, row_num, date_parser)
+            results.append((row_num, row, cleaned_data, row_errors))
+        except Exception as row_error:
+            results.append((row_num, row, None, row_error))
+    return results, date_parser.fallback_count
+
+
+def resolve_worker_count(workers: Optional[int] = None) -> int:
+    """进程数：未指定或为0时使用配置值，配置也为0时使用CPU核数"""
+    workers = workers or getattr(Config, 'CSV_PROCESS_WORKERS', 0) or os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def validate_rows_in_pool(rows: Iterable[Dict[str, Any]], date_format: Optional[str], workers: int = None,
+                          chunk_size: int = None, first_row_num: int = 1) -> Iterator[Tuple[List[Tuple], int]]:
+    """
+    按块并行清理验证，按输入顺序逐块产出validate_chunk的结果
+    同时在途的块数不超过进程数的两倍，避免一次性读入整个文件
+
+    Args:
+        rows: 原始行的迭代器（如csv.DictReader）
+        date_format: 推断的发现时间格式
+        workers: 进程数，默认见resolve_worker_count
+        chunk_size: 每块行数，默认使用配置值
+        first_row_num: 第一行的行号（续传时从检查点之后开始）
+
+    Yields:
+        Tuple[List[Tuple], int]: 每块的 (验证结果列表, 日期回退解析次数)
+    """
+    workers = resolve_worker_count(workers)
+    chunk_size = chunk_size or getattr(Config, 'CSV_PROCESS_CHUNK_SIZE', 1000)
+    settings = {name: getattr(Config, name) for name in WORKER_SETTINGS if hasattr(Config, name)}
+    rows = iter(rows)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(settings,)) as executor:
+        in_flight = deque()
+        next_row_num = first_row_num
+        try:
+            while True:
+                while len(in_flight) < workers * 2:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    in_flight.append(executor.submit(validate_chunk, chunk, next_row_num, date_format))
+                    next_row_num += len(chunk)
+                if not in_flight:
+                    break
+                yield in_flight.popleft().result()
+        finally:
+            # 调用方提前停止（如fail_on_error）时取消尚未开始的块
+            for future in in_flight:
+                future.cancel()
@@ -0,0 +1,29 @@
+"""
+gunicorn配置
+多worker部署时设置PROMETHEUS_MULTIPROC_DIR环境变量（指向每次启动前清空的目录），
+/metrics会汇总所有worker的指标；worker退出时清理其指标文件
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+# 每个worker多线程处理请求（gthread），导入请求等待AI调用时同一worker仍可处理交互式请求
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+
+
+def child_exit(server, worker):
+    """worker退出时清理其多进程指标文件"""
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def on_starting(server):
+    """启动时清空上次运行遗留的多进程指标文件"""
+    metrics_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not metrics_dir:
+        return
+    os.makedirs(metrics_dir, exist_ok=True)
+    for filename in os.listdir(metrics_dir):
+        if filename.endswith('.db'):
+            os.unlink(os.path.join(metrics_dir, filename))
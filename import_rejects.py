@@ -0,0 +1,119 @@
+"""
+CSV导入失败记录（拒绝文件）模块
+导入过程中失败的行逐条追加到按导入历史ID命名的JSON Lines文件，而不是全部保存在内存中；
+提供分页读取和CSV格式下载
+"""
+import csv
+import io
+import json
+import logging
+import os
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def reject_file_path(history_id: int) -> str:
+    """导入历史对应的拒绝文件路径"""
+    folder = getattr(Config, 'CSV_REJECT_FOLDER', os.path.join('uploads', 'rejects'))
+    return os.path.join(folder, f'import_{history_id}.jsonl')
+
+
+class RejectWriter:
+    """逐条写入失败记录，第一次写入时才创建文件"""
+
+    def __init__(self, history_id: int, resume_after_row: Optional[int] = None):
+        """
+        Args:
+            history_id: 导入历史ID
+            resume_after_row: 续传时的检查点行号：保留该行及之前的记录（之后的行会重新处理），
+                为None时表示新的导入，删除同名的旧文件
+        """
+        self.path = reject_file_path(history_id)
+        self._file = None
+        if resume_after_row is None:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        elif os.path.exists(self.path):
+            self._truncate_after(resume_after_row)
+
+    def _truncate_after(self, row_num: int):
+        """删除行号大于row_num的记录"""
+        temp_path = self.path + '.tmp'
+        with open(self.path, encoding='utf-8') as source, open(temp_path, 'w', encoding='utf-8') as target:
+            for line in source:
+                try:
+                    if json.loads(line)['row'] <= row_num:
+                        target.write(line)
+                except (ValueError, KeyError):
+                    continue  # 进程中断时可能留下不完整的最后一行
+        os.replace(temp_path, self.path)
+
+    def write(self, record: Dict[str, Any]):
+        """追加一条失败记录"""
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def flush(self):
+        """将已写入的记录刷新到磁盘（随每批提交调用，与检查点保持一致）"""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """关闭文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_rejects(history_id: int, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    分页读取失败记录
+
+    Args:
+        history_id: 导入历史ID
+        offset: 跳过的记录数
+        limit: 最多返回的记录数
+
+    Returns:
+        List[Dict]: 失败记录（row, data, errors, warnings），拒绝文件不存在时为空列表
+    """
+    path = reject_file_path(history_id)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in islice(f, offset, offset + limit)]
+
+
+def iter_rejects_csv(history_id: int) -> Iterator[str]:
+    """
+    以CSV格式逐行输出失败记录（列与save_failed_records_to_csv一致）
+    先扫描一遍收集所有原始字段名，再逐条输出，不把全部记录读入内存
+    """
+    path = reject_file_path(history_id)
+    fieldnames = set()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            fieldnames.update(json.loads(line)['data'].keys())
+    fieldnames = sorted(fieldnames) + ['error_info', 'row_number']
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            row_data = dict(record['data'])
+            row_data['error_info'] = '; '.join(record['errors'] + record['warnings'])
+            row_data['row_number'] = record['row']
+            writer.writerow(row_data)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
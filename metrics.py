@@ -0,0 +1,356 @@
+"""
+性能指标模块
+以Prometheus文本格式暴露请求、数据库、嵌入向量、向量检索、大模型调用和CSV导入的耗时与计数
+
+安装prometheus_client时使用其实现；设置PROMETHEUS_MULTIPROC_DIR环境变量后，
+gunicorn多个worker进程的指标会汇总输出（需配合gunicorn.conf.py中的child_exit钩子）。
+未安装时使用内置的单进程实现，指标接口保持一致，不依赖任何外部服务
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Sequence, Tuple
+
+# 尝试导入依赖，如果失败则使用内置实现
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess as prometheus_multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+logger = logging.getLogger(__name__)
+
+# 默认耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Tuple, extra: Dict[str, str] = None) -> str:
+    """生成Prometheus标签字符串"""
+    pairs = list(zip(labelnames, labelvalues)) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = ['{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in pairs]
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    """格式化指标数值"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _FallbackMetric:
+    """内置指标基类（单进程，线程安全）"""
+
+    metric_type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *labelvalues, **labelkwargs):
+        if labelkwargs:
+            labelvalues = tuple(labelkwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in labelvalues)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default_child(self):
+        return self.labels() if not self.labelnames else None
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            children = list(self._children.items())
+        for labelvalues, child in children:
+            lines.extend(child.render(self.name, self.labelnames, labelvalues))
+        return lines
+
+
+class _FallbackCounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def render(self, name, labelnames, labelvalues):
+        return [f'{name}_total{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}']
+
+
+class _FallbackCounter(_FallbackMetric):
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        # 与prometheus_client一致：计数器名称输出时带_total后缀
+        super().__init__(name[:-len('_total')] if name.endswith('_total') else name, documentation, labelnames)
+
+    def _new_child(self):
+        return _FallbackCounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default_child().inc(amount)
+
+
+class _FallbackHistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, amount: float):
+        with self._lock:
+            self.sum += amount
+            self.count += 1
+            index = bisect.bisect_left(self.buckets, amount)
+            if index < len(self.counts):
+                self.counts[index] += 1
+
+    def time(self):
+        return _timer(self)
+
+    def render(self, name, labelnames, labelvalues):
+        lines = []
+        with self._lock:
+            cumulative = 0
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                labels = _format_labels(labelnames, labelvalues, {'le': _format_value(bound)})
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            labels = _format_labels(labelnames, labelvalues, {'le': '+Inf'})
+            lines.append(f'{name}_bucket{labels} {self.count}')
+            lines.append(f'{name}_count{_format_labels(labelnames, labelvalues)} {self.count}')
+            lines.append(f'{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(self.sum)}')
+        return lines
+
+
+class _FallbackHistogram(_FallbackMetric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != float('inf')))
+
+    def _new_child(self):
+        return _FallbackHistogramChild(self.buckets)
+
+    def observe(self, amount: float):
+        self._default_child().observe(amount)
+
+    def time(self):
+        return _timer(self._default_child())
+
+
+@contextmanager
+def _timer(histogram):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start)
+
+
+_fallback_metrics = []
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    """创建计数器"""
+    if PROMETHEUS_AVAILABLE:
+        return prometheus_client.Counter(name, documentation, labelnames)
+    metric = _FallbackCounter(name, documentation, labelnames)
+    _fallback_metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+    """创建直方图"""
+    if PROMETHEUS_AVAILABLE:
+        return prometheus_client.Histogram(name, documentation, labelnames, buckets=buckets)
+    metric = _FallbackHistogram(name, documentation, labelnames, buckets)
+    _fallback_metrics.append(metric)
+    return metric
+
+
+# HTTP请求
+REQUEST_LATENCY = histogram('http_request_duration_seconds', '按路由统计的请求耗时',
+                            ['method', 'endpoint', 'status'])
+REQUEST_SQL_QUERIES = histogram('http_request_sql_queries', '每个请求执行的SQL语句数', ['endpoint'],
+                                buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+REQUEST_SQL_SECONDS = histogram('http_request_sql_seconds', '每个请求的SQL执行总耗时', ['endpoint'])
+
+# 嵌入向量与向量检索
+EMBEDDING_BATCH_SIZE = histogram('embedding_batch_size', '每次编码的文本数量',
+                                 buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+EMBEDDING_ENCODE_SECONDS = histogram('embedding_encode_seconds', '嵌入模型每次编码的耗时')
+VECTOR_QUERY_SECONDS = histogram('vector_query_seconds', '向量数据库操作耗时', ['operation'])
+
+# 大模型调用
+LLM_REQUEST_SECONDS = histogram('llm_request_seconds', '大模型调用耗时', ['provider', 'operation'],
+                                buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+LLM_REQUEST_ERRORS = counter('llm_request_errors_total', '大模型调用失败次数', ['provider', 'operation'])
+LLM_TOKENS = counter('llm_tokens_total', '大模型消耗的token数', ['provider', 'type'])
+LLM_QUEUE_SECONDS = histogram('llm_queue_wait_seconds', '大模型调用在AI调度器中排队等待的时间', ['work_class'],
+                              buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+
+# CSV导入（各阶段每秒行数 = rate(csv_import_rows_total) / rate(csv_import_stage_seconds_total)）
+IMPORT_ROWS = counter('csv_import_rows_total', 'CSV导入各阶段处理的行数', ['stage'])
+IMPORT_STAGE_SECONDS = counter('csv_import_stage_seconds_total', 'CSV导入各阶段累计耗时', ['stage'])
+
+
+def record_llm_call(provider: str, operation: str, seconds: float, error: bool = False,
+                    prompt_tokens: int = None, completion_tokens: int = None):
+    """
+    记录一次大模型调用
+
+    Args:
+        provider: 服务提供方（openai/dashscope）
+        operation: 调用用途（analysis/design_query/internal_solution）
+        seconds: 调用耗时
+        error: 是否失败
+        prompt_tokens: 输入token数（接口返回时记录）
+        completion_tokens: 输出token数（接口返回时记录）
+    """
+    LLM_REQUEST_SECONDS.labels(provider, operation).observe(seconds)
+    if error:
+        LLM_REQUEST_ERRORS.labels(provider, operation).inc()
+    if prompt_tokens:
+        LLM_TOKENS.labels(provider, 'prompt').inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(provider, 'completion').inc(completion_tokens)
+
+
+def record_llm_queue_wait(work_class: str, seconds: float):
+    """
+    记录一次大模型调用在AI调度器中的排队时间
+
+    Args:
+        work_class: 工作类别（interactive/import/backfill）
+        seconds: 等待时间
+    """
+    LLM_QUEUE_SECONDS.labels(work_class).observe(seconds)
+
+
+def record_import_stage(stage: str, rows: int, seconds: float):
+    """
+    记录CSV导入某阶段处理的行数和耗时
+
+    Args:
+        stage: 阶段名称
+        rows: 处理行数
+        seconds: 耗时
+    """
+    if rows:
+        IMPORT_ROWS.labels(stage).inc(rows)
+    if seconds:
+        IMPORT_STAGE_SECONDS.labels(stage).inc(seconds)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    生成Prometheus文本格式的指标
+
+    Returns:
+        Tuple[bytes, str]: (指标内容, Content-Type)
+    """
+    if PROMETHEUS_AVAILABLE:
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            prometheus_multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry), CONTENT_TYPE_LATEST
+        return generate_latest(), CONTENT_TYPE_LATEST
+    lines = []
+    for metric in _fallback_metrics:
+        lines.extend(metric.render())
+    return ('\n'.join(lines) + '\n').encode('utf-8'), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """gunicorn worker退出时清理其多进程指标文件"""
+    if PROMETHEUS_AVAILABLE and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        prometheus_multiprocess.mark_process_dead(pid)
+
+
+def _request_endpoint() -> str:
+    """使用路由模板作为endpoint标签，避免路径参数导致标签数量膨胀"""
+    from flask import request
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+_sql_listeners_registered = False
+
+
+def init_app(app):
+    """
+    注册请求耗时和SQL统计钩子
+
+    Args:
+        app: Flask应用实例
+    """
+    global _sql_listeners_registered
+    from flask import g, has_request_context, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_start_time = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_seconds = 0.0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        start_time = g.pop('metrics_start_time', None)
+        if start_time is None:
+            return response
+        endpoint = _request_endpoint()
+        REQUEST_LATENCY.labels(request.method, endpoint, str(response.status_code)).observe(
+            time.perf_counter() - start_time)
+        REQUEST_SQL_QUERIES.labels(endpoint).observe(g.pop('metrics_sql_count', 0))
+        REQUEST_SQL_SECONDS.labels(endpoint).observe(g.pop('metrics_sql_seconds', 0.0))
+        return response
+
+    if _sql_listeners_registered:
+        return
+    _sql_listeners_registered = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context() and 'metrics_sql_count' in g:
+            g.metrics_sql_count += 1
+            g.metrics_sql_seconds += elapsed
+
+    @event.listens_for(Engine, 'handle_error')
+    def _handle_sql_error(exception_context):
+        # 执行失败时不会触发after_cursor_execute，需要弹出开始时间
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('metrics_query_start'):
+            conn.info['metrics_query_start'].pop()
@@ -0,0 +1,34 @@
+"""
+数据库迁移脚本：为ImportHistory表添加断点续传所需的检查点字段
+"""
+from models import db
+from app import app
+
+CHECKPOINT_COLUMNS = [
+    ('source_path', 'VARCHAR(500)'),
+    ('file_hash', 'VARCHAR(64)'),
+    ('import_options', 'TEXT'),
+    ('checkpoint_row', 'INTEGER DEFAULT 0'),
+    ('checkpoint_offset', 'BIGINT'),
+    ('checkpoint_failed', 'INTEGER DEFAULT 0'),
+    ('checkpoint_at', 'DATETIME'),
+]
+
+
+def migrate_import_checkpoint():
+    with app.app_context():
+        # 逐列添加，已存在的列会报错并跳过
+        for column_name, column_type in CHECKPOINT_COLUMNS:
+            try:
+                db.session.execute(
+                    db.text(f"ALTER TABLE import_history ADD COLUMN {column_name} {column_type}")
+                )
+                db.session.commit()
+                print(f"成功添加{column_name}列到import_history表")
+            except Exception as e:
+                print(f"添加{column_name}列时出错（可能已存在）: {e}")
+                db.session.rollback()
+
+
+if __name__ == "__main__":
+    migrate_import_checkpoint()
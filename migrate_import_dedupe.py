@@ -0,0 +1,26 @@
+"""
+数据库迁移脚本：为ImportHistory表添加导入结果字段和文件哈希索引，用于识别重复上传的文件
+"""
+from models import db
+from app import app
+
+
+def migrate_import_dedupe():
+    with app.app_context():
+        statements = [
+            ("result_summary列", "ALTER TABLE import_history ADD COLUMN result_summary TEXT"),
+            ("file_hash索引", "CREATE INDEX ix_import_history_file_hash ON import_history (file_hash)"),
+        ]
+        # 逐条执行，已存在的列或索引会报错并跳过
+        for name, statement in statements:
+            try:
+                db.session.execute(db.text(statement))
+                db.session.commit()
+                print(f"成功添加{name}到import_history表")
+            except Exception as e:
+                print(f"添加{name}时出错（可能已存在）: {e}")
+                db.session.rollback()
+
+
+if __name__ == "__main__":
+    migrate_import_dedupe()
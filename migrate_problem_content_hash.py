@@ -0,0 +1,56 @@
+"""
+数据库迁移脚本：为Problem表添加content_hash字段并回填现有数据
+"""
+from models import db, Problem, compute_content_hash
+from app import app
+
+
+def migrate_problem_content_hash(chunk_size=1000):
+    with app.app_context():
+        # 检查content_hash列是否存在，如果不存在则添加
+        try:
+            db.session.execute(
+                db.text("ALTER TABLE problems ADD COLUMN content_hash VARCHAR(64)")
+            )
+            db.session.commit()
+            print("成功添加content_hash列到problems表")
+        except Exception as e:
+            print(f"添加content_hash列时出错（可能已存在）: {e}")
+            db.session.rollback()
+
+        try:
+            db.session.execute(
+                db.text("CREATE INDEX ix_problems_content_hash ON problems (content_hash)")
+            )
+            db.session.commit()
+            print("成功创建content_hash索引")
+        except Exception as e:
+            print(f"创建content_hash索引时出错（可能已存在）: {e}")
+            db.session.rollback()
+
+        # 分批回填内容哈希，避免一次加载全部数据
+        updated = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(Problem.id, Problem.title, Problem.description)\
+                .filter(Problem.id > last_id, Problem.content_hash.is_(None))\
+                .order_by(Problem.id).limit(chunk_size).all()
+            if not rows:
+                break
+            db.session.execute(
+                Problem.__table__.update()
+                .where(Problem.__table__.c.id == db.bindparam('problem_id'))
+                # 保持updated_at不变，避免回填触发onupdate
+                .values(content_hash=db.bindparam('hash_value'),
+                        updated_at=Problem.__table__.c.updated_at),
+                [{'problem_id': row.id, 'hash_value': compute_content_hash(row.title, row.description)}
+                 for row in rows]
+            )
+            db.session.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+        print(f"已回填 {updated} 个问题的content_hash")
+
+
+if __name__ == "__main__":
+    migrate_problem_content_hash()
@@ -1,8 +1,31 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
 from datetime import datetime
+import hashlib
+import re
 
 db = SQLAlchemy()
 
+
+def compute_content_hash(title, description):
+    """
+    计算问题内容哈希（规范化标题+描述后的SHA-256），用于精确重复检测
+    规范化规则：去除首尾空白、合并连续空白、转为小写
+    
+    Args:
+        title: 问题标题
+        description: 问题描述
+    
+    Returns:
+        str: 64位十六进制哈希字符串
+    """
+    def _normalize(text):
+        return re.sub(r'\s+', ' ', str(text or '')).strip().lower()
+    
+    content = f"{_normalize(title)}\n{_normalize(description)}"
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
 # 延迟导入向量数据库以避免循环导入
 def get_vector_db_instance():
     from vector_db import get_vector_db
@@ -78,10 +101,50 @@ class Problem(db.Model):
     solution_verification = db.Column(db.Text)  # 解决方案验证
     created_at = db.Column(db.DateTime, default=datetime.utcnow)  # 创建时间
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # 更新时间
+    content_hash = db.Column(db.String(64), index=True)  # 规范化标题+描述的内容哈希，用于重复检测
     
     def __repr__(self):
         return f'<Problem {self.title}>'
     
+    def to_vector_metadata(self):
+        """
+        构建写入向量数据库的元数据（向量库不接受None值，空值字段会被省略）
+        
+        Returns:
+            dict: 问题元数据
+        """
+        metadata = {
+            'equipment_type_id': self.equipment_type_id,
+            'problem_category_id': self.problem_category_id,
+            'solution_category_id': self.solution_category_id,
+            'status': self.status,
+            'priority': self.priority,
+            'phase': self.phase,
+            'discovered_by': self.discovered_by,
+            'discovered_at': str(self.discovered_at) if self.discovered_at else None,
+            'ai_analyzed': self.ai_analyzed,
+            'ai_analysis': self.ai_analysis,
+            'solution_description': self.solution_description,
+            'content_hash': self.content_hash,
+            'created_at': str(self.created_at),
+            'updated_at': str(self.updated_at)
+        }
+        return {key: value for key, value in metadata.items() if value is not None}
+    
+    def to_vector_document(self):
+        """
+        构建批量写入向量数据库所需的文档结构
+        
+        Returns:
+            dict: 包含'id', 'title', 'description', 'metadata'的字典
+        """
+        return {
+            'id': str(self.id),
+            'title': self.title,
+            'description': self.description or "",
+            'metadata': self.to_vector_metadata()
+        }
+    
     def save_to_vector_db(self):
         """
         将问题保存到向量数据库
@@ -93,19 +156,7 @@ class Problem(db.Model):
         
         try:
             vector_db = get_vector_db_instance()
-            metadata = {
-                'equipment_type_id': self.equipment_type_id,
-                'problem_category_id': self.problem_category_id,
-                'solution_category_id': self.solution_category_id,
-                'status': self.status,
-                'priority': self.priority,
-                'phase': self.phase,
-                'discovered_by': self.discovered_by,
-                'discovered_at': str(self.discovered_at) if self.discovered_at else None,
-                'ai_analyzed': self.ai_analyzed,
-                'created_at': str(self.created_at),
-                'updated_at': str(self.updated_at)
-            }
+            metadata = self.to_vector_metadata()
             return vector_db.add_problem(
                 problem_id=str(self.id),
                 title=self.title,
@@ -130,19 +181,7 @@ class Problem(db.Model):
         
         try:
             vector_db = get_vector_db_instance()
-            metadata = {
-                'equipment_type_id': self.equipment_type_id,
-                'problem_category_id': self.problem_category_id,
-                'solution_category_id': self.solution_category_id,
-                'status': self.status,
-                'priority': self.priority,
-                'phase': self.phase,
-                'discovered_by': self.discovered_by,
-                'discovered_at': str(self.discovered_at) if self.discovered_at else None,
-                'ai_analyzed': self.ai_analyzed,
-                'created_at': str(self.created_at),
-                'updated_at': str(self.updated_at)
-            }
+            metadata = self.to_vector_metadata()
             return vector_db.update_problem(
                 problem_id=str(self.id),
                 title=self.title,
@@ -203,6 +242,95 @@ class Problem(db.Model):
             logger.error(f"搜索相似问题失败: {str(e)}")
             return []
 
+    
+    @classmethod
+    def search_similar_problems_many(cls, queries, n_results=None, filters=None):
+        """
+        批量搜索相似问题
+        
+        Args:
+            queries: 查询文本列表
+            n_results: 每个查询返回结果数量
+            filters: 元数据过滤条件
+        
+        Returns:
+            List[List[Dict]]: 与queries顺序一致的相似问题列表
+        """
+        from vector_db import VectorDBException
+        import logging
+        
+        logger = logging.getLogger(__name__)
+        
+        try:
+            vector_db = get_vector_db_instance()
+            return vector_db.search_many(queries, k=n_results, filters=filters, min_similarity=0.1)
+        except VectorDBException as e:
+            logger.error(f"向量数据库操作失败: {str(e)}")
+            return [[] for _ in queries]
+        except Exception as e:
+            logger.error(f"批量搜索相似问题失败: {str(e)}")
+            return [[] for _ in queries]
+
+
+@event.listens_for(Problem, 'before_insert')
+@event.listens_for(Problem, 'before_update')
+def _update_problem_content_hash(mapper, connection, target):
+    """写入前根据标题和描述刷新内容哈希"""
+    target.content_hash = compute_content_hash(target.title, target.description)
+
+
+class VectorOutbox(db.Model):
+    """向量数据库同步发件箱表（与问题变更在同一事务中写入，由后台任务批量应用到向量数据库）"""
+    __tablename__ = 'vector_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    problem_id = db.Column(db.Integer, nullable=False, index=True)  # 问题ID（不设外键，删除问题后仍需保留删除事件）
+    operation = db.Column(db.Enum('upsert', 'delete', name='vector_outbox_operation'), nullable=False)  # 操作类型
+    status = db.Column(db.Enum('pending', 'processing', 'failed', name='vector_outbox_status'), default='pending', index=True)  # 处理状态
+    attempts = db.Column(db.Integer, default=0)  # 已尝试次数
+    last_error = db.Column(db.Text)  # 最近一次错误信息
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # 最早可处理时间（用于重试退避）
+    claimed_by = db.Column(db.String(64))  # 领取该记录的处理进程标识
+    claimed_at = db.Column(db.DateTime)  # 领取时间
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # 创建时间
+    
+    def __repr__(self):
+        return f'<VectorOutbox {self.operation} {self.problem_id}>'
+
+
+def _enqueue_vector_outbox(connection, problem_id, operation):
+    """使用当前事务的连接写入发件箱记录，保证与问题变更同时提交或回滚"""
+    now = datetime.utcnow()
+    connection.execute(VectorOutbox.__table__.insert().values(
+        problem_id=problem_id,
+        operation=operation,
+        status='pending',
+        attempts=0,
+        available_at=now,
+        created_at=now
+    ))
+
+
+@event.listens_for(Problem, 'after_insert')
+def _enqueue_problem_insert(mapper, connection, target):
+    """问题新增后登记向量upsert"""
+    _enqueue_vector_outbox(connection, target.id, 'upsert')
+
+
+@event.listens_for(Problem, 'after_update')
+def _enqueue_problem_update(mapper, connection, target):
+    """问题修改后登记向量upsert（没有实际字段变化时不登记）"""
+    session = object_session(target)
+    if session is not None and not session.is_modified(target, include_collections=False):
+        return
+    _enqueue_vector_outbox(connection, target.id, 'upsert')
+
+
+@event.listens_for(Problem, 'after_delete')
+def _enqueue_problem_delete(mapper, connection, target):
+    """问题删除后登记向量删除"""
+    _enqueue_vector_outbox(connection, target.id, 'delete')
+
 
 class AIAnalysisHistory(db.Model):
     """AI分析历史表"""
@@ -252,6 +380,15 @@ class ImportHistory(db.Model):
     started_at = db.Column(db.DateTime)  # 开始时间
     completed_at = db.Column(db.DateTime)  # 完成时间
     error_log = db.Column(db.Text)  # 错误日志
+    # 断点续传：每批提交时在同一事务中记录检查点，中断后从检查点之后继续
+    source_path = db.Column(db.String(500))  # 导入源文件路径
+    file_hash = db.Column(db.String(64), index=True)  # 源文件SHA-256，续传前校验文件未变化，也用于识别重复上传
+    import_options = db.Column(db.Text)  # 导入选项（JSON），续传时沿用
+    checkpoint_row = db.Column(db.Integer, default=0)  # 已提交的最后一行行号（此前各行均已处理完毕）
+    checkpoint_offset = db.Column(db.BigInteger)  # 检查点所在行之后的字节偏移（未知时续传按行数跳过）
+    checkpoint_failed = db.Column(db.Integer, default=0)  # 检查点时的失败记录数
+    checkpoint_at = db.Column(db.DateTime)  # 最近一次检查点时间
+    result_summary = db.Column(db.Text)  # 导入完成时的结果（JSON），相同文件再次上传时直接返回
     
     def __repr__(self):
         return f'<ImportHistory {self.filename}>'
@@ -0,0 +1,156 @@
+"""
+采样分析器模块
+在运行中的进程内按固定间隔采样各线程调用栈，输出collapsed stack格式（可直接用flamegraph.pl或speedscope生成火焰图）
+支持三种触发方式：管理接口按秒数采样、请求头对单个请求采样、SIGUSR2信号触发后台采样
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 同一进程同时只允许一个按时长采样任务
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    """栈帧标签：函数名 (文件名:函数起始行)"""
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """
+    统计采样器：后台线程每隔interval秒读取一次sys._current_frames()，累计各调用栈出现的次数
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Iterable[int]] = None):
+        """
+        Args:
+            interval: 采样间隔（秒）
+            thread_ids: 只采样这些线程，None表示采样除采样线程外的所有线程
+        """
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.stacks = Counter()
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _sample_once(self):
+        own_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(_frame_label(frame))
+                frame = frame.f_back
+            frames.append(thread_names.get(thread_id, str(thread_id)))
+            self.stacks[';'.join(reversed(frames))] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample_once()
+
+    def start(self):
+        """开始采样"""
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止采样并等待采样线程退出"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        """
+        输出collapsed stack格式：每行“栈帧1;栈帧2;... 次数”，按次数降序
+
+        Returns:
+            str: collapsed stack文本
+        """
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def profile_for(seconds: float, interval: float = 0.005) -> Optional[str]:
+    """
+    对当前进程的所有线程采样指定时长
+
+    Args:
+        seconds: 采样时长（秒）
+        interval: 采样间隔（秒）
+
+    Returns:
+        Optional[str]: collapsed stack文本；已有采样任务在运行时返回None
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        sampler = StackSampler(interval=interval).start()
+        time.sleep(seconds)
+        sampler.stop()
+        logger.info(f"采样完成: {seconds} 秒, {sampler.sample_count} 次采样, {len(sampler.stacks)} 个不同调用栈")
+        return sampler.collapsed()
+    finally:
+        _profile_lock.release()
+
+
+def write_profile(output_dir: str, content: str, prefix: str = 'profile') -> str:
+    """
+    将采样结果写入输出目录
+
+    Args:
+        output_dir: 输出目录
+        content: collapsed stack文本
+        prefix: 文件名前缀
+
+    Returns:
+        str: 文件路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f'{prefix}-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}-{threading.get_ident() % 100000}.folded'
+    path = os.path.join(output_dir, filename)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def install_signal_handler(output_dir: str, seconds: float = 30, interval: float = 0.005) -> bool:
+    """
+    注册SIGUSR2信号处理：收到信号后在后台线程采样seconds秒并写入output_dir
+    （gunicorn的master进程使用SIGUSR2升级程序，请只向worker进程发送该信号）
+
+    Args:
+        output_dir: 采样结果输出目录
+        seconds: 采样时长（秒）
+        interval: 采样间隔（秒）
+
+    Returns:
+        bool: 是否注册成功（非主线程或平台不支持SIGUSR2时返回False）
+    """
+    if not hasattr(signal, 'SIGUSR2') or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def _profile_in_background():
+        content = profile_for(seconds, interval)
+        if content is None:
+            logger.warning("已有采样任务在运行，忽略本次SIGUSR2")
+            return
+        logger.info(f"采样结果已写入: {write_profile(output_dir, content, prefix='signal')}")
+
+    def _handle_signal(signum, frame):
+        threading.Thread(target=_profile_in_background, name='signal-profiler', daemon=True).start()
+
+    signal.signal(signal.SIGUSR2, _handle_signal)
+    logger.info(f"已注册SIGUSR2采样: 进程 {os.getpid()}, 时长 {seconds} 秒, 输出目录 {output_dir}")
+    return True
@@ -7,6 +7,10 @@ import sys
 from app import app
 from init_db import init_database
 from vector_db import init_vector_db
+from vector_outbox import start_outbox_worker
+from vector_sync import start_vector_sync_scheduler
+from ai_backfill import start_backfill_worker
+from profiler import install_signal_handler
 
 
 def main():
@@ -20,6 +24,12 @@ def main():
     # 初始化向量数据库
     print("正在初始化向量数据库...")
     init_vector_db()
+    start_outbox_worker(app)
+    start_vector_sync_scheduler(app)
+    start_backfill_worker(app)
+    # 注册SIGUSR2采样（kill -USR2 <worker pid>）
+    install_signal_handler(app.config['PROFILE_OUTPUT_DIR'], app.config['PROFILE_SIGNAL_SECONDS'],
+                           app.config['PROFILE_INTERVAL_MS'] / 1000.0)
     
     # 获取端口配置，默认为5000
     port = int(os.environ.get('PORT', 5000))
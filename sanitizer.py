@@ -0,0 +1,64 @@
+"""
+输入清理模块
+移除CSV等外部输入中的脚本标签、事件处理器等潜在恶意内容，并统计特殊字符数量
+正则在模块加载时编译一次；绝大多数字段不含任何可疑内容，先用字符预检和一次合并匹配跳过全部替换
+"""
+import re
+
+# 按原有顺序逐个替换的清理规则（一个规则的替换结果可能组成下一个规则的匹配，因此不能合并成一次替换）
+_SANITIZE_PATTERNS = (
+    re.compile(r'<script[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'javascript:', re.IGNORECASE),
+    re.compile(r'vbscript:', re.IGNORECASE),
+    re.compile(r'on\w+\s*=', re.IGNORECASE),  # 事件处理器
+    re.compile(r'<iframe[^>]*>.*?</iframe>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<object[^>]*>.*?</object>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<embed[^>]*>.*?</embed>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'eval\s*\(', re.IGNORECASE),  # eval函数调用
+    re.compile(r'document\.cookie', re.IGNORECASE),  # document.cookie访问
+)
+_DOCUMENT_COOKIE_PATTERN = _SANITIZE_PATTERNS[-1]
+
+# 合并所有规则的检测正则：只要任一规则能在原文中匹配，合并正则就能匹配
+_ANY_SANITIZE_PATTERN = re.compile('|'.join(f'(?:{pattern.pattern})' for pattern in _SANITIZE_PATTERNS),
+                                   re.IGNORECASE | re.DOTALL)
+
+# 特殊字符：字母、数字、下划线和中文以外的字符
+_SPECIAL_CHAR_PATTERN = re.compile(r'[^\w\u4e00-\u9fff]')
+
+
+def _needs_sanitizing(text: str) -> bool:
+    """
+    判断是否有任一清理规则能匹配
+    除document.cookie外每条规则都必须包含 < : = ( 之一，不含这些字符时只需检查document.cookie（必须包含'.'）
+    """
+    if '<' in text or ':' in text or '=' in text or '(' in text:
+        return _ANY_SANITIZE_PATTERN.search(text) is not None
+    return '.' in text and _DOCUMENT_COOKIE_PATTERN.search(text) is not None
+
+
+def sanitize_input(input_str) -> str:
+    """
+    清理输入字符串，移除潜在的危险字符
+
+    Args:
+        input_str: 输入字符串
+
+    Returns:
+        str: 清理后的字符串（None或空值返回空字符串）
+    """
+    if input_str is None or not input_str:
+        return ''
+
+    text = str(input_str)
+    if not _needs_sanitizing(text):
+        return text.strip()
+
+    for pattern in _SANITIZE_PATTERNS:
+        text = pattern.sub('', text)
+    return text.strip()
+
+
+def count_special_chars(text: str) -> int:
+    """统计字母、数字、下划线和中文以外的字符数量"""
+    return len(_SPECIAL_CHAR_PATTERN.findall(text)) if text else 0
@@ -36,6 +36,7 @@ function uploadCSVFile() {
     
     const formData = new FormData();
     formData.append('csvFile', file);
+    formData.append('duplicateMode', document.getElementById('duplicateMode').value);
     
     // 显示上传进度
     document.getElementById('uploadProgress').style.display = 'block';
@@ -65,7 +66,8 @@ function uploadCSVFile() {
         
         // 显示成功结果
         document.getElementById('successMessage').textContent = 
-            `CSV文件导入成功！导入了 ${data.importedCount} 条记录，总共处理了 ${data.totalCount} 条记录。`;
+            `CSV文件导入成功！导入了 ${data.importedCount} 条记录，总共处理了 ${data.totalCount} 条记录。` +
+            (data.duplicateCount ? ` 检测到 ${data.duplicateCount} 条重复记录。` : '');
         document.getElementById('successResult').style.display = 'block';
         document.getElementById('errorResult').style.display = 'none';
         document.getElementById('uploadResult').style.display = 'block';
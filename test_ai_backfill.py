@@ -0,0 +1,128 @@
+"""
+AI补充分析单元测试
+验证导入时跳过AI分析、令牌桶速率限制，以及补充分析按ai_analyzed=False查询并可中断后继续
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db, Problem
+from csv_import import import_csv_file
+from ai_backfill import TokenBucket, backfill_ai_analysis, count_unanalyzed
+from app import app as flask_app
+
+CSV_CONTENT = """title,description,phase,priority
+泵体泄漏,密封圈老化,usage,high
+电机过热,风扇损坏,usage,low
+阀门卡滞,阀芯磨损,maintenance,medium
+"""
+
+
+class FakeClock:
+    """手动推进的时钟，sleep只推进时间"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    """令牌桶测试类"""
+
+    def test_rate_and_burst(self):
+        """测试容量内立即取得令牌，之后按每分钟次数等待"""
+        clock = FakeClock()
+        bucket = TokenBucket(rpm=60, capacity=2, clock=clock, sleep=clock.sleep)
+        self.assertEqual((bucket.acquire(), bucket.acquire()), (0.0, 0.0))
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+        clock.now += 0.5
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        clock.now += 10
+        self.assertEqual((bucket.acquire(), bucket.acquire()), (0.0, 0.0))
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_invalid_rate(self):
+        """测试每分钟次数必须大于0"""
+        with self.assertRaises(ValueError):
+            TokenBucket(rpm=0)
+
+
+class TestAIBackfill(unittest.TestCase):
+    """AI补充分析测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(CSV_CONTENT)
+        self.csv_path = os.path.relpath(f.name)
+        self.ai_patch = patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'})
+        self.analyze = self.ai_patch.start()
+        self.clock = FakeClock()
+        self.limiter = TokenBucket(rpm=30, clock=self.clock, sleep=self.clock.sleep)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.ai_patch.stop()
+        os.unlink(self.csv_path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_import_skips_ai(self):
+        """测试skip_ai导入时不调用AI，问题以未分析状态写入"""
+        result = import_csv_file(self.csv_path, skip_ai=True)
+        self.assertEqual(result['importedCount'], 3)
+        self.analyze.assert_not_called()
+        self.assertEqual(count_unanalyzed(), 3)
+        self.assertEqual(Problem.query.filter_by(title='泵体泄漏').one().priority, 'high')
+
+        # 导入选项不同，相同文件按AI分析重新导入而不复用跳过AI的结果
+        self.assertFalse(import_csv_file(self.csv_path)['reusedResult'])
+        self.assertEqual(self.analyze.call_count, 3)
+
+    def test_backfill_rate_limited_and_resumable(self):
+        """测试补充分析按速率限制逐个分析，中断后从尚未分析的问题继续"""
+        import_csv_file(self.csv_path, skip_ai=True)
+
+        first = backfill_ai_analysis(limiter=self.limiter, max_problems=2)
+        self.assertEqual((first['processed_count'], first['analyzed_count']), (2, 2))
+        self.assertEqual(count_unanalyzed(), 1)
+        self.assertEqual(self.clock.sleeps, [2.0])  # 每分钟30次：第二次调用等待2秒
+
+        # 模拟重启：新的运行只处理剩余的问题
+        second = backfill_ai_analysis(limiter=self.limiter, batch_size=1)
+        self.assertEqual((second['processed_count'], second['analyzed_count']), (1, 1))
+        self.assertEqual(count_unanalyzed(), 0)
+        self.assertEqual(self.analyze.call_count, 3)
+        problem = Problem.query.filter_by(title='阀门卡滞').one()
+        self.assertEqual(problem.ai_analysis, '测试AI分析结果')
+        self.assertIsNotNone(problem.problem_category_id)
+
+    def test_backfill_failure_left_for_next_run(self):
+        """测试分析失败的问题保持未分析，本次运行不再重试"""
+        import_csv_file(self.csv_path, skip_ai=True)
+        self.analyze.side_effect = [RuntimeError('服务不可用'), {'analysis': '分析'}, {'analysis': '分析'}]
+
+        stats = backfill_ai_analysis(limiter=self.limiter)
+        self.assertEqual((stats['processed_count'], stats['analyzed_count'], stats['failed_count']), (3, 2, 1))
+        self.assertEqual(count_unanalyzed(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+AI调度器单元测试
+验证工作类别的并发上限、按优先级分配空闲名额、同类别按到达顺序，以及导入占满名额时交互式调用不排队
+（包括导入在另一个进程中运行时）
+"""
+
+import multiprocessing
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from ai_analysis import FCNTL_AVAILABLE, AIWorkScheduler, ai_work_class, current_ai_work_class
+
+
+def _hold_import_slot(lock_dir, ready, release):
+    """在子进程中占用导入类别的名额，直到release"""
+    scheduler = AIWorkScheduler(2, {'import': 1}, lock_dir=lock_dir)
+    with scheduler.slot('import'):
+        ready.set()
+        release.wait(10)
+
+
+class TestAIWorkScheduler(unittest.TestCase):
+    """AI调度器测试类"""
+
+    def _start(self, scheduler, work_class, started, release, name=None):
+        """在线程中取得名额，记录开始顺序，等待release后释放"""
+        def run():
+            with scheduler.slot(work_class):
+                started.append(name or work_class)
+                release.wait(5)
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _wait_until(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, '等待超时')
+            time.sleep(0.005)
+
+    def test_class_limit_reserves_interactive_capacity(self):
+        """测试导入达到并发上限后继续排队，交互式调用立即开始"""
+        scheduler = AIWorkScheduler(2, {'import': 1})
+        started, release = [], threading.Event()
+        threads = [self._start(scheduler, 'import', started, release, f'import-{i}') for i in range(3)]
+        self._wait_until(lambda: scheduler.stats()['import']['waiting'] == 2)
+        self.assertEqual(started, ['import-0'])
+
+        with scheduler.slot('interactive'):
+            self.assertEqual(scheduler.stats()['interactive']['running'], 1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(started, ['import-0', 'import-1', 'import-2'])
+
+    def test_priority_order(self):
+        """测试名额释放时先分配给优先级高的类别，同类别按到达顺序"""
+        scheduler = AIWorkScheduler(1)
+        started, release = [], threading.Event()
+        holder_release = threading.Event()
+        threads = [self._start(scheduler, 'import', started, holder_release, 'holder')]
+        self._wait_until(lambda: started == ['holder'])
+
+        waiters = [('backfill', 'backfill'), ('import', 'import'),
+                   ('interactive', 'interactive-1'), ('interactive', 'interactive-2')]
+        for count, (work_class, name) in enumerate(waiters, 1):
+            threads.append(self._start(scheduler, work_class, started, release, name))
+            self._wait_until(lambda: sum(entry['waiting'] for entry in scheduler.stats().values()) == count)
+
+        release.set()
+        holder_release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(started, ['holder', 'interactive-1', 'interactive-2', 'import', 'backfill'])
+        self.assertEqual(scheduler.stats()['backfill'], {'running': 0, 'waiting': 0, 'limit': 1})
+
+    @unittest.skipUnless(FCNTL_AVAILABLE, '需要文件锁支持')
+    def test_class_limit_shared_across_processes(self):
+        """测试另一个进程占满导入名额时本进程的导入排队，交互式调用立即开始"""
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir, ignore_errors=True)
+        context = multiprocessing.get_context('spawn')
+        ready, release = context.Event(), context.Event()
+        process = context.Process(target=_hold_import_slot, args=(lock_dir, ready, release), daemon=True)
+        process.start()
+        self.addCleanup(process.join, 10)
+        self.addCleanup(release.set)
+        self.assertTrue(ready.wait(30))
+
+        scheduler = AIWorkScheduler(2, {'import': 1}, lock_dir=lock_dir)
+        started, local_release = [], threading.Event()
+        thread = self._start(scheduler, 'import', started, local_release)
+        time.sleep(0.3)
+        self.assertEqual(started, [])  # 导入名额被另一个进程占用
+
+        with scheduler.slot('interactive'):
+            self.assertEqual(scheduler.stats()['interactive']['running'], 1)
+
+        release.set()
+        local_release.set()
+        thread.join(5)
+        self.assertEqual(started, ['import'])
+
+    def test_work_class_context(self):
+        """测试上下文中的工作类别，默认为交互式"""
+        self.assertEqual(current_ai_work_class(), 'interactive')
+        with ai_work_class('import'):
+            self.assertEqual(current_ai_work_class(), 'import')
+            scheduler = AIWorkScheduler(1)
+            with scheduler.slot():
+                self.assertEqual(scheduler.stats()['import']['running'], 1)
+        self.assertEqual(current_ai_work_class(), 'interactive')
+        with self.assertRaises(ValueError):
+            with ai_work_class('bulk'):
+                pass
+
+    def test_import_analysis_uses_import_class(self):
+        """测试CSV导入中的AI分析按import类别排队"""
+        from csv_import import _ImportState, _apply_ai_analysis
+        from models import Problem
+
+        classes = []
+        with patch('csv_import.analyze_problem_with_ai',
+                   side_effect=lambda *args, **kwargs: classes.append(current_ai_work_class()) or {'analysis': ''}), \
+                patch('csv_import.extract_category_from_ai_response', return_value={'problem_category_id': 1,
+                                                                                   'solution_category_id': 1}):
+            _apply_ai_analysis(Problem(title='泵体泄漏', description='密封圈老化', phase='usage'), None,
+                               _ImportState(False, 'off', 0))
+        self.assertEqual(classes, ['import'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+基准测试工具单元测试
+验证合成数据可复现、数据库填充、百分位计算以及压测统计
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import create_engine, func, select
+from config import Config
+from models import db, Problem, VectorOutbox
+from app import app as flask_app
+from benchmarks.synthetic_data import generate_problems, parse_scale, PHASES, PRIORITIES
+from benchmarks.seed_database import seed_database
+from benchmarks.load_test import percentile, parse_mix, run_load
+from benchmarks.compare import compare_reports
+from benchmarks.import_benchmark import run_import_case
+from benchmarks.parallel_validation_benchmark import run_benchmark as run_parallel_validation_benchmark
+
+
+class TestBenchmarks(unittest.TestCase):
+    """基准测试工具测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_generate_problems_is_deterministic(self):
+        """测试相同种子生成相同数据且字段取值合法"""
+        first = list(generate_problems(50, seed=3))
+        self.assertEqual(first, list(generate_problems(50, seed=3)))
+        self.assertNotEqual(first, list(generate_problems(50, seed=4)))
+        for problem in first:
+            self.assertIn(problem['phase'], PHASES)
+            self.assertIn(problem['priority'], PRIORITIES)
+            self.assertTrue(problem['title'] and problem['description'])
+        self.assertEqual(parse_scale('100k'), 100_000)
+        self.assertEqual(parse_scale('250'), 250)
+
+    def test_seed_database(self):
+        """测试批量填充写入指定数量且不产生发件箱记录"""
+        url = 'sqlite:///' + os.path.join(self.temp_dir, 'bench.db')
+        result = seed_database(url, 120, batch_size=50, verbose=False)
+        self.assertEqual(result['inserted'], 120)
+
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(select(func.count()).select_from(Problem.__table__)).scalar(), 120)
+            self.assertEqual(conn.execute(select(func.count()).select_from(VectorOutbox.__table__)).scalar(), 0)
+            missing_hash = conn.execute(select(func.count()).select_from(Problem.__table__)
+                                        .where(Problem.__table__.c.content_hash.is_(None))).scalar()
+            self.assertEqual(missing_hash, 0)
+        engine.dispose()
+
+    def test_percentile_nearest_rank(self):
+        """测试最近秩百分位"""
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 95), 95.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([7.0], 99), 7.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_load_against_app(self):
+        """测试用Flask测试客户端驱动压测并统计错误"""
+        flask_app.config.from_object(Config)
+        flask_app.config['TESTING'] = True
+        with flask_app.app_context():
+            db.drop_all()
+            db.create_all()
+        client = flask_app.test_client()
+
+        def send(spec):
+            response = client.open(spec['path'], method=spec['method'], query_string=spec.get('params'),
+                                   json=spec.get('json'))
+            return response.status_code
+
+        try:
+            results = run_load(send, parse_mix('list_problems=3,dashboard_stats=1'), concurrency=1,
+                               duration=None, total_requests=20)
+        finally:
+            with flask_app.app_context():
+                db.session.remove()
+                db.drop_all()
+
+        self.assertEqual(results['overall']['count'], 20)
+        self.assertEqual(results['overall']['errors'], 0)
+        self.assertLessEqual(results['overall']['p50_ms'], results['overall']['p99_ms'])
+
+        with self.assertRaises(ValueError):
+            parse_mix('unknown=1')
+
+    def test_import_benchmark_reports_stages(self):
+        """测试导入基准按阶段统计耗时和峰值内存"""
+        case = run_import_case(60, encoding='gbk', delimiter=';', error_rate=0.1, track_memory=True)
+        self.assertEqual(case['rows'], 60)
+        self.assertGreater(case['imported'], 0)
+        self.assertEqual(case['vectors_upserted'], case['imported'])
+        for stage in ('decode', 'validate', 'lookup', 'ai', 'build', 'write', 'vector_sync'):
+            self.assertIn(stage, case['stages'])
+            self.assertIn(stage, case['peak_memory_kb'])
+        self.assertEqual(case['stages']['validate']['rows'], 60)
+
+    def test_parallel_validation_benchmark(self):
+        """测试多进程验证基准在各进程数下结果与逐行处理一致"""
+        results = run_parallel_validation_benchmark(200, worker_counts=[1, 2], chunk_size=50, error_rate=0.1)
+        self.assertEqual([case['workers'] for case in results['cases']], [1, 2])
+        self.assertTrue(all(case['identical'] for case in results['cases']))
+
+    def test_compare_reports(self):
+        """测试报告对比计算变化百分比"""
+        def report(p95):
+            stats = {'p50_ms': 10, 'p95_ms': p95, 'p99_ms': 40, 'throughput_rps': 100, 'errors': 0}
+            return {'results': {'overall': stats, 'scenarios': {'list_problems': stats}}}
+
+        rows = compare_reports(report(20), report(30))
+        row = next(r for r in rows if r['scenario'] == 'list_problems' and r['metric'] == 'p95_ms')
+        self.assertEqual(row['change_percent'], 50.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Parquet/Arrow列式导入导出单元测试
+验证带类型的列直接进入清理验证、导出文件可重新导入，以及未安装pyarrow时接口的错误响应
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+from config import Config
+from models import db, Problem, EquipmentType
+from columnar_io import PYARROW_AVAILABLE, columnar_format
+from csv_import import import_csv_file, validate_csv_headers, _clean_and_validate_data
+from app import app as flask_app
+
+
+class TestColumnarIO(unittest.TestCase):
+    """列式导入导出测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.temp_dir = os.path.relpath(tempfile.mkdtemp(dir='.'))
+        self.ai_patch = patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'})
+        self.ai_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.ai_patch.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_typed_values_skip_parsing(self):
+        """测试日期/时间戳类型的值直接使用，数字等其他类型按字符串清理"""
+        row = {'title': '泵体泄漏', 'description': 12345, 'discovered_at': datetime(2024, 3, 5, 8, 30)}
+        cleaned_data, errors = _clean_and_validate_data(row, 1)
+        self.assertEqual(cleaned_data['discovered_at'], date(2024, 3, 5))
+        self.assertEqual(cleaned_data['description'], '12345')
+        self.assertEqual(errors, [])
+
+        cleaned_data, _ = _clean_and_validate_data({'title': '泵体泄漏', 'discovered_at': date(2024, 3, 6)}, 1)
+        self.assertEqual(cleaned_data['discovered_at'], date(2024, 3, 6))
+
+    def test_columnar_format(self):
+        """测试列式文件扩展名识别"""
+        self.assertEqual(columnar_format('a.parquet'), 'parquet')
+        self.assertEqual(columnar_format('a.FEATHER'), 'arrow')
+        self.assertIsNone(columnar_format('a.csv'))
+
+    @unittest.skipIf(PYARROW_AVAILABLE, '已安装pyarrow')
+    def test_endpoints_without_pyarrow(self):
+        """测试未安装pyarrow时导出返回501、上传列式文件返回400"""
+        client = self.app.test_client()
+        self.assertEqual(client.get('/api/problems/export?format=csv').status_code, 400)
+        self.assertEqual(client.get('/api/problems/export').status_code, 501)
+        response = client.post('/api/import-csv', data={'csvFile': (io.BytesIO(b'PAR1'), 'problems.parquet')},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pyarrow', response.get_json()['error'])
+
+    @unittest.skipUnless(PYARROW_AVAILABLE, '未安装pyarrow')
+    def test_export_and_reimport_round_trip(self):
+        """测试导出的Parquet/Arrow文件列名与导入一致，重新导入后字段和日期类型保持不变"""
+        from columnar_io import export_problems, read_column_names
+
+        pump = EquipmentType(name='液压泵')
+        db.session.add(pump)
+        db.session.flush()
+        db.session.add_all([
+            Problem(title='泵体泄漏', description='密封圈老化', equipment_type_id=pump.id, phase='usage',
+                    priority='high', discovered_at=date(2024, 3, 5)),
+            Problem(title='电机过热', description='风扇损坏', phase='maintenance', priority='low')
+        ])
+        db.session.commit()
+
+        for fmt in ('parquet', 'arrow'):
+            with self.subTest(fmt=fmt):
+                path = os.path.join(self.temp_dir, f'problems.{fmt}')
+                self.assertEqual(export_problems(path, fmt, batch_size=1), Problem.query.count())
+                self.assertTrue(validate_csv_headers(path)['valid'])
+                self.assertIn('discovered_at', read_column_names(path))
+
+                exported = Problem.query.count()
+                result = import_csv_file(path, force_reimport=True)
+                self.assertEqual((result['importedCount'], result['failedCount']), (exported, 0))
+                imported = Problem.query.filter_by(title='泵体泄漏').order_by(Problem.id.desc()).first()
+                self.assertEqual(imported.discovered_at, date(2024, 3, 5))
+                self.assertEqual(imported.phase, 'usage')
+                self.assertEqual(imported.equipment_type_id, pump.id)
+
+    @unittest.skipUnless(PYARROW_AVAILABLE, '未安装pyarrow')
+    def test_export_endpoint(self):
+        """测试导出接口返回文件并在发送后删除临时文件"""
+        db.session.add(Problem(title='泵体泄漏', description='密封圈老化', phase='usage'))
+        db.session.commit()
+        self.app.config['UPLOAD_FOLDER'] = self.temp_dir
+        try:
+            response = self.app.test_client().get('/api/problems/export?format=arrow')
+            self.assertEqual(response.status_code, 200)
+            self.assertGreater(len(response.get_data()), 0)
+            response.close()
+            self.assertEqual(os.listdir(os.path.join(self.temp_dir, 'exports')), [])
+        finally:
+            self.app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
+
+
+if __name__ == '__main__':
+    unittest.main()
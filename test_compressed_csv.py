@@ -0,0 +1,155 @@
+"""
+压缩CSV上传单元测试
+验证.csv.gz和.zip边读边解压导入、解压后大小限制，以及zip中多个CSV作为子导入处理
+"""
+
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import patch
+from config import Config
+from models import db, Problem, ImportHistory
+from compressed_csv import list_archive_csv_members, source_extension
+from csv_import import import_csv_file, import_csv_archive
+from app import app as flask_app
+
+PUMP_CSV = """title,description,phase,priority
+泵体泄漏,密封圈老化,usage,high
+电机过热,风扇损坏,usage,low
+"""
+
+VALVE_CSV = """title,description,phase
+阀门卡滞,阀芯磨损,maintenance
+"""
+
+
+class TestCompressedCSV(unittest.TestCase):
+    """压缩CSV上传测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.temp_dir = os.path.relpath(tempfile.mkdtemp(dir='.'))
+        self.ai_patch = patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'})
+        self.ai_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.ai_patch.stop()
+        for name in os.listdir(self.temp_dir):
+            os.unlink(os.path.join(self.temp_dir, name))
+        os.rmdir(self.temp_dir)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def create_gzip(self, content=PUMP_CSV):
+        """创建测试.csv.gz文件"""
+        path = os.path.join(self.temp_dir, 'problems.csv.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def create_zip(self, members):
+        """创建包含指定文件的测试zip文件"""
+        path = os.path.join(self.temp_dir, 'problems.zip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, content in members.items():
+                archive.writestr(name, content)
+        return path
+
+    def test_source_extension(self):
+        """测试数据源扩展名识别"""
+        self.assertEqual(source_extension('a.CSV.GZ'), 'csv.gz')
+        self.assertEqual(source_extension('a.csv'), 'csv')
+        self.assertEqual(source_extension('a.zip'), 'zip')
+        self.assertIsNone(source_extension('a.txt.gz'))
+
+    def test_gzip_import_without_extracting(self):
+        """测试.csv.gz逐行和pandas引擎导入，解压后的数据不写入磁盘"""
+        path = self.create_gzip()
+        for engine in ('python', 'pandas'):
+            with self.subTest(engine=engine):
+                result = import_csv_file(path, engine=engine, force_reimport=True)
+                self.assertEqual((result['importedCount'], result['failedCount']), (2, 0))
+                self.assertEqual(os.listdir(self.temp_dir), ['problems.csv.gz'])
+        self.assertEqual(Problem.query.count(), 4)
+
+    def test_decompressed_size_limit(self):
+        """测试按解压后的字节数限制大小"""
+        path = self.create_gzip(PUMP_CSV * 50)
+        with patch.object(Config, 'CSV_DECOMPRESSED_SIZE_LIMIT', 1024), self.assertRaises(ValueError):
+            import_csv_file(path)
+
+        with patch.object(Config, 'CSV_DECOMPRESSED_SIZE_LIMIT', 10):
+            with self.assertRaises(ValueError):
+                list_archive_csv_members(self.create_zip({'a.csv': PUMP_CSV}))
+
+    def test_zip_members_imported_as_sub_jobs(self):
+        """测试zip中的每个CSV作为独立的子导入，格式错误的文件不影响其他文件"""
+        path = self.create_zip({
+            'pumps.csv': PUMP_CSV,
+            'nested/valves.csv': VALVE_CSV,
+            'invalid.csv': 'name,value\n泵,1\n',
+            'readme.txt': '说明',
+            '__MACOSX/._pumps.csv': 'x'
+        })
+        result = import_csv_archive(path, workers=2)
+
+        self.assertEqual(result['fileCount'], 3)
+        self.assertEqual(result['failedFileCount'], 1)
+        self.assertEqual(result['importedCount'], 3)
+        files = {entry['file']: entry for entry in result['files']}
+        self.assertEqual(files['pumps.csv']['importedCount'], 2)
+        self.assertEqual(files['nested/valves.csv']['importedCount'], 1)
+        self.assertIn('缺少必需的列', files['invalid.csv']['error'])
+        self.assertEqual(Problem.query.count(), 3)
+        self.assertEqual(sorted(history.filename for history in ImportHistory.query.all()),
+                         ['problems.zip/nested/valves.csv', 'problems.zip/pumps.csv'])
+
+    def test_zip_with_many_members_on_sqlite(self):
+        """测试SQLite下zip中多个CSV文件全部导入，批量提交不会因数据库被锁而失败"""
+        members = {f'part{i}.csv': 'title,description,phase\n' + ''.join(
+            f'问题{i}-{j},描述{i}-{j},usage\n' for j in range(60)) for i in range(6)}
+        from concurrent.futures import ThreadPoolExecutor
+        with patch.object(Config, 'CSV_BATCH_SIZE', 5), \
+                patch('concurrent.futures.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as executor:
+            result = import_csv_archive(self.create_zip(members), workers=4)
+
+        # SQLite只允许一个写事务，各子导入依次处理
+        self.assertEqual(executor.call_args.kwargs['max_workers'], 1)
+
+        self.assertEqual((result['fileCount'], result['failedFileCount']), (6, 0))
+        self.assertEqual((result['importedCount'], result['failedCount']), (360, 0))
+        self.assertEqual(Problem.query.count(), 360)
+
+    def test_upload_compressed_files(self):
+        """测试上传接口接受.csv.gz和.zip"""
+        client = self.app.test_client()
+        gzip_data = gzip.compress(PUMP_CSV.encode('utf-8'))
+        response = client.post('/api/import-csv', data={'csvFile': (io.BytesIO(gzip_data), 'problems.csv.gz')},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['importedCount'], 2)
+
+        with open(self.create_zip({'valves.csv': VALVE_CSV}), 'rb') as f:
+            zip_data = f.read()
+        response = client.post('/api/import-csv', data={'csvFile': (io.BytesIO(zip_data), 'problems.zip')},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertEqual((result['fileCount'], result['importedCount']), (1, 1))
+        self.assertEqual(Problem.query.count(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+CSV导入重复上传识别单元测试
+验证相同内容的文件按相同选项已导入完成时直接返回之前的结果、正在导入时等待其完成，
+以及强制重新导入和选项不同时照常导入
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from config import Config
+from models import db, Problem, ImportHistory
+from csv_import import import_csv_file, compute_file_hash
+from app import app as flask_app
+
+CSV_CONTENT = """title,description,phase
+泵体泄漏,密封圈老化,usage
+电机过热,风扇损坏,usage
+"""
+
+
+class TestCSVImportDedupe(unittest.TestCase):
+    """重复上传识别测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.csv_files = []
+        self.ai_patch = patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'})
+        self.ai_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.ai_patch.stop()
+        for path in self.csv_files:
+            os.unlink(path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def create_test_csv(self, content=CSV_CONTENT):
+        """创建测试CSV文件（每次上传保存为不同的文件）"""
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(content)
+        path = os.path.relpath(f.name)
+        self.csv_files.append(path)
+        return path
+
+    def _in_flight_history(self, path):
+        """模拟另一个请求正在导入相同文件"""
+        history = ImportHistory(filename='other.csv', status='processing', started_at=datetime.now(),
+                                checkpoint_at=datetime.now(), processed_records=1, checkpoint_row=1,
+                                file_hash=compute_file_hash(path),
+                                import_options=json.dumps({'fail_on_error': False, 'duplicate_mode': 'off',
+                                                           'duplicate_threshold': 0.95, 'engine': 'python'}))
+        db.session.add(history)
+        db.session.commit()
+        return history
+
+    def test_completed_import_reused(self):
+        """测试相同文件再次上传时返回之前的结果，不再写入"""
+        first = import_csv_file(self.create_test_csv())
+        self.assertFalse(first['reusedResult'])
+
+        with patch('csv_import._process_batch') as process_batch:
+            second = import_csv_file(self.create_test_csv())
+        process_batch.assert_not_called()
+        self.assertTrue(second['reusedResult'])
+        self.assertEqual(second['historyId'], first['historyId'])
+        self.assertEqual(second['importedCount'], 2)
+        self.assertEqual(Problem.query.count(), 2)
+        self.assertEqual(ImportHistory.query.count(), 1)
+
+    def test_force_reimport_and_different_options(self):
+        """测试强制重新导入或导入选项不同时照常导入"""
+        import_csv_file(self.create_test_csv())
+
+        forced = import_csv_file(self.create_test_csv(), force_reimport=True)
+        self.assertFalse(forced['reusedResult'])
+        self.assertEqual(Problem.query.count(), 4)
+
+        skipped = import_csv_file(self.create_test_csv(), duplicate_mode='skip')
+        self.assertFalse(skipped['reusedResult'])
+        self.assertEqual(skipped['duplicateCount'], 2)
+        self.assertEqual(ImportHistory.query.count(), 3)
+
+    def test_attach_to_in_flight_import(self):
+        """测试相同文件正在导入时等待其完成并返回其结果"""
+        path = self.create_test_csv()
+        history = self._in_flight_history(path)
+
+        def finish_import(seconds):
+            history.status = 'completed'
+            history.result_summary = json.dumps({'importedCount': 2, 'historyId': history.id})
+            db.session.commit()
+
+        with patch('csv_import.time.sleep', side_effect=finish_import) as sleep, \
+                patch.object(Config, 'CSV_DEDUPE_WAIT_SECONDS', 60):
+            result = import_csv_file(path)
+        sleep.assert_called_once()
+        self.assertEqual(result, {'importedCount': 2, 'historyId': history.id, 'reusedResult': True})
+        self.assertEqual(ImportHistory.query.count(), 1)
+
+    def test_in_flight_wait_timeout(self):
+        """测试等待超时时返回进行中导入的当前进度"""
+        path = self.create_test_csv()
+        history = self._in_flight_history(path)
+
+        with patch.object(Config, 'CSV_DEDUPE_WAIT_SECONDS', 0):
+            result = import_csv_file(path)
+        self.assertTrue(result['inProgress'])
+        self.assertEqual((result['historyId'], result['importedCount']), (history.id, 1))
+        self.assertEqual(Problem.query.count(), 0)
+
+        # 超过续传超时的“处理中”导入视为已中断，不再等待
+        with patch.object(Config, 'CSV_RESUME_STALE_SECONDS', 0):
+            result = import_csv_file(path)
+        self.assertFalse(result['reusedResult'])
+        self.assertEqual(Problem.query.count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+CSV导入重复检测单元测试
+验证内容哈希精确匹配以及skip/merge/flag三种处理模式
+"""
+
+import os
+import unittest
+import uuid
+from config import Config
+from models import db, Problem, compute_content_hash
+from csv_import import import_csv_file
+from app import app as flask_app
+
+
+class TestCSVImportDuplicates(unittest.TestCase):
+    """CSV导入重复检测测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.created_files = []
+
+    def tearDown(self):
+        """测试后清理"""
+        for path in self.created_files:
+            if os.path.exists(path):
+                os.unlink(path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def create_test_csv(self, content):
+        """在上传目录中创建测试用CSV文件（导入函数只接受相对路径）"""
+        os.makedirs('uploads', exist_ok=True)
+        path = os.path.join('uploads', f'test_dup_{uuid.uuid4().hex}.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.created_files.append(path)
+        return path
+
+    def test_content_hash_normalization(self):
+        """测试内容哈希忽略大小写和多余空白"""
+        self.assertEqual(
+            compute_content_hash('Pump  Leak', ' Seal worn out '),
+            compute_content_hash('pump leak', 'seal   worn out')
+        )
+        self.assertNotEqual(
+            compute_content_hash('pump leak', 'seal worn out'),
+            compute_content_hash('pump leak', 'seal cracked')
+        )
+
+    def test_skip_existing_duplicates(self):
+        """测试跳过模式下重新上传相同文件不会重复插入"""
+        csv_content = """title,description,phase
+水泵漏水,密封圈老化,usage
+电机过热,散热风扇损坏,usage
+"""
+        first = import_csv_file(self.create_test_csv(csv_content))
+        self.assertEqual(first['importedCount'], 2)
+
+        second = import_csv_file(self.create_test_csv(csv_content), duplicate_mode='skip')
+        self.assertEqual(second['importedCount'], 0)
+        self.assertEqual(second['duplicateCount'], 2)
+        self.assertTrue(all(r['action'] == 'skipped' and r['match'] == 'exact'
+                            for r in second['duplicateRecords']))
+        self.assertEqual(Problem.query.count(), 2)
+
+    def test_flag_duplicates_within_file(self):
+        """测试标记模式下文件内重复行照常导入并被报告"""
+        csv_content = """title,description,phase
+水泵漏水,密封圈老化,usage
+水泵漏水,密封圈老化,usage
+"""
+        result = import_csv_file(self.create_test_csv(csv_content), duplicate_mode='flag')
+        self.assertEqual(result['importedCount'], 2)
+        self.assertEqual(result['duplicateCount'], 1)
+        self.assertEqual(result['duplicateRecords'][0]['row'], 2)
+        self.assertEqual(result['duplicateRecords'][0]['duplicate_of_row'], 1)
+        self.assertEqual(result['duplicateRecords'][0]['action'], 'flagged')
+
+    def test_merge_fills_missing_fields(self):
+        """测试合并模式只补充已有问题中的空字段"""
+        import_csv_file(self.create_test_csv("""title,description,phase
+水泵漏水,密封圈老化,usage
+"""))
+        result = import_csv_file(self.create_test_csv("""title,description,phase,discovered_by,priority
+水泵漏水,密封圈老化,usage,张三,critical
+"""), duplicate_mode='merge')
+        self.assertEqual(result['importedCount'], 0)
+        self.assertEqual(result['duplicateRecords'][0]['action'], 'merged')
+
+        # 只验证时与实际导入一样，合并的行不计入可导入行数
+        report = import_csv_file(self.create_test_csv("""title,description,phase
+水泵漏水,密封圈老化,usage
+电机过热,风扇损坏,usage
+"""), duplicate_mode='merge', validate_only=True)
+        self.assertEqual(report['validCount'], 1)
+        self.assertEqual(report['duplicateRecords'][0]['action'], 'merged')
+
+        problem = Problem.query.one()
+        self.assertEqual(problem.discovered_by, '张三')
+        self.assertEqual(problem.priority, 'critical')
+
+    def test_invalid_duplicate_mode(self):
+        """测试无效的重复处理模式"""
+        with self.assertRaises(ValueError):
+            import_csv_file(self.create_test_csv("title,description\na,b\n"), duplicate_mode='replace')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ from datetime import datetime
 from config import Config
 from models import db, Problem, EquipmentType, ImportHistory, ProblemCategory, SolutionCategory
 from csv_import import import_csv_file, validate_csv_headers, _sanitize_input, _validate_enum_value, _clean_and_validate_data, _detect_csv_delimiter
+from csv_import import DATE_FORMATS, _DateParser, _infer_date_format, _parse_date_any_format
 from app import app as flask_app
 
 
@@ -266,6 +267,52 @@ class TestImprovedCSVImport(unittest.TestCase):
             import_csv_file('/etc/passwd')
         self.assertIn('非法文件路径', str(context.exception))
 
+    def test_infer_date_format(self):
+        """测试根据列样本推断日期格式"""
+        self.assertEqual(_infer_date_format(['15/03/2023', '01/12/2022', '', None, 'bad']), '%d/%m/%Y')
+        self.assertEqual(_infer_date_format(['2023.03.15', '2023-03-16', '2023.03.17']), '%Y.%m.%d')
+        self.assertIsNone(_infer_date_format(['', '未知日期']))
+
+    def test_date_parser_matches_multi_format_search(self):
+        """测试按推断格式解析的结果与逐个格式尝试完全一致，不匹配时回退"""
+        values = ['2023-03-15', '2023/03/15', '15/03/2023', '15-03-2023', '2023-03-15 08:30:00', '2023.03.15',
+                  '2023-3-5', '10-11-12', '2023-02-30', '2023-03-15 24:00:00', '2023-03-15 23:59:60',
+                  '0000-01-01', '２０２３-03-15', 'invalid', '']
+        for date_format in DATE_FORMATS + [None]:
+            parser = _DateParser(date_format)
+            for value in values:
+                self.assertEqual(parser.parse(value), _parse_date_any_format(value)[0], (date_format, value))
+
+        parser = _DateParser('%d/%m/%Y')
+        parser.parse('15/03/2023')
+        self.assertEqual(parser.fallback_count, 0)
+        parser.parse('2023-03-15')
+        self.assertEqual(parser.fallback_count, 1)
+
+        cleaned_data, _ = _clean_and_validate_data({'title': '标题', 'discovered_at': '15/03/2023'}, 1,
+                                                   _DateParser('%d/%m/%Y'))
+        self.assertEqual(cleaned_data['discovered_at'], datetime(2023, 3, 15).date())
+
+    def test_import_reports_detected_date_format(self):
+        """测试导入结果报告推断出的日期格式"""
+        csv_content = """title,description,phase,discovered_at
+问题1,描述1,design,15/03/2023
+问题2,描述2,usage,16/03/2023
+问题3,描述3,usage,2023-03-17
+"""
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(csv_content)
+        csv_file_path = os.path.relpath(f.name)
+
+        try:
+            result = import_csv_file(csv_file_path)
+            self.assertEqual(result['detectedDateFormat'], '%d/%m/%Y')
+            self.assertEqual(result['dateFallbackCount'], 1)
+            dates = sorted(problem.discovered_at for problem in Problem.query.all())
+            self.assertEqual([d.day for d in dates], [15, 16, 17])
+        finally:
+            os.unlink(csv_file_path)
+
 
 class TestCSVImportIntegration(unittest.TestCase):
     """CSV导入功能集成测试"""
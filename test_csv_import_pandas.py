@@ -0,0 +1,108 @@
+"""
+CSV导入pandas引擎单元测试
+验证列式清理验证与逐行_clean_and_validate_data()结果一致，以及两种引擎的导入结果一致
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db, Problem
+from csv_import import import_csv_file, _clean_and_validate_data, _DateParser
+from csv_import_pandas import read_csv_chunks, clean_and_validate_frame
+from app import app as flask_app
+
+CSV_CONTENT = """标题,原因,设备类型,阶段,优先级,发现者,发现时间,description
+泵体泄漏,密封圈老化,液压泵,usage,high,张伟,15/03/2023,
+<script>alert(1)</script>电机过热,风扇损坏 onload=eval(x),电机,design,critical,李强,16/03/2023,
+阀门卡滞,,阀门,unknown,urgent,王芳,2023-03-17,备用描述
+,,,,,,,
+!!@@##$$%%^^&&**,,,,,,31/31/2020,
+传感器漂移,document.cookie 读数异常,传感器,maintenance,low,,30/02/2023,
+短行,只有两列
+年份很早,描述,设备,usage,low,陈静,01/01/1500,
+ 前后空格 , 描述 ,  设备  , usage , low , 刘洋 , 02/01/2023 ,
+"""
+
+
+class TestCSVImportPandas(unittest.TestCase):
+    """pandas导入引擎测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(CSV_CONTENT)
+        self.csv_file_path = os.path.relpath(f.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        os.unlink(self.csv_file_path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_frame_validation_matches_row_validation(self):
+        """测试列式清理验证的结果与逐行处理完全一致（包括错误信息及顺序）"""
+        with open(self.csv_file_path, encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        row_parser = _DateParser('%d/%m/%Y')
+        expected = [(i + 1, row) + _clean_and_validate_data(row, i + 1, row_parser) for i, row in enumerate(rows)]
+
+        frame_parser = _DateParser('%d/%m/%Y')
+        actual = []
+        for chunk in read_csv_chunks(self.csv_file_path, 'utf-8', ',', 3):
+            actual.extend(clean_and_validate_frame(chunk, len(actual) + 1, frame_parser))
+
+        self.assertEqual(len(actual), len(expected))
+        for expected_row, actual_row in zip(expected, actual):
+            # 行内缺少的字段在原始数据中为''（csv.DictReader为None），清理后数据和错误信息完全一致
+            row_num, raw_row, cleaned_data, errors = expected_row
+            raw_row = {key: '' if value is None else value for key, value in raw_row.items()}
+            self.assertEqual(actual_row, (row_num, raw_row, cleaned_data, errors))
+        self.assertEqual(frame_parser.fallback_count, row_parser.fallback_count)
+
+    def test_engines_produce_same_import(self):
+        """测试两种引擎导入的问题和失败记录一致"""
+        def run(engine):
+            db.drop_all()
+            db.create_all()
+            with patch.object(Config, 'CSV_BATCH_SIZE', 2), \
+                    patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+                result = import_csv_file(self.csv_file_path, engine=engine)
+            problems = [(p.title, p.description, p.phase, p.priority, p.discovered_by, p.discovered_at)
+                        for p in Problem.query.order_by(Problem.id).all()]
+            return result, problems
+
+        python_result, python_problems = run('python')
+        pandas_result, pandas_problems = run('pandas')
+        self.assertEqual(pandas_problems, python_problems)
+        for key in ('importedCount', 'failedCount', 'totalCount', 'failedRecords', 'detectedDateFormat',
+                    'dateFallbackCount'):
+            self.assertEqual(pandas_result[key], python_result[key], key)
+
+    def test_row_limit_matches_row_engine(self):
+        """测试行数限制的处理与逐行引擎一致"""
+        with patch.object(Config, 'CSV_MAX_ROWS', 4):
+            python_result = import_csv_file(self.csv_file_path, engine='python')
+            pandas_result = import_csv_file(self.csv_file_path, engine='pandas')
+        self.assertEqual(pandas_result['totalCount'], python_result['totalCount'])
+        self.assertEqual(pandas_result['importedCount'], python_result['importedCount'])
+        self.assertEqual(pandas_result['errorCount'], 1)
+
+    def test_invalid_engine(self):
+        """测试无效引擎名称"""
+        with self.assertRaises(ValueError):
+            import_csv_file(self.csv_file_path, engine='spark')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+CSV导入多进程验证单元测试
+验证多进程引擎与逐行引擎的导入结果、错误行号和行数限制一致
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db, Problem
+from csv_import import import_csv_file, _clean_and_validate_data, _DateParser
+from csv_import_parallel import validate_rows_in_pool
+from test_csv_import_pandas import CSV_CONTENT
+from app import app as flask_app
+
+
+class TestCSVImportParallel(unittest.TestCase):
+    """多进程导入引擎测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(CSV_CONTENT)
+        self.csv_file_path = os.path.relpath(f.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        os.unlink(self.csv_file_path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_pool_results_keep_order_and_row_numbers(self):
+        """测试小块分发到多个进程时结果顺序和行号与逐行处理一致"""
+        with open(self.csv_file_path, encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        row_parser = _DateParser('%d/%m/%Y')
+        expected = [(i + 1, row) + _clean_and_validate_data(row, i + 1, row_parser) for i, row in enumerate(rows)]
+
+        actual = []
+        fallback_count = 0
+        for validated_rows, chunk_fallback_count in validate_rows_in_pool(iter(rows), '%d/%m/%Y', workers=2,
+                                                                          chunk_size=2):
+            actual.extend(validated_rows)
+            fallback_count += chunk_fallback_count
+        self.assertEqual(actual, expected)
+        self.assertEqual(fallback_count, row_parser.fallback_count)
+
+    def test_engines_produce_same_import(self):
+        """测试多进程引擎与逐行引擎导入的问题和失败记录一致"""
+        def run(engine):
+            db.drop_all()
+            db.create_all()
+            with patch.object(Config, 'CSV_BATCH_SIZE', 2), patch.object(Config, 'CSV_PROCESS_CHUNK_SIZE', 3), \
+                    patch.object(Config, 'CSV_PROCESS_WORKERS', 2), \
+                    patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+                result = import_csv_file(self.csv_file_path, engine=engine)
+            problems = [(p.title, p.description, p.phase, p.priority, p.discovered_by, p.discovered_at)
+                        for p in Problem.query.order_by(Problem.id).all()]
+            return result, problems
+
+        python_result, python_problems = run('python')
+        process_result, process_problems = run('process')
+        self.assertEqual(process_problems, python_problems)
+        for key in ('importedCount', 'failedCount', 'totalCount', 'failedRecords', 'detectedDateFormat',
+                    'dateFallbackCount'):
+            self.assertEqual(process_result[key], python_result[key], key)
+        self.assertEqual(process_result['stageStats']['validate']['rows'], python_result['totalCount'])
+
+    def test_worker_uses_runtime_config(self):
+        """测试子进程使用主进程运行时的配置值"""
+        rows = [{'title': '很长的标题' * 10, 'description': '描述'}]
+        with patch.object(Config, 'CSV_TITLE_MAX_LENGTH', 5):
+            results = list(validate_rows_in_pool(iter(rows), None, workers=1))
+        self.assertEqual(results[0][0][0][2]['title'], '很长的标题')
+
+    def test_row_limit_matches_row_engine(self):
+        """测试行数限制的处理与逐行引擎一致"""
+        with patch.object(Config, 'CSV_MAX_ROWS', 4), patch.object(Config, 'CSV_PROCESS_CHUNK_SIZE', 3):
+            python_result = import_csv_file(self.csv_file_path, engine='python')
+            process_result = import_csv_file(self.csv_file_path, engine='process')
+        self.assertEqual(process_result['totalCount'], python_result['totalCount'])
+        self.assertEqual(process_result['importedCount'], python_result['importedCount'])
+        self.assertEqual(process_result['errorCount'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
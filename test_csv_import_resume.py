@@ -0,0 +1,166 @@
+"""
+CSV导入断点续传单元测试
+模拟导入进程在批次之间退出，验证检查点记录以及续传时不重复分析、不重复写入已提交的行
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from config import Config
+from models import db, Problem, ImportHistory
+import csv_import
+from csv_import import import_csv_file, resume_import, find_resumable_imports
+from app import app as flask_app
+
+ROW_COUNT = 10
+
+
+class _WorkerKilled(BaseException):
+    """模拟导入进程被杀死（不会被导入流程中的except Exception捕获）"""
+
+
+def _build_csv_content():
+    lines = ['title,description,equipment_type,phase,priority,discovered_by,discovered_at']
+    for i in range(1, ROW_COUNT + 1):
+        lines.append(f'问题{i},描述{i},设备{i % 3},usage,low,张伟,2023-03-{i:02d}')
+    lines.insert(5, ',,,,,,')  # 空行（标题和描述都为空，跳过）
+    lines.insert(8, f'问题无效,描述,设备,usage,{"!" * 40},李强,2023-04-01')  # 无效优先级+特殊字符，仅警告
+    return '\n'.join(lines) + '\n'
+
+
+class TestCSVImportResume(unittest.TestCase):
+    """断点续传测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(_build_csv_content())
+        self.csv_file_path = os.path.relpath(f.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        if os.path.exists(self.csv_file_path):
+            os.unlink(self.csv_file_path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _crash_after_batches(self, committed_batches, engine='python'):
+        """导入时在第committed_batches+1次批量提交时模拟进程退出，返回导入历史ID"""
+        original_process_batch = csv_import._process_batch
+        calls = []
+
+        def process_batch(batch_items, state):
+            calls.append(len(batch_items))
+            if len(calls) > committed_batches:
+                raise _WorkerKilled()
+            return original_process_batch(batch_items, state)
+
+        with patch.object(Config, 'CSV_BATCH_SIZE', 2), \
+                patch('csv_import._process_batch', side_effect=process_batch), \
+                patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            with self.assertRaises(_WorkerKilled):
+                import_csv_file(self.csv_file_path, engine=engine)
+        db.session.rollback()
+        history = ImportHistory.query.one()
+        return history.id
+
+    def test_checkpoint_recorded_with_batches(self):
+        """测试检查点与已提交的批次一致，进程退出后状态保持为处理中"""
+        history_id = self._crash_after_batches(2)
+        history = db.session.get(ImportHistory, history_id)
+        self.assertEqual(history.status, 'processing')
+        self.assertEqual(history.processed_records, 4)
+        self.assertEqual(Problem.query.count(), 4)
+        self.assertEqual(history.checkpoint_row, 4)  # 第2批最后一行
+        self.assertIsNotNone(history.checkpoint_offset)
+        self.assertEqual(history.file_hash, csv_import.compute_file_hash(self.csv_file_path))
+        self.assertEqual(history.source_path, self.csv_file_path)
+
+    def test_resume_continues_after_checkpoint(self):
+        """测试各引擎续传只处理检查点之后的行，结果与一次完成的导入一致"""
+        for engine in csv_import.IMPORT_ENGINES:
+            with self.subTest(engine=engine):
+                db.session.remove()
+                db.drop_all()
+                db.create_all()
+                history_id = self._crash_after_batches(2, engine)
+
+                with patch.object(Config, 'CSV_BATCH_SIZE', 2), \
+                        patch('csv_import.analyze_problem_with_ai',
+                              return_value={'analysis': '测试AI分析结果'}) as mock_ai:
+                    result = resume_import(history_id, force=True, remove_source=False)
+
+                self.assertEqual(result['historyId'], history_id)
+                self.assertEqual(result['resumedFromRow'], 4)
+                self.assertEqual(result['importedCount'], ROW_COUNT + 1)
+                self.assertEqual(result['totalCount'], ROW_COUNT + 2)
+                self.assertEqual(mock_ai.call_count, ROW_COUNT + 1 - 4)  # 已提交的4行不再分析
+                titles = [title for title, in db.session.query(Problem.title).order_by(Problem.id)]
+                self.assertEqual(len(titles), len(set(titles)))
+                self.assertEqual(len(titles), ROW_COUNT + 1)
+                history = db.session.get(ImportHistory, history_id)
+                self.assertEqual(history.status, 'completed')
+                self.assertEqual(history.processed_records, ROW_COUNT + 1)
+
+    def test_resume_removes_source_file(self):
+        """测试续传完成后默认删除源文件"""
+        history_id = self._crash_after_batches(1)
+        with patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            resume_import(history_id, force=True)
+        self.assertFalse(os.path.exists(self.csv_file_path))
+
+    def test_resume_rejects_changed_file(self):
+        """测试源文件变化后拒绝续传"""
+        history_id = self._crash_after_batches(1)
+        with open(self.csv_file_path, 'a', encoding='utf-8') as f:
+            f.write('新增问题,描述,设备,usage,low,张伟,2023-05-01\n')
+        with self.assertRaises(ValueError):
+            resume_import(history_id, force=True)
+
+    def test_processing_import_requires_stale_checkpoint(self):
+        """测试处理中的导入只有检查点超时后才可续传"""
+        history_id = self._crash_after_batches(1)
+        with self.assertRaises(ValueError):
+            resume_import(history_id)
+        self.assertEqual(find_resumable_imports(), [])
+
+        history = db.session.get(ImportHistory, history_id)
+        history.checkpoint_at = datetime.now() - timedelta(seconds=Config.CSV_RESUME_STALE_SECONDS + 1)
+        db.session.commit()
+        self.assertEqual([h.id for h in find_resumable_imports()], [history_id])
+
+    def test_completed_import_cannot_resume(self):
+        """测试已完成的导入不能续传"""
+        with patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            result = import_csv_file(self.csv_file_path)
+        with self.assertRaises(ValueError):
+            resume_import(result['historyId'], force=True)
+        with self.assertRaises(LookupError):
+            resume_import(result['historyId'] + 100)
+
+    def test_resume_endpoint(self):
+        """测试续传接口"""
+        history_id = self._crash_after_batches(2)
+        client = self.app.test_client()
+        self.assertEqual(client.post('/api/import-history/999/resume').status_code, 404)
+        self.assertEqual(client.post(f'/api/import-history/{history_id}/resume').status_code, 409)
+
+        with patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            response = client.post(f'/api/import-history/{history_id}/resume?force=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['importedCount'], ROW_COUNT + 1)
+        self.assertEqual(client.get('/api/import-history/resumable').get_json(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+CSV导入批内行隔离单元测试
+验证批量写入中某一行违反约束时只有该行失败，同批其他行及本批创建的设备类型正常提交
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db, Problem, EquipmentType, VectorOutbox, ImportHistory
+import csv_import
+from csv_import import import_csv_file
+from app import app as flask_app
+
+CSV_CONTENT = """title,description,equipment_type,phase,priority
+泵体泄漏,密封圈老化,液压泵,usage,high
+电机过热,风扇损坏,新电机,usage,low
+阀门卡滞,阀芯磨损,新阀门,maintenance,medium
+传感器漂移,零点偏移,传感器,design,low
+"""
+
+
+class TestCSVImportRowIsolation(unittest.TestCase):
+    """批内行隔离测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(CSV_CONTENT)
+        self.csv_file_path = os.path.relpath(f.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        os.unlink(self.csv_file_path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _import_with_invalid_row(self, invalid_row, **kwargs):
+        """导入时让第invalid_row行的问题违反非空约束"""
+        original_build_problem = csv_import._build_problem
+
+        def build_problem(row_num, row, cleaned_data, warnings, state):
+            problem = original_build_problem(row_num, row, cleaned_data, warnings, state)
+            if row_num == invalid_row:
+                problem.title = None
+            return problem
+
+        with patch('csv_import._build_problem', side_effect=build_problem), \
+                patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            return import_csv_file(self.csv_file_path, **kwargs)
+
+    def test_only_offending_row_fails(self):
+        """测试违反约束的行记入失败记录，同批其他行正常提交"""
+        result = self._import_with_invalid_row(2)
+
+        self.assertEqual(result['importedCount'], 3)
+        self.assertEqual(result['failedCount'], 1)
+        self.assertEqual(result['failedRecords'][0]['row'], 2)
+        self.assertIn('写入失败', result['failedRecords'][0]['errors'][0])
+        titles = {title for title, in db.session.query(Problem.title)}
+        self.assertEqual(titles, {'泵体泄漏', '阀门卡滞', '传感器漂移'})
+        # 同批先创建的设备类型不随失败的行回滚，其他行引用的设备类型都存在
+        self.assertEqual(Problem.query.filter(Problem.equipment_type_id.isnot(None)).count(), 3)
+        for problem in Problem.query.all():
+            self.assertIsNotNone(db.session.get(EquipmentType, problem.equipment_type_id))
+        # 只有写入成功的问题进入发件箱
+        self.assertEqual(VectorOutbox.query.count(), 3)
+        history = db.session.get(ImportHistory, result['historyId'])
+        self.assertEqual((history.processed_records, history.failed_records), (3, 1))
+
+    def test_fail_on_error_aborts_batch(self):
+        """测试fail_on_error时不逐行重试，整批失败并中止导入"""
+        with self.assertRaises(Exception):
+            self._import_with_invalid_row(2, fail_on_error=True)
+        self.assertEqual(Problem.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
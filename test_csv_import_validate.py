@@ -0,0 +1,125 @@
+"""
+CSV只验证模式单元测试
+验证只验证时报告全部失败行、警告行和重复行，不写入数据库、不记录导入历史、不调用AI，
+以及超过导入行数限制的文件仍然完整验证
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db, Problem, ImportHistory
+from csv_import import import_csv_file
+from app import app as flask_app
+
+CSV_CONTENT = """title,description,phase,priority,discovered_at
+泵体泄漏,密封圈老化,usage,high,2024-01-05
+电机过热,风扇损坏,unknown,low,2024-01-06
+阀门卡滞,阀芯磨损,maintenance,urgent,2024-01-07
+泵体泄漏,密封圈老化,usage,high,2024-01-08
+"""
+
+
+class TestCSVImportValidate(unittest.TestCase):
+    """只验证模式测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.csv_files = []
+        self.ai_patch = patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'})
+        self.analyze = self.ai_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.ai_patch.stop()
+        for path in self.csv_files:
+            os.unlink(path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def create_test_csv(self, content=CSV_CONTENT):
+        """创建测试CSV文件"""
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(content)
+        path = os.path.relpath(f.name)
+        self.csv_files.append(path)
+        return path
+
+    def test_report_without_writing(self):
+        """测试各引擎只验证时返回警告行和重复行，不写入数据库、不调用AI"""
+        path = self.create_test_csv()
+        for engine in ('python', 'pandas'):
+            with self.subTest(engine=engine):
+                result = import_csv_file(path, engine=engine, validate_only=True)
+                self.assertTrue(result['validateOnly'])
+                self.assertTrue(result['valid'])
+                self.assertEqual((result['totalCount'], result['validCount'], result['importedCount']), (4, 4, 0))
+                self.assertEqual([record['row'] for record in result['warningRecords']], [2, 3])
+                self.assertEqual([(record['row'], record['duplicate_of_row']) for record in result['duplicateRecords']],
+                                 [(4, 1)])
+        self.analyze.assert_not_called()
+        self.assertEqual(Problem.query.count(), 0)
+        self.assertEqual(ImportHistory.query.count(), 0)
+
+    def test_fatal_rows_and_existing_duplicates(self):
+        """测试致命错误行全部列入报告，与数据库中已有问题重复的行按重复处理模式报告"""
+        import_csv_file(self.create_test_csv('title,description\n泵体泄漏,密封圈老化\n'))
+        self.assertEqual(Problem.query.count(), 1)
+
+        with patch('csv_import._is_fatal_error', side_effect=lambda error: '无效' in error), \
+                patch.object(Config, 'CSV_FAILED_RECORDS_PREVIEW', 1):
+            result = import_csv_file(self.create_test_csv(), duplicate_mode='skip', validate_only=True)
+        self.assertFalse(result['valid'])
+        self.assertEqual([record['row'] for record in result['failedRecords']], [2, 3])
+        self.assertFalse(result['failedRecordsTruncated'])
+        self.assertEqual([(record['row'], record['action']) for record in result['duplicateRecords']],
+                         [(1, 'skipped'), (4, 'skipped')])
+        self.assertEqual(result['validCount'], 0)
+        self.assertEqual(Problem.query.count(), 1)
+        self.assertEqual(ImportHistory.query.count(), 1)
+
+    def test_rows_beyond_import_limit(self):
+        """测试超过导入行数限制的文件仍然验证全部行，并在报告中指出"""
+        path = self.create_test_csv('title,description,phase\n' + ''.join(
+            f'问题{i},描述{i},{"bad" if i == 30 else "usage"}\n' for i in range(1, 41)))
+        with patch.object(Config, 'CSV_MAX_ROWS', 10):
+            result = import_csv_file(path, validate_only=True)
+        self.assertEqual((result['totalCount'], result['validCount']), (40, 40))
+        self.assertEqual([record['row'] for record in result['warningRecords']], [30])
+        self.assertFalse(result['valid'])
+        self.assertIn('超过导入限制', result['errors'][0])
+
+    def test_missing_headers(self):
+        """测试缺少必需的列时直接返回报告"""
+        result = import_csv_file(self.create_test_csv('name,value\n泵,1\n'), validate_only=True)
+        self.assertFalse(result['valid'])
+        self.assertEqual(result['totalCount'], 0)
+        self.assertIn('缺少必需的列', result['errors'][0])
+
+    def test_upload_validate_only(self):
+        """测试上传接口validateOnly为真时返回验证报告"""
+        client = self.app.test_client()
+        response = client.post('/api/import-csv',
+                               data={'csvFile': (io.BytesIO(CSV_CONTENT.encode('utf-8')), 'problems.csv'),
+                                     'validateOnly': 'true'},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertTrue(result['validateOnly'])
+        self.assertEqual((result['validCount'], result['warningCount'], result['duplicateCount']), (4, 2, 1))
+        self.assertEqual(Problem.query.count(), 0)
+        self.assertEqual(ImportHistory.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
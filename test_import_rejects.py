@@ -0,0 +1,132 @@
+"""
+CSV导入拒绝文件单元测试
+验证失败记录逐条写入拒绝文件、结果中只保留预览，以及分页浏览和下载接口
+"""
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db
+from csv_import import import_csv_file
+from import_rejects import RejectWriter, read_rejects, reject_file_path
+from app import app as flask_app
+
+# 第2、4、5行优先级无效，第3行阶段无效，第1、6行有效
+CSV_CONTENT = """title,description,phase,priority
+泵体泄漏,密封圈老化,usage,high
+电机过热,风扇损坏,usage,urgent
+阀门卡滞,阀芯磨损,unknown,low
+传感器漂移,零点偏移,usage,p1
+轴承异响,润滑不足,usage,p2
+皮带打滑,张力不足,usage,low
+"""
+
+
+class TestImportRejects(unittest.TestCase):
+    """拒绝文件测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+        self.reject_folder = tempfile.mkdtemp()
+        self.folder_patch = patch.object(Config, 'CSV_REJECT_FOLDER', self.reject_folder)
+        self.folder_patch.start()
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8', dir='.') as f:
+            f.write(CSV_CONTENT)
+        self.csv_file_path = os.path.relpath(f.name)
+
+    def tearDown(self):
+        """测试后清理"""
+        os.unlink(self.csv_file_path)
+        self.folder_patch.stop()
+        shutil.rmtree(self.reject_folder, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _import_with_failures(self):
+        """导入时把枚举值错误视为致命错误，使其进入失败记录"""
+        with patch('csv_import._is_fatal_error', side_effect=lambda message: '无效的枚举值' in message), \
+                patch.object(Config, 'CSV_FAILED_RECORDS_PREVIEW', 2), \
+                patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            return import_csv_file(self.csv_file_path)
+
+    def test_failures_streamed_to_reject_file(self):
+        """测试全部失败记录写入拒绝文件，结果中只保留前几条"""
+        result = self._import_with_failures()
+
+        self.assertEqual(result['failedCount'], 4)
+        self.assertEqual([record['row'] for record in result['failedRecords']], [2, 3])
+        self.assertTrue(result['failedRecordsTruncated'])
+        self.assertEqual(result['rejectFile'], reject_file_path(result['historyId']))
+
+        rejects = read_rejects(result['historyId'], 0, 100)
+        self.assertEqual([record['row'] for record in rejects], [2, 3, 4, 5])
+        self.assertEqual(rejects[0]['data']['priority'], 'urgent')
+        self.assertEqual(rejects[:2], result['failedRecords'])
+        self.assertEqual([record['row'] for record in read_rejects(result['historyId'], 1, 2)], [3, 4])
+
+    def test_no_reject_file_without_failures(self):
+        """测试没有失败记录时不创建拒绝文件"""
+        with patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            result = import_csv_file(self.csv_file_path)
+        self.assertEqual(result['failedCount'], 0)
+        self.assertIsNone(result['rejectFile'])
+        self.assertFalse(os.path.exists(reject_file_path(result['historyId'])))
+
+    def test_resume_keeps_records_up_to_checkpoint(self):
+        """测试续传时只保留检查点及之前的失败记录"""
+        writer = RejectWriter(7)
+        for row_num in (1, 3, 5):
+            writer.write({'row': row_num, 'data': {}, 'errors': [], 'warnings': []})
+        writer.close()
+        with open(reject_file_path(7), 'a', encoding='utf-8') as f:
+            f.write('{"row": 6, "da')  # 进程中断留下的不完整记录
+
+        writer = RejectWriter(7, resume_after_row=3)
+        writer.write({'row': 4, 'data': {}, 'errors': [], 'warnings': []})
+        writer.close()
+        self.assertEqual([record['row'] for record in read_rejects(7)], [1, 3, 4])
+
+        RejectWriter(7)  # 新的导入删除旧文件
+        self.assertEqual(read_rejects(7), [])
+
+    def test_rejects_endpoints(self):
+        """测试分页浏览和下载接口"""
+        result = self._import_with_failures()
+        history_id = result['historyId']
+        client = self.app.test_client()
+
+        page = client.get(f'/api/import-history/{history_id}/rejects?page=2&per_page=3').get_json()
+        self.assertEqual(page['total'], 4)
+        self.assertEqual([record['row'] for record in page['items']], [5])
+
+        response = client.get(f'/api/import-history/{history_id}/rejects/download')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([row['row_number'] for row in rows], ['2', '3', '4', '5'])
+        self.assertIn('无效的枚举值', rows[0]['error_info'])
+
+        response = client.get(f'/api/import-history/{history_id}/rejects/download?format=jsonl')
+        self.assertEqual(response.status_code, 200)
+        lines = response.get_data(as_text=True).splitlines()
+        response.close()
+        self.assertEqual(json.loads(lines[-1])['row'], 5)
+
+        self.assertEqual(client.get('/api/import-history/999/rejects').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
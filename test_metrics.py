@@ -0,0 +1,87 @@
+"""
+性能指标单元测试
+验证/metrics端点输出以及请求、SQL、大模型和导入阶段指标的记录
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+from config import Config
+from models import db, Problem
+from app import app as flask_app
+import metrics
+
+
+class TestMetrics(unittest.TestCase):
+    """性能指标测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Problem(title='泵体泄漏', description='密封圈老化', phase='usage'))
+            db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        return response.get_data(as_text=True)
+
+    def test_request_latency_and_sql_metrics(self):
+        """测试请求耗时和SQL次数按路由模板记录"""
+        problem_id = 1
+        self.assertEqual(self.client.get(f'/api/problems/{problem_id}').status_code, 200)
+
+        body = self._scrape()
+        self.assertIn('http_request_duration_seconds_count{method="GET",endpoint="/api/problems/<int:problem_id>",status="200"}', body)
+        sql_lines = [line for line in body.splitlines()
+                     if line.startswith('http_request_sql_queries_sum{endpoint="/api/problems/<int:problem_id>"}')]
+        self.assertEqual(len(sql_lines), 1)
+        self.assertGreaterEqual(float(sql_lines[0].split()[-1]), 1)
+
+    def test_llm_and_import_stage_metrics(self):
+        """测试大模型调用和导入阶段指标"""
+        metrics.record_llm_call('dashscope', 'analysis', 0.5, prompt_tokens=120, completion_tokens=80)
+        metrics.record_llm_call('dashscope', 'analysis', 0.1, error=True)
+        metrics.record_import_stage('validate', 100, 0.25)
+
+        body = self._scrape()
+        self.assertIn('llm_request_seconds_count{provider="dashscope",operation="analysis"}', body)
+        self.assertIn('llm_request_errors_total{provider="dashscope",operation="analysis"}', body)
+        self.assertIn('llm_tokens_total{provider="dashscope",type="prompt"}', body)
+        self.assertIn('csv_import_rows_total{stage="validate"}', body)
+        self.assertIn('csv_import_stage_seconds_total{stage="validate"}', body)
+
+    def test_dashscope_response_decoded_once(self):
+        """测试通义千问响应只解析一次JSON，token用量与结果共用解析结果"""
+        import ai_analysis
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = {'output': {'text': '分析结果'},
+                                      'usage': {'input_tokens': 12, 'output_tokens': 8}}
+        requests_module = MagicMock()
+        requests_module.post.return_value = response
+        with patch.dict('sys.modules', {'requests': requests_module}), \
+                patch.object(Config, 'DASHSCOPE_API_KEY', 'test-key'), \
+                patch('ai_analysis.get_ai_scheduler', return_value=ai_analysis.AIWorkScheduler(1)), \
+                patch('ai_analysis.record_llm_call') as record_llm_call:
+            result = ai_analysis._analyze_with_dashscope('分析问题', '泵体泄漏', '密封圈老化')
+
+        self.assertEqual(result, {'analysis': '分析结果'})
+        response.json.assert_called_once_with()
+        self.assertEqual(record_llm_call.call_args.kwargs, {'prompt_tokens': 12, 'completion_tokens': 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
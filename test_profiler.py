@@ -0,0 +1,106 @@
+"""
+采样分析器单元测试
+验证调用栈采样、管理接口权限以及单请求采样
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from config import Config
+from models import db, Problem
+from app import app as flask_app
+import profiler
+
+
+def _busy_loop(stop_event):
+    """占用CPU的测试函数"""
+    while not stop_event.is_set():
+        sum(i * i for i in range(1000))
+
+
+class TestProfiler(unittest.TestCase):
+    """采样分析器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.app.config['ADMIN_TOKEN'] = 'secret-token'
+        self.output_dir = tempfile.mkdtemp()
+        self.app.config['PROFILE_OUTPUT_DIR'] = self.output_dir
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Problem(title='泵体泄漏', description='密封圈老化', phase='usage'))
+            db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.app.config.from_object(Config)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_sampler_collects_collapsed_stacks(self):
+        """测试采样结果为collapsed stack格式且包含目标函数"""
+        stop_event = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop_event,), name='busy-worker')
+        worker.start()
+        sampler = profiler.StackSampler(interval=0.001, thread_ids={worker.ident}).start()
+        time.sleep(0.2)
+        sampler.stop()
+        stop_event.set()
+        worker.join()
+
+        output = sampler.collapsed()
+        self.assertGreater(sampler.sample_count, 0)
+        self.assertIn('_busy_loop (test_profiler.py:', output)
+        for line in output.splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('busy-worker;'))
+            self.assertGreater(int(count), 0)
+
+    def test_admin_endpoint_requires_token(self):
+        """测试未提供或提供错误令牌时拒绝访问"""
+        self.assertEqual(self.client.get('/api/admin/profile?seconds=0.1').status_code, 403)
+        response = self.client.get('/api/admin/profile?seconds=0.1', headers={'X-Admin-Token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+
+        self.app.config['ADMIN_TOKEN'] = ''
+        response = self.client.get('/api/admin/profile?seconds=0.1', headers={'X-Admin-Token': ''})
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_endpoint_returns_profile(self):
+        """测试管理接口返回采样文件"""
+        response = self.client.get('/api/admin/profile?seconds=0.2&interval_ms=2',
+                                   headers={'X-Admin-Token': 'secret-token'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment; filename=profile-', response.headers['Content-Disposition'])
+
+        response = self.client.get('/api/admin/profile?seconds=3600', headers={'X-Admin-Token': 'secret-token'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_profile_single_request(self):
+        """测试请求头触发单请求采样并可下载结果"""
+        response = self.client.get('/api/problems/1', headers={'X-Admin-Token': 'secret-token',
+                                                               'X-Profile-Request': '1'})
+        self.assertEqual(response.status_code, 200)
+        filename = response.headers['X-Profile-File']
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, filename)))
+
+        download = self.client.get(f'/api/admin/profiles/{filename}', headers={'X-Admin-Token': 'secret-token'})
+        self.assertEqual(download.status_code, 200)
+
+        # 非管理员的采样请求头被忽略
+        response = self.client.get('/api/problems/1', headers={'X-Profile-Request': '1'})
+        self.assertNotIn('X-Profile-File', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
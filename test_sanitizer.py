@@ -0,0 +1,56 @@
+"""
+输入清理模块单元测试
+验证sanitizer模块与原逐条替换实现的输出完全一致
+"""
+
+import random
+import unittest
+from sanitizer import sanitize_input, count_special_chars
+from benchmarks.sanitizer_benchmark import legacy_sanitize_input, legacy_count_special_chars, build_fields
+
+# 随机拼接用的片段：包含各条规则的完整匹配、被拆开的匹配以及普通文本
+_FRAGMENTS = ['<script>', '</script>', '<SCRIPT type="x">', 'javascript:', 'JavaScript', 'vbscript:', ':',
+              'onload', 'onClick =', '=', ' ', '<iframe src=a>', '</iframe>', '<object>', '</object>',
+              '<embed>', '</embed>', 'eval', 'EVAL (', '(', 'document', '.cookie', 'document.cookie', '.',
+              '设备过热', 'Pump leak', '\n', '\t', '<', '>', 'on', 'java', 'script', '，', '!!']
+
+
+class TestSanitizer(unittest.TestCase):
+    """输入清理测试类"""
+
+    def test_matches_legacy_on_crafted_inputs(self):
+        """测试典型恶意输入和边界输入与原实现一致"""
+        cases = [None, '', '   ', 0, 12, '正常输入', '  前后空格  ',
+                 '<script>alert("xss")</script>设备故障',
+                 '<ScRiPt src=x>a</sCrIpT>', 'javascript:alert(1)', 'VBScript:msgbox', '<img onerror=alert(1)>',
+                 '<iframe src="x"></iframe>', '<object data=x></object>', '<embed src=x></embed>',
+                 'eval (code)', 'DOCUMENT.COOKIE', 'document.cookies',
+                 # 前一条规则的替换拼出后一条规则的匹配
+                 'java<script></script>script:', 'ev<script>x</script>al(', 'docu<script></script>ment.cookie',
+                 'on<script></script>load=', 'Temperature: 80°C', 'a = b', 'f(x)', 'v1.2.3']
+        for value in cases:
+            self.assertEqual(sanitize_input(value), legacy_sanitize_input(value), repr(value))
+
+    def test_matches_legacy_on_random_inputs(self):
+        """测试随机拼接的输入与原实现一致"""
+        rng = random.Random(2024)
+        for _ in range(5000):
+            value = ''.join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(1, 12)))
+            self.assertEqual(sanitize_input(value), legacy_sanitize_input(value), repr(value))
+
+    def test_matches_legacy_on_synthetic_rows(self):
+        """测试合成CSV字段（含问题行）与原实现一致"""
+        for field in build_fields(500, error_rate=0.1):
+            self.assertEqual(sanitize_input(field), legacy_sanitize_input(field), repr(field))
+            self.assertEqual(count_special_chars(field), legacy_count_special_chars(field), repr(field))
+
+    def test_count_special_chars(self):
+        """测试特殊字符统计"""
+        self.assertEqual(count_special_chars(''), 0)
+        self.assertEqual(count_special_chars('设备abc_123'), 0)
+        self.assertEqual(count_special_chars('a, b!'), 3)
+        self.assertEqual(count_special_chars('过热，异响。'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+请求追踪单元测试
+验证Server-Timing响应头、SQL与自定义span记录以及追踪日志
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from config import Config
+from models import db, Problem
+from app import app as flask_app
+import tracing
+
+
+class TestTracing(unittest.TestCase):
+    """请求追踪测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(Problem(title='泵体泄漏', description='密封圈老化', phase='usage'))
+            db.session.commit()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.app.config['TRACING_ENABLED'] = False
+        self.app.config['TRACE_LOG_PATH'] = ''
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_disabled_by_default(self):
+        """测试未启用时不输出Server-Timing且span不记录任何内容"""
+        self.app.config['TRACING_ENABLED'] = False
+        response = self.client.get('/api/problems/1')
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertIsNone(tracing.current_trace())
+        with tracing.span('noop'):
+            pass
+
+    def test_server_timing_includes_sql(self):
+        """测试启用后Server-Timing包含SQL耗时和总耗时"""
+        self.app.config['TRACING_ENABLED'] = True
+        response = self.client.get('/api/problems/1')
+        header = response.headers.get('Server-Timing', '')
+        self.assertIn('sql;dur=', header)
+        self.assertIn('total;dur=', header)
+
+    def test_trace_log_written(self):
+        """测试追踪日志按JSONL写入span明细"""
+        fd, log_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.unlink, log_path)
+        self.app.config['TRACING_ENABLED'] = True
+        self.app.config['TRACE_LOG_PATH'] = log_path
+
+        self.client.get('/api/problems/1')
+        with open(log_path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['endpoint'], '/api/problems/<int:problem_id>')
+        self.assertIn('sql', records[0]['totals'])
+        self.assertTrue(all(span['name'] == 'sql' for span in records[0]['spans']))
+
+    def test_span_aggregation(self):
+        """测试同名span在Server-Timing中合并计数"""
+        trace = tracing.Trace()
+        token = tracing._current_trace.set(trace)
+        try:
+            for _ in range(3):
+                with tracing.span('embedding'):
+                    pass
+        finally:
+            tracing._current_trace.reset(token)
+        self.assertEqual(trace.totals['embedding']['count'], 3)
+        self.assertIn('embedding;dur=', trace.server_timing())
+        self.assertIn('desc="3x"', trace.server_timing())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+上传文件流式落盘单元测试
+验证上传时边写入边计算大小和SHA-256、超过大小限制时提前中止并删除部分文件，
+以及导入历史记录使用上传时计算的哈希
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from werkzeug.exceptions import RequestEntityTooLarge
+from config import Config
+from models import db, ImportHistory
+from upload_stream import HashingUploadFile
+from app import app as flask_app
+
+CSV_CONTENT = """title,description,phase,priority
+泵体泄漏,密封圈老化,usage,high
+电机过热,风扇损坏,usage,low
+"""
+
+
+class TestUploadStream(unittest.TestCase):
+    """上传文件流式落盘测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.upload_folder = os.path.relpath(tempfile.mkdtemp(dir='.'))
+        self.app.config['UPLOAD_FOLDER'] = self.upload_folder
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        """测试后清理"""
+        shutil.rmtree(self.upload_folder, ignore_errors=True)
+        self.app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
+        self.app.config['CSV_FILE_SIZE_LIMIT'] = Config.CSV_FILE_SIZE_LIMIT
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_size_and_hash_computed_while_writing(self):
+        """测试分块写入后的大小和哈希与整个文件一致，persist后文件移动到目标路径"""
+        data = CSV_CONTENT.encode('utf-8')
+        upload = HashingUploadFile(self.upload_folder)
+        for start in range(0, len(data), 7):
+            upload.write(data[start:start + 7])
+        self.assertEqual(upload.size, len(data))
+        self.assertEqual(upload.hexdigest(), hashlib.sha256(data).hexdigest())
+
+        target = os.path.join(self.upload_folder, 'target.csv')
+        upload.persist(target)
+        upload.close()
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(os.listdir(self.upload_folder), ['target.csv'])
+
+    def test_oversize_write_removes_partial_file(self):
+        """测试超过大小限制时立即中止并删除已写入的部分"""
+        upload = HashingUploadFile(self.upload_folder, max_size=10)
+        upload.write(b'12345')
+        with self.assertRaises(RequestEntityTooLarge):
+            upload.write(b'678901')
+        self.assertEqual(os.listdir(self.upload_folder), [])
+
+    def test_upload_passes_hash_to_import(self):
+        """测试上传接口把上传时计算的哈希写入导入历史，且不再读取文件计算"""
+        client = self.app.test_client()
+        data = CSV_CONTENT.encode('utf-8')
+        with patch('csv_import.compute_file_hash') as compute_hash, \
+                patch('csv_import.analyze_problem_with_ai', return_value={'analysis': '测试AI分析结果'}):
+            response = client.post('/api/import-csv', data={'csvFile': (io.BytesIO(data), 'problems.csv')},
+                                   content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        result = response.get_json()
+        self.assertEqual(result['file_size'], len(data))
+        self.assertEqual(db.session.get(ImportHistory, result['historyId']).file_hash,
+                         hashlib.sha256(data).hexdigest())
+        compute_hash.assert_not_called()
+        self.assertEqual(os.listdir(self.upload_folder), [])
+
+    def test_oversize_upload_rejected(self):
+        """测试超过大小限制的上传返回413且不留下临时文件"""
+        self.app.config['CSV_FILE_SIZE_LIMIT'] = 16
+        client = self.app.test_client()
+        response = client.post('/api/import-csv',
+                               data={'csvFile': (io.BytesIO(CSV_CONTENT.encode('utf-8')), 'problems.csv')},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.get_json()['error'], '文件大小超出限制')
+        self.assertEqual(os.listdir(self.upload_folder), [])
+
+    def test_rejected_file_type_not_kept(self):
+        """测试文件类型不允许时已写入的上传文件在请求结束时删除"""
+        client = self.app.test_client()
+        response = client.post('/api/import-csv', data={'csvFile': (io.BytesIO(b'hello'), 'notes.txt')},
+                               content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(os.listdir(self.upload_folder), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+向量数据库一致性检查单元测试
+使用模拟向量集合验证缺失、过期、孤立向量的识别以及dry-run与修复模式
+"""
+
+import unittest
+from unittest.mock import patch
+from config import Config
+from models import db, Problem
+from app import app as flask_app
+from vector_db import VectorDBException
+import vector_consistency
+
+
+class FakeVectorStore:
+    """以字典模拟向量集合，只实现一致性检查用到的接口"""
+
+    def __init__(self):
+        self.metadata = {}
+
+    def get_metadata_many(self, problem_ids):
+        return {pid: self.metadata[pid] for pid in map(str, problem_ids) if pid in self.metadata}
+
+    def iter_problems(self, page_size=1000, include=('metadatas',)):
+        ids = sorted(self.metadata)
+        for offset in range(0, len(ids), page_size):
+            yield {'ids': ids[offset:offset + page_size]}
+
+    def upsert_problems(self, documents):
+        for doc in documents:
+            self.metadata[doc['id']] = dict(doc['metadata'])
+        return {'success_count': len(documents), 'failed_ids': [], 'total_processed': len(documents), 'errors': []}
+
+    def delete_problems(self, problem_ids):
+        for pid in problem_ids:
+            self.metadata.pop(str(pid), None)
+        return len(problem_ids)
+
+
+class TestVectorConsistency(unittest.TestCase):
+    """向量数据库一致性检查测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+
+        self.store = FakeVectorStore()
+        for patcher in (patch('vector_consistency.get_vector_db', return_value=self.store),
+                        patch('vector_consistency.is_vector_db_available', return_value=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        problems = [Problem(title=f'问题{i}', description=f'描述{i}', phase='usage') for i in range(5)]
+        db.session.add_all(problems)
+        db.session.commit()
+        self.problem_ids = [problem.id for problem in problems]
+        for problem in problems:
+            self.store.upsert_problems([problem.to_vector_document()])
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _introduce_drift(self):
+        """制造一条缺失、一条过期和一条孤立向量"""
+        missing_id, stale_id = self.problem_ids[0], self.problem_ids[1]
+        self.store.metadata.pop(str(missing_id))
+        problem = db.session.get(Problem, stale_id)
+        problem.description = '描述已修改'
+        db.session.commit()
+        self.store.metadata['9999'] = {'content_hash': 'x'}
+        return missing_id, stale_id
+
+    def test_consistent_index_reports_nothing(self):
+        """测试数据一致时不报告任何问题"""
+        report = vector_consistency.check_vector_consistency(chunk_size=2)
+        self.assertEqual(report['checked_count'], 5)
+        self.assertEqual((report['missing_count'], report['stale_count'], report['orphaned_count']), (0, 0, 0))
+
+    def test_dry_run_reports_without_changes(self):
+        """测试dry-run只报告不修改向量集合"""
+        missing_id, stale_id = self._introduce_drift()
+        before = dict(self.store.metadata)
+
+        report = vector_consistency.check_vector_consistency(chunk_size=2)
+        self.assertTrue(report['dry_run'])
+        self.assertEqual(report['samples']['missing'], [missing_id])
+        self.assertEqual(report['samples']['stale'], [stale_id])
+        self.assertEqual(report['samples']['orphaned'], ['9999'])
+        self.assertEqual(report['repaired_count'], 0)
+        self.assertEqual(self.store.metadata, before)
+
+    def test_repair_fixes_all_drift(self):
+        """测试修复模式后再次检查完全一致"""
+        self._introduce_drift()
+
+        report = vector_consistency.check_vector_consistency(repair=True, chunk_size=2)
+        self.assertEqual(report['repaired_count'], 2)
+        self.assertEqual(report['deleted_count'], 1)
+
+        report = vector_consistency.check_vector_consistency(chunk_size=2)
+        self.assertEqual((report['missing_count'], report['stale_count'], report['orphaned_count']), (0, 0, 0))
+
+    def test_unavailable_vector_db_raises(self):
+        """测试向量数据库不可用时拒绝检查"""
+        with patch('vector_consistency.is_vector_db_available', return_value=False):
+            with self.assertRaises(VectorDBException):
+                vector_consistency.check_vector_consistency()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,8 @@
 import unittest
 import tempfile
 import os
+from unittest.mock import MagicMock, patch
+import numpy as np
 from vector_db import VectorDB, VectorDBException
 from config import Config
 
@@ -85,6 +87,102 @@ class TestVectorDB(unittest.TestCase):
         with self.assertRaises(VectorDBException):
             self.vector_db.search_similar_problems("", n_results=5)
     
+    def test_search_many(self):
+        """测试批量搜索相似问题"""
+        self.vector_db.add_problem("1", "硬盘故障", "硬盘无法读取数据")
+        self.vector_db.add_problem("2", "内存问题", "内存条不稳定")
+        
+        results = self.vector_db.search_many(["硬盘读取错误", "内存不稳定"], k=5)
+        
+        self.assertIsInstance(results, list, "搜索结果应该是列表")
+        self.assertEqual(len(results), 2, "每个查询应该对应一组结果")
+        for result in results:
+            self.assertIsInstance(result, list)
+    
+    def test_search_many_with_empty_query(self):
+        """测试批量搜索中包含空查询"""
+        with self.assertRaises(VectorDBException):
+            self.vector_db.search_many(["硬盘故障", " "], k=5)
+    
+    def test_search_many_uses_single_index_query(self):
+        """测试批量搜索只编码一次并只调用一次索引查询"""
+        model = MagicMock()
+        model.encode.return_value = np.array([[1.0, 0.0], [0.0, 1.0]])
+        collection = MagicMock()
+        collection.query.return_value = {
+            'ids': [['1', '2'], ['2']],
+            'distances': [[0.1, 0.8], [0.05]],
+            'metadatas': [[{'title': 'a'}, {'title': 'b'}], [{'title': 'b'}]]
+        }
+        self.vector_db.model = model
+        self.vector_db.problems_collection = collection
+        
+        with patch('vector_db.CHROMA_AVAILABLE', True):
+            results = self.vector_db.search_many(["查询一", "查询二"], k=1, filters={'phase': 'design'},
+                                                 min_similarity=0.5)
+        
+        model.encode.assert_called_once()
+        collection.query.assert_called_once()
+        self.assertEqual(collection.query.call_args.kwargs['where'], {'phase': 'design'})
+        self.assertEqual([[r['id'] for r in result] for result in results], [['1'], ['2']])
+    
+    def test_upsert_problems_retries_failed_batch_one_by_one(self):
+        """测试批次写入失败时逐个重试，只有真正失败的问题记为失败"""
+        model = MagicMock()
+        model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 2))
+        collection = MagicMock()
+
+        def upsert(embeddings, ids, metadatas):
+            if '2' in ids:
+                raise ValueError('无效的元数据')
+        collection.upsert.side_effect = upsert
+        self.vector_db.model = model
+        self.vector_db.problems_collection = collection
+
+        problems = [{'id': i, 'title': f'问题{i}', 'description': '描述'} for i in range(1, 5)]
+        with patch('vector_db.CHROMA_AVAILABLE', True):
+            result = self.vector_db.upsert_problems(problems, batch_size=4)
+
+        self.assertEqual(result['success_count'], 3)
+        self.assertEqual(result['failed_ids'], ['2'])
+        self.assertEqual(len(result['errors']), 1)
+        self.assertEqual([c.kwargs['ids'] for c in collection.upsert.call_args_list],
+                         [['1', '2', '3', '4'], ['1'], ['2'], ['3'], ['4']])
+        model.encode.assert_called_once()
+
+    def test_iter_problems_pages_with_requested_fields(self):
+        """测试分页遍历只请求指定字段，嵌入向量以NumPy数组返回"""
+        collection = MagicMock()
+        collection.get.side_effect = [
+            {'ids': ['1', '2'], 'embeddings': [[1.0, 0.0], [0.0, 1.0]], 'metadatas': None},
+            {'ids': ['3'], 'embeddings': [[0.5, 0.5]], 'metadatas': None},
+        ]
+        self.vector_db.problems_collection = collection
+
+        with patch('vector_db.CHROMA_AVAILABLE', True):
+            pages = list(self.vector_db.iter_problems(page_size=2, include=('embeddings',)))
+
+        self.assertEqual([page['ids'] for page in pages], [['1', '2'], ['3']])
+        self.assertIsInstance(pages[0]['embeddings'], np.ndarray)
+        self.assertEqual(pages[0]['embeddings'].shape, (2, 2))
+        self.assertNotIn('metadatas', pages[0])
+        self.assertEqual([c.kwargs['offset'] for c in collection.get.call_args_list], [0, 2])
+        self.assertEqual(collection.get.call_args.kwargs['include'], ['embeddings'])
+
+    def test_clear_collection_recreates_collection(self):
+        """测试清空集合时删除并重建集合，而不是读取全部数据"""
+        client = MagicMock()
+        collection = MagicMock()
+        self.vector_db.client = client
+        self.vector_db.problems_collection = collection
+
+        with patch('vector_db.CHROMA_AVAILABLE', True):
+            self.assertTrue(self.vector_db.clear_collection())
+
+        collection.get.assert_not_called()
+        client.delete_collection.assert_called_once_with("problems")
+        self.assertIs(self.vector_db.problems_collection, client.get_or_create_collection.return_value)
+
     def test_delete_problem(self):
         """测试删除问题"""
         # 先添加一个问题
@@ -0,0 +1,179 @@
+"""
+向量数据库发件箱单元测试
+验证发件箱记录与问题变更同事务写入，以及后台处理的合并、删除和重试逻辑
+"""
+
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import numpy as np
+from config import Config
+from models import db, Problem, VectorOutbox
+from app import app as flask_app
+import vector_db
+import vector_outbox
+
+
+class TestVectorOutbox(unittest.TestCase):
+    """向量数据库发件箱测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+
+        self.vector_db = MagicMock()
+        self.vector_db.upsert_problems.side_effect = lambda documents: {
+            'success_count': len(documents), 'failed_ids': [], 'total_processed': len(documents), 'errors': []
+        }
+        patcher = patch('vector_outbox.get_vector_db', return_value=self.vector_db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('vector_outbox.is_vector_db_available', return_value=True)
+        self.vector_db_available = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(vector_outbox, '_vector_db_available', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _create_problem(self, title='泵体泄漏'):
+        """创建并提交一个问题"""
+        problem = Problem(title=title, description='密封圈老化', phase='usage')
+        db.session.add(problem)
+        db.session.commit()
+        return problem.id
+
+    def test_outbox_written_with_problem_changes(self):
+        """测试新增、修改、删除问题时写入对应的发件箱记录"""
+        problem_id = self._create_problem()
+        problem = db.session.get(Problem, problem_id)
+        problem.title = '泵体严重泄漏'
+        db.session.commit()
+        db.session.delete(problem)
+        db.session.commit()
+
+        operations = [entry.operation for entry in VectorOutbox.query.order_by(VectorOutbox.id).all()]
+        self.assertEqual(operations, ['upsert', 'upsert', 'delete'])
+        self.assertTrue(all(entry.problem_id == problem_id for entry in VectorOutbox.query.all()))
+
+    def test_rollback_discards_outbox_entry(self):
+        """测试问题事务回滚时发件箱记录一起回滚"""
+        db.session.add(Problem(title='未提交的问题', description='', phase='design'))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(VectorOutbox.query.count(), 0)
+
+    def test_drain_collapses_entries_per_problem(self):
+        """测试同一问题的多条记录只写入一次向量"""
+        problem_id = self._create_problem()
+        problem = db.session.get(Problem, problem_id)
+        problem.description = '密封圈老化，需要更换'
+        db.session.commit()
+
+        stats = vector_outbox.drain_outbox()
+        self.assertEqual(stats['processed_count'], 2)
+        self.assertEqual(stats['upserted_count'], 1)
+        documents = self.vector_db.upsert_problems.call_args[0][0]
+        self.assertEqual([doc['id'] for doc in documents], [str(problem_id)])
+        self.assertEqual(documents[0]['description'], '密封圈老化，需要更换')
+        self.assertEqual(VectorOutbox.query.count(), 0)
+
+    def test_drain_deletes_vectors_of_removed_problems(self):
+        """测试问题已删除时从向量数据库删除对应向量"""
+        problem_id = self._create_problem()
+        db.session.delete(db.session.get(Problem, problem_id))
+        db.session.commit()
+
+        vector_outbox.drain_outbox()
+        self.vector_db.upsert_problems.assert_not_called()
+        self.vector_db.delete_problems.assert_called_once_with([str(problem_id)])
+        self.assertEqual(VectorOutbox.query.count(), 0)
+
+    def test_failed_entries_are_retried_with_backoff(self):
+        """测试写入失败的记录推迟重试，超过最大次数后标记为failed"""
+        self._create_problem()
+        self.vector_db.upsert_problems.side_effect = RuntimeError('vector store unavailable')
+
+        stats = vector_outbox.drain_outbox()
+        self.assertEqual(stats['retry_count'], 1)
+        entry = VectorOutbox.query.one()
+        self.assertEqual(entry.status, 'pending')
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn('vector store unavailable', entry.last_error)
+        self.assertGreater(entry.available_at, datetime.utcnow())
+
+        # 尚未到重试时间，不会被再次领取
+        self.assertEqual(vector_outbox.drain_outbox()['processed_count'], 0)
+
+        with patch.object(Config, 'VECTOR_OUTBOX_MAX_ATTEMPTS', 2):
+            entry.available_at = datetime.utcnow()
+            db.session.commit()
+            stats = vector_outbox.drain_outbox()
+        self.assertEqual(stats['failed_count'], 1)
+        self.assertEqual(vector_outbox.get_outbox_status()['failed'], 1)
+
+        self.assertEqual(vector_outbox.retry_failed_entries(), 1)
+        self.vector_db.upsert_problems.side_effect = lambda documents: {
+            'success_count': len(documents), 'failed_ids': [], 'total_processed': len(documents), 'errors': []
+        }
+        vector_outbox.drain_outbox()
+        self.assertEqual(VectorOutbox.query.count(), 0)
+
+    def test_entries_kept_while_vector_db_unavailable(self):
+        """测试向量数据库不可用时不领取记录，问题变更保留在发件箱中，恢复后再处理"""
+        problem_id = self._create_problem()
+        db.session.delete(db.session.get(Problem, problem_id))
+        db.session.commit()
+        self._create_problem('电机过热')
+
+        self.vector_db_available.return_value = False
+        with self.assertLogs('vector_outbox', 'WARNING') as logs:
+            stats = vector_outbox.drain_outbox()
+            vector_outbox.drain_outbox()
+        # 后台线程每个轮询间隔都会检查，不可用的警告只在状态变化时记录一次
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(stats['processed_count'], 0)
+        self.vector_db.upsert_problems.assert_not_called()
+        self.vector_db.delete_problems.assert_not_called()
+        self.assertEqual(vector_outbox.get_outbox_status(), {'pending': 3, 'processing': 0, 'failed': 0})
+
+        self.vector_db_available.return_value = True
+        self.assertEqual(vector_outbox.drain_outbox()['processed_count'], 3)
+        self.assertEqual(VectorOutbox.query.count(), 0)
+
+    def test_bad_problem_does_not_fail_its_batch(self):
+        """测试批次中个别问题写入失败时其余问题照常写入，只有该问题的记录推迟重试"""
+        problem_ids = [self._create_problem(f'问题{i}') for i in range(4)]
+        bad_id = str(problem_ids[2])
+
+        def upsert(embeddings, ids, metadatas):
+            if bad_id in ids:
+                raise ValueError('无效的元数据')
+        store = vector_db.VectorDB()
+        store.model = MagicMock()
+        store.model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 2))
+        store.problems_collection = MagicMock()
+        store.problems_collection.upsert.side_effect = upsert
+
+        with patch('vector_outbox.get_vector_db', return_value=store), patch('vector_db.CHROMA_AVAILABLE', True):
+            stats = vector_outbox.drain_outbox()
+
+        self.assertEqual((stats['upserted_count'], stats['retry_count']), (3, 1))
+        entry = VectorOutbox.query.one()
+        self.assertEqual(str(entry.problem_id), bad_id)
+        self.assertIn('无效的元数据', entry.last_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
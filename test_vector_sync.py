@@ -0,0 +1,163 @@
+"""
+向量数据库增量同步单元测试
+验证高水位线推进、分块同步、失败问题的重试以及已删除问题向量的低频清理
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from config import Config
+from models import db, Problem
+from app import app as flask_app
+import vector_sync
+
+
+class TestVectorSync(unittest.TestCase):
+    """向量数据库增量同步测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = flask_app
+        self.app.config.from_object(Config)
+        self.app.config['TESTING'] = True
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.drop_all()
+        db.create_all()
+
+        self.upserted = []
+        self.fail_ids = set()
+        self.vector_db = MagicMock()
+        self.vector_db.upsert_problems.side_effect = self._fake_upsert
+        self.vector_db.iter_problems.return_value = iter([])
+        patcher = patch('vector_sync.get_vector_db', return_value=self.vector_db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('vector_sync.is_vector_db_available', return_value=True)
+        self.vector_db_available = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """测试后清理"""
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _fake_upsert(self, documents):
+        """记录每次upsert的问题ID，fail_ids中的问题同步失败"""
+        ids = [doc['id'] for doc in documents]
+        self.upserted.append(ids)
+        failed = [problem_id for problem_id in ids if problem_id in self.fail_ids]
+        return {'success_count': len(ids) - len(failed), 'failed_ids': failed, 'total_processed': len(ids),
+                'errors': [f'{problem_id}: 失败' for problem_id in failed]}
+
+    def _add_problems(self, count, base_time):
+        """批量创建问题，updated_at依次递增"""
+        problems = []
+        for i in range(count):
+            problem = Problem(title=f'问题{i}', description=f'描述{i}', phase='usage')
+            db.session.add(problem)
+            problems.append(problem)
+        db.session.flush()
+        for i, problem in enumerate(problems):
+            problem.updated_at = base_time + timedelta(seconds=i)
+        db.session.commit()
+        return problems
+
+    def test_incremental_sync_only_sends_changed_rows(self):
+        """测试第二次同步只发送高水位线之后变化的问题"""
+        base_time = datetime(2024, 1, 1)
+        problem_ids = [problem.id for problem in self._add_problems(5, base_time)]
+
+        result = vector_sync.sync_vector_db(chunk_size=2)
+        self.assertEqual(result['synced_count'], 5)
+        # 5条记录按每块2条分3块处理
+        self.assertEqual([len(ids) for ids in self.upserted], [2, 2, 1])
+        self.assertEqual(vector_sync.get_high_water_mark(), (base_time + timedelta(seconds=4), problem_ids[4]))
+
+        self.upserted.clear()
+        result = vector_sync.sync_vector_db(chunk_size=2)
+        self.assertEqual(result['synced_count'], 0)
+        self.assertEqual(self.upserted, [])
+
+        changed = db.session.get(Problem, problem_ids[1])
+        changed.updated_at = base_time + timedelta(hours=1)
+        db.session.commit()
+
+        result = vector_sync.sync_vector_db(chunk_size=2)
+        self.assertEqual(result['synced_count'], 1)
+        self.assertEqual(self.upserted, [[str(problem_ids[1])]])
+
+    def test_full_sync_ignores_high_water_mark(self):
+        """测试全量同步忽略高水位线"""
+        self._add_problems(3, datetime(2024, 1, 1))
+        vector_sync.sync_vector_db()
+
+        self.upserted.clear()
+        result = vector_sync.sync_vector_db(full=True)
+        self.assertEqual(result['synced_count'], 3)
+
+    def test_failed_rows_retried_next_run(self):
+        """测试高水位线越过的失败问题被记录，下次同步时重试"""
+        problem_ids = [problem.id for problem in self._add_problems(4, datetime(2024, 1, 1))]
+        self.fail_ids = {str(problem_ids[1])}
+
+        result = vector_sync.sync_vector_db(chunk_size=2)
+        self.assertEqual((result['synced_count'], result['failed_ids']), (3, [problem_ids[1]]))
+        self.assertEqual(vector_sync.get_failed_ids(), [problem_ids[1]])
+
+        # 仍然失败时继续保留
+        self.upserted.clear()
+        result = vector_sync.sync_vector_db(chunk_size=2)
+        self.assertEqual(self.upserted, [[str(problem_ids[1])]])
+        self.assertEqual(vector_sync.get_failed_ids(), [problem_ids[1]])
+
+        self.fail_ids.clear()
+        self.upserted.clear()
+        result = vector_sync.sync_vector_db(chunk_size=2)
+        self.assertEqual((result['synced_count'], result['retried_count']), (1, 1))
+        self.assertEqual(self.upserted, [[str(problem_ids[1])]])
+        self.assertEqual(vector_sync.get_failed_ids(), [])
+
+    def test_skipped_while_vector_db_unavailable(self):
+        """测试向量数据库不可用时不同步、不推进高水位线"""
+        self._add_problems(2, datetime(2024, 1, 1))
+        self.vector_db_available.return_value = False
+
+        result = vector_sync.sync_vector_db()
+        self.assertTrue(result['skipped'])
+        self.assertEqual(self.upserted, [])
+        self.assertIsNone(vector_sync.get_high_water_mark())
+
+        self.vector_db_available.return_value = True
+        self.assertEqual(vector_sync.sync_vector_db()['synced_count'], 2)
+
+    def test_scheduled_sync_sweeps_infrequently(self):
+        """测试定时同步不遍历向量库，超过清理间隔后才清理遗留向量"""
+        self._add_problems(2, datetime(2024, 1, 1))
+        last_sweep_at = time.monotonic()
+
+        self.assertEqual(vector_sync._scheduled_sync(last_sweep_at, 3600), last_sweep_at)
+        self.assertEqual(self.upserted and len(self.upserted[0]), 2)
+        self.vector_db.iter_problems.assert_not_called()
+
+        self.assertGreater(vector_sync._scheduled_sync(last_sweep_at - 3600, 3600), last_sweep_at)
+        self.vector_db.iter_problems.assert_called_once()
+
+        # 清理间隔为0时不清理
+        vector_sync._scheduled_sync(0, 0)
+        self.vector_db.iter_problems.assert_called_once()
+
+    def test_remove_deleted_vectors(self):
+        """测试清理数据库中已不存在的问题向量"""
+        problems = self._add_problems(2, datetime(2024, 1, 1))
+        self.vector_db.iter_problems.return_value = iter([{'ids': [str(problems[0].id), '9999', str(problems[1].id)]}])
+
+        removed = vector_sync.remove_deleted_vectors(page_size=3)
+        self.assertEqual(removed, 1)
+        self.vector_db.delete_problems.assert_called_once_with(['9999'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+请求追踪模块
+在请求内记录SQL执行、嵌入向量生成、向量数据库操作和大模型调用等耗时片段（span），
+汇总到Server-Timing响应头，并可写入本地JSONL追踪日志
+未启用时span只做一次上下文变量读取，开销可以忽略
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 单个请求最多保留的span明细数量（汇总统计不受限制）
+MAX_SPANS_PER_TRACE = 500
+
+_current_trace: ContextVar[Optional['Trace']] = ContextVar('current_trace', default=None)
+_log_lock = threading.Lock()
+
+
+class Trace:
+    """单个请求的追踪数据"""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.totals: Dict[str, Dict] = {}  # span名称 -> {'count': 次数, 'duration': 累计秒数}
+        self.dropped_spans = 0
+
+    def add_span(self, name: str, start_time: float, duration: float, detail: str = None):
+        """记录一个已结束的span"""
+        total = self.totals.setdefault(name, {'count': 0, 'duration': 0.0})
+        total['count'] += 1
+        total['duration'] += duration
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped_spans += 1
+            return
+        span = {
+            'name': name,
+            'start_ms': round((start_time - self.start_time) * 1000, 3),
+            'duration_ms': round(duration * 1000, 3)
+        }
+        if detail:
+            span['detail'] = detail
+        self.spans.append(span)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start_time
+
+    def server_timing(self) -> str:
+        """生成Server-Timing响应头，每类span一项，另加总耗时"""
+        entries = []
+        for name, total in self.totals.items():
+            entries.append(f'{name};dur={total["duration"] * 1000:.1f};desc="{total["count"]}x"')
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def current_trace() -> Optional[Trace]:
+    """获取当前上下文中的追踪对象，未启用追踪时返回None"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, detail: str = None):
+    """
+    记录一段代码的耗时，没有活动的追踪时不做任何事
+
+    Args:
+        name: span名称（同名span在Server-Timing中合并）
+        detail: 写入追踪日志的附加说明
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start_time, time.perf_counter() - start_time, detail)
+
+
+def _write_trace_log(path: str, record: Dict):
+    """追加一条追踪记录到JSONL文件"""
+    line = json.dumps(record, ensure_ascii=False)
+    with _log_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+_sql_listeners_registered = False
+
+
+def init_app(app):
+    """
+    注册请求追踪钩子和SQL执行span
+
+    Args:
+        app: Flask应用实例
+    """
+    global _sql_listeners_registered
+    from flask import g, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @app.before_request
+    def _start_trace():
+        if app.config.get('TRACING_ENABLED'):
+            g.trace_token = _current_trace.set(Trace())
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = _current_trace.get()
+        if trace is None:
+            return response
+        response.headers['Server-Timing'] = trace.server_timing()
+
+        log_path = app.config.get('TRACE_LOG_PATH')
+        duration_ms = trace.elapsed() * 1000
+        if log_path and duration_ms >= app.config.get('TRACE_LOG_MIN_DURATION_MS', 0):
+            record = {
+                'timestamp': time.time(),
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.url_rule.rule if request.url_rule is not None else None,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 3),
+                'totals': {name: {'count': total['count'], 'duration_ms': round(total['duration'] * 1000, 3)}
+                           for name, total in trace.totals.items()},
+                'spans': trace.spans,
+                'dropped_spans': trace.dropped_spans
+            }
+            try:
+                _write_trace_log(log_path, record)
+            except OSError as e:
+                logger.warning(f"写入追踪日志失败: {str(e)}")
+        return response
+
+    @app.teardown_request
+    def _reset_trace(exception=None):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            _current_trace.reset(token)
+
+    if _sql_listeners_registered:
+        return
+    _sql_listeners_registered = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_trace.get() is not None:
+            conn.info.setdefault('trace_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        starts = conn.info.get('trace_query_start')
+        if trace is None or not starts:
+            return
+        start_time = starts.pop()
+        trace.add_span('sql', start_time, time.perf_counter() - start_time, statement[:200])
+
+    @event.listens_for(Engine, 'handle_error')
+    def _handle_sql_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('trace_query_start'):
+            conn.info['trace_query_start'].pop()
@@ -0,0 +1,66 @@
+"""
+上传文件流式落盘模块
+解析multipart请求时把上传文件分块直接写入上传目录，同时累计大小和SHA-256，
+超过大小限制时立即中止，不把整个文件读入内存，也不需要保存后再读取一遍计算哈希
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+
+class HashingUploadFile:
+    """边写入边计算大小和SHA-256的上传文件，未调用persist()时关闭即删除"""
+
+    def __init__(self, directory: str, max_size: int = None):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='upload_', suffix='.part', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._digest = hashlib.sha256()
+        self.max_size = max_size
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        """写入一块数据；累计大小超过限制时删除已写入的部分并抛出RequestEntityTooLarge"""
+        self.size += len(data)
+        if self.max_size and self.size > self.max_size:
+            self.close()
+            raise RequestEntityTooLarge(f'上传文件超过大小限制 ({self.max_size} bytes)')
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        """已写入内容的SHA-256"""
+        return self._digest.hexdigest()
+
+    def persist(self, path: str) -> str:
+        """关闭文件并移动到最终路径（同一目录内重命名，不复制内容）"""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = None
+        return path
+
+    def close(self):
+        """关闭文件，尚未persist()的临时文件被删除"""
+        self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+    def __getattr__(self, name):
+        # read/readline/seek/tell等方法直接使用底层文件
+        return getattr(self._file, name)
+
+
+class StreamingUploadRequest(Request):
+    """对指定端点的上传文件使用HashingUploadFile，其余端点保持默认行为"""
+
+    streaming_endpoints = {'import_csv'}
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in self.streaming_endpoints:
+            return HashingUploadFile(current_app.config['UPLOAD_FOLDER'],
+                                     current_app.config.get('CSV_FILE_SIZE_LIMIT'))
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
@@ -0,0 +1,165 @@
+"""
+向量数据库一致性检查与修复工具
+分块流式比较problems表与向量集合，找出缺失、多余（孤立）和过期的向量，并可批量修复
+所有读取都按块进行，内存占用与总数据量无关，适用于百万级数据
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from config import Config
+from models import db, Problem
+from vector_db import VectorDBException, get_vector_db, is_vector_db_available
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_problem_fingerprints(chunk_size: int) -> Iterator[List[Tuple[int, str, str]]]:
+    """
+    按主键键集分页读取问题的(id, content_hash, updated_at)，不加载完整对象
+
+    Args:
+        chunk_size: 每块读取的行数
+
+    Yields:
+        List[Tuple[int, str, str]]: 一块问题指纹
+    """
+    last_id = 0
+    while True:
+        rows = (db.session.query(Problem.id, Problem.content_hash, Problem.updated_at)
+                .filter(Problem.id > last_id)
+                .order_by(Problem.id)
+                .limit(chunk_size)
+                .all())
+        if not rows:
+            break
+        yield [(row.id, row.content_hash, str(row.updated_at)) for row in rows]
+        last_id = rows[-1].id
+        if len(rows) < chunk_size:
+            break
+
+
+def _is_stale(metadata: Dict, content_hash: str, updated_at: str) -> bool:
+    """判断向量元数据是否落后于数据库记录（旧版本写入的向量没有内容哈希，视为过期）"""
+    if not metadata.get('content_hash') or metadata.get('content_hash') != content_hash:
+        return True
+    return metadata.get('updated_at') != updated_at
+
+
+def find_orphan_vector_ids(vector_db, page_size: int = 1000) -> List[str]:
+    """
+    分页只读取向量ID，每页用一次IN查询找出数据库中已不存在的问题
+
+    Args:
+        vector_db: 向量数据库实例
+        page_size: 每页读取的向量ID数量
+
+    Returns:
+        List[str]: 孤立向量ID列表（包括非数字ID）
+    """
+    orphan_ids = []
+    for page in vector_db.iter_problems(page_size=page_size, include=()):
+        ids = page['ids']
+        numeric_ids = [int(vector_id) for vector_id in ids if str(vector_id).isdigit()]
+        existing_ids = {row.id for row in db.session.query(Problem.id).filter(Problem.id.in_(numeric_ids)).all()}
+        for vector_id in ids:
+            if not str(vector_id).isdigit() or int(vector_id) not in existing_ids:
+                orphan_ids.append(str(vector_id))
+    return orphan_ids
+
+
+def check_vector_consistency(repair: bool = False, chunk_size: int = None, sample_size: int = 20) -> Dict[str, Any]:
+    """
+    检查并可选修复数据库与向量集合之间的不一致
+
+    - 缺失：数据库中存在但向量集合中没有的问题
+    - 过期：向量元数据中的content_hash或updated_at与数据库不一致
+    - 孤立：向量集合中存在但数据库中已删除的问题
+
+    Args:
+        repair: 是否修复（False时只报告，即dry-run）
+        chunk_size: 每块处理的数量，默认使用配置值
+        sample_size: 报告中每类问题最多列出的ID数量
+
+    Returns:
+        Dict[str, Any]: 检查报告
+
+    Raises:
+        VectorDBException: 向量数据库不可用时抛出
+    """
+    if not is_vector_db_available():
+        raise VectorDBException("向量数据库不可用，无法检查一致性")
+
+    start_time = time.time()
+    chunk_size = chunk_size or getattr(Config, 'VECTOR_CONSISTENCY_CHUNK_SIZE', 1000)
+    vector_db = get_vector_db()
+
+    report = {
+        'dry_run': not repair,
+        'checked_count': 0,
+        'missing_count': 0,
+        'stale_count': 0,
+        'orphaned_count': 0,
+        'repaired_count': 0,
+        'deleted_count': 0,
+        'repair_failed_ids': [],
+        'samples': {'missing': [], 'stale': [], 'orphaned': []}
+    }
+
+    # 第一遍：以数据库为准，按块比较内容哈希，找出缺失和过期的向量
+    for fingerprints in _iter_problem_fingerprints(chunk_size):
+        metadata_by_id = vector_db.get_metadata_many([problem_id for problem_id, _, _ in fingerprints])
+        to_repair = []
+        for problem_id, content_hash, updated_at in fingerprints:
+            metadata = metadata_by_id.get(str(problem_id))
+            if metadata is None:
+                report['missing_count'] += 1
+                kind = 'missing'
+            elif _is_stale(metadata, content_hash, updated_at):
+                report['stale_count'] += 1
+                kind = 'stale'
+            else:
+                continue
+            if len(report['samples'][kind]) < sample_size:
+                report['samples'][kind].append(problem_id)
+            to_repair.append(problem_id)
+        report['checked_count'] += len(fingerprints)
+
+        if repair and to_repair:
+            problems = Problem.query.filter(Problem.id.in_(to_repair)).all()
+            result = vector_db.upsert_problems([problem.to_vector_document() for problem in problems])
+            report['repaired_count'] += result['success_count']
+            report['repair_failed_ids'].extend(result['failed_ids'])
+            db.session.expunge_all()
+
+    # 第二遍：以向量集合为准，找出孤立向量；遍历结束后再删除，避免分页偏移错位
+    orphan_ids = find_orphan_vector_ids(vector_db, chunk_size)
+    report['orphaned_count'] = len(orphan_ids)
+    report['samples']['orphaned'] = orphan_ids[:sample_size]
+    if repair and orphan_ids:
+        report['deleted_count'] = vector_db.delete_problems(orphan_ids)
+
+    elapsed = time.time() - start_time
+    report['processing_time'] = round(elapsed, 2)
+    report['rows_per_second'] = round(report['checked_count'] / elapsed, 1) if elapsed > 0 else None
+    logger.info(f"向量一致性检查完成: 检查 {report['checked_count']} 个, 缺失 {report['missing_count']} 个, "
+                f"过期 {report['stale_count']} 个, 孤立 {report['orphaned_count']} 个, "
+                f"修复 {report['repaired_count']} 个, 删除 {report['deleted_count']} 个, 耗时 {elapsed:.2f} 秒")
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description='检查并修复数据库与向量数据库之间的不一致')
+    parser.add_argument('--repair', action='store_true', help='修复发现的问题（默认只报告）')
+    parser.add_argument('--chunk-size', type=int, default=None, help='每块处理的数量')
+    parser.add_argument('--sample-size', type=int, default=20, help='报告中每类问题最多列出的ID数量')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        summary = check_vector_consistency(repair=args.repair, chunk_size=args.chunk_size, sample_size=args.sample_size)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
@@ -3,26 +3,51 @@
 使用ChromaDB作为向量数据库存储和检索问题相似性
 """
 import logging
-from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Dict, Optional, Sequence, Tuple
+import numpy as np
 from config import Config
+from metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_ENCODE_SECONDS, VECTOR_QUERY_SECONDS
+from tracing import span
 
 # 尝试导入依赖，如果失败则提供降级功能
 try:
     import chromadb
     from chromadb.config import Settings
     from sentence_transformers import SentenceTransformer
-    import numpy as np
     CHROMA_AVAILABLE = True
 except ImportError:
     CHROMA_AVAILABLE = False
     logging.warning("ChromaDB or SentenceTransformer not available. VectorDB will be disabled.")
 
 
+# 问题集合名称及配置
+PROBLEMS_COLLECTION_NAME = "problems"
+PROBLEMS_COLLECTION_METADATA = {"hnsw:space": "cosine"}  # 使用余弦距离计算相似度
+
+
 class VectorDBException(Exception):
     """向量数据库自定义异常"""
     pass
 
 
+@contextmanager
+def _collection_operation(operation: str):
+    """统计一次向量集合操作的耗时（指标和请求追踪）"""
+    with span('chroma', detail=operation), VECTOR_QUERY_SECONDS.labels(operation).time():
+        yield
+
+
+def is_vector_db_available() -> bool:
+    """
+    向量数据库当前是否可用（初始化失败后会被置为不可用，因此需要在调用时读取）
+    
+    Returns:
+        bool: 是否可用
+    """
+    return CHROMA_AVAILABLE
+
+
 class VectorDB:
     """
     向量数据库管理类，用于存储和检索问题的向量表示
@@ -49,8 +74,8 @@ class VectorDB:
                 
                 # 获取或创建问题集合
                 self.problems_collection = self.client.get_or_create_collection(
-                    name="problems",
-                    metadata={"hnsw:space": "cosine"}  # 使用余弦距离计算相似度
+                    name=PROBLEMS_COLLECTION_NAME,
+                    metadata=PROBLEMS_COLLECTION_METADATA
                 )
             except Exception as e:
                 logging.error(f"初始化ChromaDB失败: {e}")
@@ -75,11 +100,30 @@ class VectorDB:
         """生成文本嵌入向量，包含错误处理和长度限制"""
         if not text or not text.strip():
             raise VectorDBException("文本内容不能为空")
+        return self._generate_embeddings([text])[0]
+
+    def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        批量生成文本嵌入向量，一次调用模型完成整批编码
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            List[List[float]]: 与输入顺序一致的嵌入向量列表
+        """
+        if not texts:
+            return []
+        for text in texts:
+            if not text or not text.strip():
+                raise VectorDBException("文本内容不能为空")
         # 限制文本长度避免内存溢出
-        text = text[:5000] if len(text) > 5000 else text
+        texts = [text[:5000] if len(text) > 5000 else text for text in texts]
         try:
-            embedding = self.model.encode([text], normalize_embeddings=True)[0].tolist()
-            return embedding
+            EMBEDDING_BATCH_SIZE.observe(len(texts))
+            with span('embedding', detail=f'batch={len(texts)}'), EMBEDDING_ENCODE_SECONDS.time():
+                embeddings = self.model.encode(texts, normalize_embeddings=True)
+            return [embedding.tolist() for embedding in embeddings]
         except Exception as e:
             self.logger.error(f"生成嵌入向量失败: {str(e)}")
             raise VectorDBException(f"生成嵌入向量失败: {str(e)}")
@@ -267,6 +311,175 @@ class VectorDB:
             self.logger.error(f"批量添加问题失败: {str(e)}")
             raise VectorDBException(f"批量添加问题失败: {str(e)}")
     
+    def upsert_problems(self, problems: List[Dict], batch_size: int = 100) -> Dict[str, Any]:
+        """
+        批量插入或更新问题（按批次一次性生成嵌入向量并调用upsert），用于增量同步
+        批次写入失败时逐个重试，只有单独写入仍失败的问题记为失败
+        
+        Args:
+            problems: 问题列表，每个元素包含'id', 'title', 'description', 'metadata'
+            batch_size: 每批编码和写入的数量
+        
+        Returns:
+            Dict[str, Any]: 包含成功数量、失败ID列表和错误信息的字典
+        """
+        result = {'success_count': 0, 'failed_ids': [], 'total_processed': 0, 'errors': []}
+        if not problems:
+            return result
+        
+        if not CHROMA_AVAILABLE:
+            # 降级模式：记录警告但返回成功
+            self.logger.warning(f"VectorDB not available. Would upsert {len(problems)} problems in normal mode.")
+            result['success_count'] = len(problems)
+            result['total_processed'] = len(problems)
+            return result
+        
+        # 验证并准备数据
+        ids, contents, metadatas = [], [], []
+        for problem in problems:
+            problem_id = str(problem.get('id', ''))
+            title = problem.get('title', '')
+            description = problem.get('description', '') or ''
+            if not problem_id or not title or not title.strip():
+                result['failed_ids'].append(problem_id)
+                result['errors'].append(f"问题 {problem_id} 缺少必要参数: id={problem_id}, title={title}")
+                continue
+            metadata = dict(problem.get('metadata') or {})
+            metadata['problem_id'] = problem_id
+            metadata['title'] = title
+            metadata['description'] = description
+            ids.append(problem_id)
+            contents.append(f"{title} {description}".strip())
+            metadatas.append(metadata)
+        result['total_processed'] = len(ids)
+        
+        for i in range(0, len(ids), batch_size):
+            batch_ids = ids[i:i + batch_size]
+            batch_contents = contents[i:i + batch_size]
+            batch_metadatas = metadatas[i:i + batch_size]
+            batch_embeddings = None
+            try:
+                batch_embeddings = self._generate_embeddings(batch_contents)
+                with _collection_operation('upsert'):
+                    self.problems_collection.upsert(
+                        embeddings=batch_embeddings,
+                        ids=batch_ids,
+                        metadatas=batch_metadatas
+                    )
+                result['success_count'] += len(batch_ids)
+            except Exception as e:
+                self.logger.error(f"批量upsert批次失败，逐个重试: {str(e)}")
+                # 尝试逐个写入，批次中其余正常的问题不受个别问题影响
+                for j, (bid, bcontent, bmeta) in enumerate(zip(batch_ids, batch_contents, batch_metadatas)):
+                    try:
+                        embedding = ([batch_embeddings[j]] if batch_embeddings is not None
+                                     else self._generate_embeddings([bcontent]))
+                        with _collection_operation('upsert'):
+                            self.problems_collection.upsert(embeddings=embedding, ids=[bid], metadatas=[bmeta])
+                        result['success_count'] += 1
+                    except Exception as item_error:
+                        self.logger.error(f"upsert单个问题 {bid} 失败: {str(item_error)}")
+                        result['failed_ids'].append(bid)
+                        result['errors'].append(f"问题 {bid} 写入失败: {str(item_error)}")
+        
+        self.logger.info(f"批量upsert完成: 成功 {result['success_count']} 个, 失败 {len(result['failed_ids'])} 个")
+        return result
+    
+    def delete_problems(self, problem_ids: List[str], batch_size: int = 500) -> int:
+        """
+        批量从向量数据库中删除问题，不存在的ID会被忽略
+        
+        Args:
+            problem_ids: 问题ID列表
+            batch_size: 每批删除的数量
+        
+        Returns:
+            int: 提交删除的ID数量
+        """
+        ids = [str(problem_id) for problem_id in problem_ids if problem_id is not None and str(problem_id).strip()]
+        if not ids:
+            return 0
+        
+        if not CHROMA_AVAILABLE:
+            self.logger.warning(f"VectorDB not available. Would delete {len(ids)} problems in normal mode.")
+            return len(ids)
+        
+        try:
+            for i in range(0, len(ids), batch_size):
+                with _collection_operation('delete'):
+                    self.problems_collection.delete(ids=ids[i:i + batch_size])
+            self.logger.info(f"已从向量数据库中批量删除 {len(ids)} 个问题")
+            return len(ids)
+        except Exception as e:
+            self.logger.error(f"批量删除问题失败: {str(e)}")
+            raise VectorDBException(f"批量删除问题失败: {str(e)}")
+    
+    def iter_problems(self, page_size: int = 1000, include: Sequence[str] = ('metadatas',),
+                      where: Dict = None) -> Iterator[Dict[str, Any]]:
+        """
+        按offset/limit分页遍历集合，每次只在内存中保留一页数据
+        遍历期间不应修改集合，否则分页偏移可能错位
+        
+        Args:
+            page_size: 每页数量
+            include: 需要返回的内容，可选'metadatas'、'embeddings'、'documents'，为空时只返回ID
+            where: 元数据过滤条件
+        
+        Yields:
+            Dict[str, Any]: 一页数据，包含'ids'以及include中请求的字段，
+                            'embeddings'为形状(n, dim)的float32 NumPy数组
+        """
+        if not CHROMA_AVAILABLE:
+            return
+        include = list(include or [])
+        offset = 0
+        while True:
+            try:
+                with _collection_operation('scan'):
+                    results = self.problems_collection.get(include=include, where=where, offset=offset,
+                                                           limit=page_size)
+            except Exception as e:
+                self.logger.error(f"分页遍历向量集合失败: {str(e)}")
+                raise VectorDBException(f"分页遍历向量集合失败: {str(e)}")
+            
+            ids = list(results['ids'] or [])
+            if not ids:
+                break
+            page = {'ids': ids}
+            for field in include:
+                values = results.get(field)
+                if field == 'embeddings':
+                    page[field] = np.asarray(values if values is not None else [], dtype=np.float32)
+                else:
+                    page[field] = list(values) if values is not None else [None] * len(ids)
+            yield page
+            
+            offset += len(ids)
+            if len(ids) < page_size:
+                break
+    
+    def get_metadata_many(self, problem_ids: List[str]) -> Dict[str, Dict]:
+        """
+        按ID批量获取问题元数据（不加载嵌入向量），集合中不存在的ID不会出现在结果中
+        
+        Args:
+            problem_ids: 问题ID列表
+        
+        Returns:
+            Dict[str, Dict]: 问题ID到元数据的映射
+        """
+        ids = [str(problem_id) for problem_id in problem_ids]
+        if not ids or not CHROMA_AVAILABLE:
+            return {}
+        try:
+            with _collection_operation('get'):
+                results = self.problems_collection.get(ids=ids, include=['metadatas'])
+            metadatas = results.get('metadatas') or [None] * len(results['ids'])
+            return {vector_id: metadata or {} for vector_id, metadata in zip(results['ids'], metadatas)}
+        except Exception as e:
+            self.logger.error(f"批量获取问题元数据失败: {str(e)}")
+            raise VectorDBException(f"批量获取问题元数据失败: {str(e)}")
+    
     def search_similar_problems(self, query: str, n_results: int = None, min_similarity: float = 0.0) -> List[Dict]:
         """
         搜索相似问题，增加最小相似度阈值
@@ -279,52 +492,84 @@ class VectorDB:
         Returns:
             List[Dict]: 相似问题列表
         """
+        # 验证查询文本
+        if not query or not query.strip():
+            raise VectorDBException("查询文本不能为空")
+        
+        results = self.search_many([query], k=n_results, min_similarity=min_similarity)
+        return results[0] if results else []
+    
+    def search_many(self, queries: List[str], k: int = None, filters: Dict = None,
+                    min_similarity: float = 0.0) -> List[List[Dict]]:
+        """
+        批量搜索相似问题：整批查询文本一次编码，并通过一次多查询索引调用完成检索
+        
+        Args:
+            queries: 查询文本列表
+            k: 每个查询返回的结果数量，默认使用配置值
+            filters: 元数据过滤条件（ChromaDB where语法），例如 {"phase": "design"}
+            min_similarity: 最小相似度阈值（0-1之间）
+        
+        Returns:
+            List[List[Dict]]: 与queries顺序一致的相似问题列表
+        """
         try:
-            if n_results is None:
-                n_results = Config.VECTOR_DB_SEARCH_LIMIT
+            if k is None:
+                k = Config.VECTOR_DB_SEARCH_LIMIT
+            
+            if not queries:
+                return []
             
             # 验证查询文本
-            if not query or not query.strip():
-                raise VectorDBException("查询文本不能为空")
+            for query in queries:
+                if not query or not str(query).strip():
+                    raise VectorDBException("查询文本不能为空")
             
             if not CHROMA_AVAILABLE:
                 # 降级模式：返回空结果
                 self.logger.warning("VectorDB not available. Returning empty results for similarity search.")
-                return []
+                return [[] for _ in queries]
             
-            # 生成查询嵌入向量
-            query_embedding = self._generate_embedding(query.strip())
+            # 一次性生成所有查询的嵌入向量
+            query_embeddings = self._generate_embeddings([str(query).strip() for query in queries])
             
-            # 搜索相似问题
-            from chromadb.api.types import QueryResult
-            results: QueryResult = self.problems_collection.query(
-                query_embeddings=[query_embedding],
-                n_results=min(n_results * 2, 100)  # 搜索更多结果以过滤低相似度
-            )
+            # 单次多查询检索
+            query_kwargs = {
+                'query_embeddings': query_embeddings,
+                'n_results': min(k * 2, 100)  # 搜索更多结果以过滤低相似度
+            }
+            if filters:
+                query_kwargs['where'] = filters
+            with _collection_operation('query'):
+                results = self.problems_collection.query(**query_kwargs)
             
             # 格式化结果并过滤低相似度
-            formatted_results = []
-            if results['ids'] and len(results['ids'][0]) > 0:
-                for i in range(len(results['ids'][0])):
-                    distance = results['distances'][0][i] if results['distances'] else None
+            all_results = []
+            for q in range(len(queries)):
+                formatted_results = []
+                ids = results['ids'][q] if results['ids'] else []
+                distances = results['distances'][q] if results.get('distances') else None
+                metadatas = results['metadatas'][q] if results.get('metadatas') else None
+                for i in range(len(ids)):
+                    distance = distances[i] if distances else None
                     similarity_score = 1 - distance if distance is not None else 0
                     
                     # 过滤低相似度结果
                     if similarity_score >= min_similarity:
-                        problem_result = {
-                            'id': results['ids'][0][i],
+                        formatted_results.append({
+                            'id': ids[i],
                             'distance': distance,
                             'similarity_score': similarity_score,
-                            'metadata': results['metadatas'][0][i] if results['metadatas'] else None
-                        }
-                        formatted_results.append(problem_result)
-            
-            # 按相似度排序并限制结果数量
-            formatted_results.sort(key=lambda x: x['similarity_score'], reverse=True)
-            formatted_results = formatted_results[:n_results]
+                            'metadata': metadatas[i] if metadatas else None
+                        })
+                
+                # 按相似度排序并限制结果数量
+                formatted_results.sort(key=lambda x: x['similarity_score'], reverse=True)
+                all_results.append(formatted_results[:k])
             
-            self.logger.info(f"搜索相似问题完成，找到 {len(formatted_results)} 个满足条件的结果")
-            return formatted_results
+            self.logger.info(f"批量搜索相似问题完成，查询 {len(queries)} 条，"
+                             f"共找到 {sum(len(r) for r in all_results)} 个满足条件的结果")
+            return all_results
             
         except VectorDBException:
             raise
@@ -472,6 +717,7 @@ class VectorDB:
     def get_all_problems(self, limit: int = None) -> List[Dict]:
         """
         获取所有问题，支持限制数量
+        会把嵌入向量全部加载到内存中，维护任务请使用iter_problems分页遍历
         
         Args:
             limit: 限制返回结果数量，None表示不限制
@@ -485,18 +731,20 @@ class VectorDB:
                 self.logger.warning("VectorDB not available. Returning empty list for get_all_problems.")
                 return []
             
-            # 使用where条件获取所有数据，或限制数量
-            results = self.problems_collection.get(limit=limit)
-            
+            # 分页读取，达到limit后停止，避免一次性物化整个集合
+            page_size = min(limit, 1000) if limit else 1000
             problems = []
-            if results['ids']:
-                for i in range(len(results['ids'])):
-                    problem = {
-                        'id': results['ids'][i],
-                        'embedding': results['embeddings'][i] if results['embeddings'] else None,
-                        'metadata': results['metadatas'][i] if results['metadatas'] else None
-                    }
-                    problems.append(problem)
+            for page in self.iter_problems(page_size=page_size, include=('embeddings', 'metadatas')):
+                for i, problem_id in enumerate(page['ids']):
+                    problems.append({
+                        'id': problem_id,
+                        'embedding': page['embeddings'][i].tolist() if len(page['embeddings']) else None,
+                        'metadata': page['metadatas'][i]
+                    })
+                    if limit and len(problems) >= limit:
+                        break
+                if limit and len(problems) >= limit:
+                    break
             
             self.logger.info(f"成功获取 {len(problems)} 个问题")
             return problems
@@ -532,14 +780,14 @@ class VectorDB:
                 self.logger.warning("VectorDB not available. Would clear collection in normal mode.")
                 return True
             
-            # 获取所有问题ID，然后批量删除
-            all_problems = self.get_all_problems()
-            if all_problems:
-                ids = [problem['id'] for problem in all_problems]
-                self.problems_collection.delete(ids=ids)
-                self.logger.info(f"已清空向量数据库，删除了 {len(ids)} 个问题")
-            else:
-                self.logger.info("向量数据库已为空，无需清空")
+            # 直接删除并重建集合，不需要先读取全部ID
+            count = self.problems_collection.count()
+            self.client.delete_collection(PROBLEMS_COLLECTION_NAME)
+            self.problems_collection = self.client.get_or_create_collection(
+                name=PROBLEMS_COLLECTION_NAME,
+                metadata=PROBLEMS_COLLECTION_METADATA
+            )
+            self.logger.info(f"已清空向量数据库，删除了 {count} 个问题")
             return True
         except Exception as e:
             self.logger.error(f"清空向量数据库失败: {str(e)}")
@@ -0,0 +1,268 @@
+"""
+向量数据库发件箱处理模块
+问题的新增、修改、删除会在同一事务中写入vector_outbox表，
+本模块负责领取待处理记录，按问题合并后批量应用到向量数据库，失败时按指数退避重试
+可作为命令行脚本运行，也可以在应用中作为后台线程持续处理
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_
+
+from config import Config
+from models import db, Problem, VectorOutbox
+from vector_db import get_vector_db, is_vector_db_available
+
+logger = logging.getLogger(__name__)
+
+# 当前进程的领取标识
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# 上次检查时向量数据库是否可用，只在状态变化时记录日志（后台线程每个轮询间隔都会检查）
+_vector_db_available = True
+
+
+def _check_vector_db_available() -> bool:
+    """检查向量数据库是否可用，可用状态变化时记录一次日志"""
+    global _vector_db_available
+    available = is_vector_db_available()
+    if available != _vector_db_available:
+        if available:
+            logger.info("向量数据库已恢复，继续处理发件箱")
+        else:
+            logger.warning("向量数据库不可用，发件箱记录保留到恢复后处理")
+        _vector_db_available = available
+    return available
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """计算第attempts次失败后的重试等待时间（指数退避，有上限）"""
+    base = getattr(Config, 'VECTOR_OUTBOX_RETRY_BASE_SECONDS', 5)
+    cap = getattr(Config, 'VECTOR_OUTBOX_RETRY_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * (2 ** max(attempts - 1, 0)), cap))
+
+
+def _claim_entries(batch_size: int) -> List[VectorOutbox]:
+    """
+    领取一批到期的待处理记录
+    处理中但超过租约时间的记录视为进程异常退出，可被重新领取
+
+    Args:
+        batch_size: 最多领取的记录数
+
+    Returns:
+        List[VectorOutbox]: 本进程领取到的记录，按ID升序
+    """
+    now = datetime.utcnow()
+    lease_expired_at = now - timedelta(seconds=getattr(Config, 'VECTOR_OUTBOX_LEASE_SECONDS', 300))
+    claimable = or_(
+        and_(VectorOutbox.status == 'pending', VectorOutbox.available_at <= now),
+        and_(VectorOutbox.status == 'processing', VectorOutbox.claimed_at < lease_expired_at)
+    )
+
+    candidate_ids = [row.id for row in db.session.query(VectorOutbox.id)
+                     .filter(claimable)
+                     .order_by(VectorOutbox.id)
+                     .limit(batch_size)
+                     .all()]
+    if not candidate_ids:
+        return []
+
+    # 条件更新保证多个进程不会同时领取同一条记录
+    VectorOutbox.query.filter(VectorOutbox.id.in_(candidate_ids), claimable).update(
+        {'status': 'processing', 'claimed_by': WORKER_ID, 'claimed_at': now},
+        synchronize_session=False
+    )
+    db.session.commit()
+
+    return VectorOutbox.query.filter(
+        VectorOutbox.id.in_(candidate_ids),
+        VectorOutbox.claimed_by == WORKER_ID,
+        VectorOutbox.status == 'processing'
+    ).order_by(VectorOutbox.id).all()
+
+
+def drain_outbox(batch_size: int = None, max_batches: int = None) -> Dict[str, Any]:
+    """
+    处理发件箱中的待同步记录
+
+    同一问题的多条记录只按最新状态处理一次：问题仍存在时upsert当前内容，已不存在时删除向量。
+    成功的记录从发件箱删除；失败的记录增加尝试次数并推迟重试，超过最大次数后标记为failed。
+    向量数据库不可用（未安装或初始化失败）时降级模式的写入不会生效，不领取记录，全部保留在发件箱中等待恢复
+
+    Args:
+        batch_size: 每批领取的记录数，默认使用配置值
+        max_batches: 最多处理的批数，None表示处理到发件箱为空
+
+    Returns:
+        Dict[str, Any]: 处理统计信息
+    """
+    batch_size = batch_size or getattr(Config, 'VECTOR_OUTBOX_BATCH_SIZE', 200)
+    max_attempts = getattr(Config, 'VECTOR_OUTBOX_MAX_ATTEMPTS', 10)
+    vector_db = get_vector_db()
+
+    stats = {'processed_count': 0, 'upserted_count': 0, 'deleted_count': 0, 'retry_count': 0, 'failed_count': 0}
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        if not _check_vector_db_available():
+            break
+        entries = _claim_entries(batch_size)
+        if not entries:
+            break
+        batches += 1
+
+        # 按问题合并记录，最终状态以数据库为准
+        entries_by_problem = {}
+        for entry in entries:
+            entries_by_problem.setdefault(entry.problem_id, []).append(entry)
+
+        problem_ids = list(entries_by_problem.keys())
+        problems = {problem.id: problem for problem in Problem.query.filter(Problem.id.in_(problem_ids)).all()}
+
+        documents = [problems[problem_id].to_vector_document() for problem_id in problem_ids if problem_id in problems]
+        delete_ids = [str(problem_id) for problem_id in problem_ids if problem_id not in problems]
+
+        errors = {}
+        if documents:
+            try:
+                result = vector_db.upsert_problems(documents)
+                # 批次失败时upsert_problems会逐个重试，只有真正失败的问题在failed_ids中
+                error_message = '; '.join(result['errors'][:3]) or '向量写入失败'
+                for failed_id in result['failed_ids']:
+                    errors[int(failed_id)] = next(
+                        (error for error in result['errors'] if error.startswith(f"问题 {failed_id} ")), error_message)
+                stats['upserted_count'] += result['success_count']
+            except Exception as e:
+                for document in documents:
+                    errors[int(document['id'])] = str(e)
+
+        if delete_ids:
+            try:
+                vector_db.delete_problems(delete_ids)
+                stats['deleted_count'] += len(delete_ids)
+            except Exception as e:
+                for problem_id in delete_ids:
+                    errors[int(problem_id)] = str(e)
+
+        # 成功的记录直接删除，失败的记录推迟重试
+        now = datetime.utcnow()
+        succeeded_entry_ids = []
+        for problem_id, problem_entries in entries_by_problem.items():
+            if problem_id not in errors:
+                succeeded_entry_ids.extend(entry.id for entry in problem_entries)
+                continue
+            for entry in problem_entries:
+                entry.attempts = (entry.attempts or 0) + 1
+                entry.last_error = errors[problem_id][:2000]
+                entry.claimed_by = None
+                entry.claimed_at = None
+                if entry.attempts >= max_attempts:
+                    entry.status = 'failed'
+                    stats['failed_count'] += 1
+                else:
+                    entry.status = 'pending'
+                    entry.available_at = now + _retry_delay(entry.attempts)
+                    stats['retry_count'] += 1
+
+        if succeeded_entry_ids:
+            VectorOutbox.query.filter(VectorOutbox.id.in_(succeeded_entry_ids)).delete(synchronize_session=False)
+        db.session.commit()
+        db.session.expunge_all()
+
+        stats['processed_count'] += len(entries)
+        if errors:
+            logger.error(f"发件箱处理部分失败: {len(errors)} 个问题将稍后重试")
+
+    if stats['processed_count']:
+        logger.info(f"发件箱处理完成: {stats}")
+    return stats
+
+
+def get_outbox_status() -> Dict[str, int]:
+    """
+    统计发件箱中各状态的记录数
+
+    Returns:
+        Dict[str, int]: 状态到数量的映射
+    """
+    rows = db.session.query(VectorOutbox.status, db.func.count(VectorOutbox.id)).group_by(VectorOutbox.status).all()
+    counts = {'pending': 0, 'processing': 0, 'failed': 0}
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+def retry_failed_entries() -> int:
+    """
+    将已标记为failed的记录重新放回待处理队列
+
+    Returns:
+        int: 重置的记录数
+    """
+    count = VectorOutbox.query.filter(VectorOutbox.status == 'failed').update(
+        {'status': 'pending', 'attempts': 0, 'available_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return count
+
+
+def start_outbox_worker(app, interval: float = None) -> Optional[threading.Thread]:
+    """
+    启动后台线程，按固定间隔处理发件箱
+
+    Args:
+        app: Flask应用实例
+        interval: 轮询间隔（秒），默认使用配置值，小于等于0时不启动
+
+    Returns:
+        Optional[threading.Thread]: 后台线程，未启动时返回None
+    """
+    interval = interval if interval is not None else app.config.get('VECTOR_OUTBOX_POLL_INTERVAL', 2)
+    if not interval or interval <= 0:
+        logger.info("未启用向量数据库发件箱后台处理")
+        return None
+
+    def _run():
+        while True:
+            try:
+                with app.app_context():
+                    drain_outbox()
+            except Exception as e:
+                logger.error(f"处理向量数据库发件箱失败: {str(e)}", exc_info=True)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=_run, name='vector-outbox-worker', daemon=True)
+    thread.start()
+    logger.info(f"已启动向量数据库发件箱后台处理，间隔 {interval} 秒")
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description='处理向量数据库发件箱')
+    parser.add_argument('--batch-size', type=int, default=None, help='每批领取的记录数')
+    parser.add_argument('--retry-failed', action='store_true', help='先将failed记录重新放回待处理队列')
+    parser.add_argument('--status', action='store_true', help='只显示发件箱状态')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        db.create_all()
+        if args.status:
+            summary = get_outbox_status()
+        else:
+            if args.retry_failed:
+                retry_failed_entries()
+            summary = drain_outbox(batch_size=args.batch_size)
+            summary['outbox'] = get_outbox_status()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
@@ -0,0 +1,292 @@
+"""
+向量数据库增量同步模块
+按updated_at/id高水位线只同步发生变化的问题，同步失败的问题记录下来在下次同步时重试；
+已删除问题的向量由发件箱删除，另有低频的遗留向量清理任务兜底
+可作为命令行脚本运行，也可以在应用中按固定间隔后台调度
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_
+
+from config import Config
+from models import db, Problem, SystemConfig
+from vector_consistency import find_orphan_vector_ids
+from vector_db import get_vector_db, is_vector_db_available
+
+logger = logging.getLogger(__name__)
+
+# SystemConfig中保存高水位线的配置键
+HIGH_WATER_MARK_KEY = 'vector_sync_high_water_mark'
+# SystemConfig中保存同步失败、待重试问题ID的配置键
+FAILED_IDS_KEY = 'vector_sync_failed_ids'
+
+
+def get_high_water_mark() -> Optional[Tuple[datetime, int]]:
+    """
+    读取上次同步的高水位线
+
+    Returns:
+        Optional[Tuple[datetime, int]]: (updated_at, id)，从未同步过时返回None
+    """
+    config_item = SystemConfig.query.filter_by(config_key=HIGH_WATER_MARK_KEY).first()
+    if not config_item or not config_item.config_value:
+        return None
+    try:
+        value = json.loads(config_item.config_value)
+        return datetime.fromisoformat(value['updated_at']), int(value['id'])
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"向量同步高水位线格式无效，将执行全量同步: {str(e)}")
+        return None
+
+
+def set_high_water_mark(updated_at: datetime, problem_id: int):
+    """
+    在当前事务中记录高水位线（由调用方提交）
+
+    Args:
+        updated_at: 已同步的最后一条记录的更新时间
+        problem_id: 已同步的最后一条记录的ID
+    """
+    _set_config_value(HIGH_WATER_MARK_KEY, json.dumps({'updated_at': updated_at.isoformat(), 'id': problem_id}),
+                      '向量数据库增量同步高水位线')
+
+
+def get_failed_ids() -> List[int]:
+    """
+    读取之前同步失败、尚待重试的问题ID（高水位线已越过这些问题）
+
+    Returns:
+        List[int]: 问题ID列表
+    """
+    config_item = SystemConfig.query.filter_by(config_key=FAILED_IDS_KEY).first()
+    if not config_item or not config_item.config_value:
+        return []
+    try:
+        return [int(problem_id) for problem_id in json.loads(config_item.config_value)]
+    except (ValueError, TypeError) as e:
+        logger.warning(f"向量同步待重试问题列表格式无效，已忽略: {str(e)}")
+        return []
+
+
+def _set_failed_ids(problem_ids: Iterable[int]):
+    """在当前事务中记录待重试的问题ID（由调用方提交）"""
+    _set_config_value(FAILED_IDS_KEY, json.dumps(sorted(problem_ids)), '向量数据库同步失败、待重试的问题ID')
+
+
+def _set_config_value(config_key: str, value: str, description: str):
+    config_item = SystemConfig.query.filter_by(config_key=config_key).first()
+    if config_item is None:
+        config_item = SystemConfig(config_key=config_key, description=description)
+        db.session.add(config_item)
+    config_item.config_value = value
+
+
+def _failed_problem_ids(result: Dict[str, Any]) -> Set[int]:
+    return {int(problem_id) for problem_id in result['failed_ids'] if str(problem_id).isdigit()}
+
+
+def _retry_failed(problem_ids: Set[int], vector_db, chunk_size: int) -> Tuple[Set[int], int]:
+    """
+    重新同步之前失败的问题，已删除的问题不再重试
+
+    Returns:
+        Tuple[Set[int], int]: (仍然失败的问题ID, 本次同步成功的数量)
+    """
+    still_failed = set()
+    synced_count = 0
+    ids = sorted(problem_ids)
+    for i in range(0, len(ids), chunk_size):
+        problems = Problem.query.filter(Problem.id.in_(ids[i:i + chunk_size])).all()
+        if not problems:
+            continue
+        result = vector_db.upsert_problems([problem.to_vector_document() for problem in problems])
+        synced_count += result['success_count']
+        still_failed |= _failed_problem_ids(result)
+        for problem in problems:
+            db.session.expunge(problem)
+    return still_failed, synced_count
+
+
+def sync_vector_db(full: bool = False, chunk_size: int = None, remove_deleted: bool = True) -> Dict[str, Any]:
+    """
+    增量同步问题到向量数据库
+    先重试之前同步失败的问题，再按(updated_at, id)顺序分块读取高水位线之后变化的问题，整块生成嵌入向量并upsert。
+    每块完成后推进高水位线，本块中失败的问题与高水位线一起记录，下次同步时重试；中断后可从上次位置继续。
+    向量数据库不可用时降级模式的写入不会生效，不同步也不推进高水位线
+
+    Args:
+        full: 是否忽略高水位线执行全量同步
+        chunk_size: 每块处理的问题数量，默认使用配置值
+        remove_deleted: 是否清理数据库中已不存在的问题向量
+
+    Returns:
+        Dict[str, Any]: 同步统计信息
+    """
+    start_time = time.time()
+    chunk_size = chunk_size or getattr(Config, 'VECTOR_SYNC_CHUNK_SIZE', 500)
+    vector_db = get_vector_db()
+    if not is_vector_db_available():
+        logger.warning("向量数据库不可用，跳过同步")
+        return {'synced_count': 0, 'failed_ids': get_failed_ids(), 'removed_count': 0, 'retried_count': 0,
+                'high_water_mark': None, 'skipped': True, 'processing_time': round(time.time() - start_time, 2)}
+
+    cursor = None if full else get_high_water_mark()
+    synced_count = 0
+    retried_count = 0
+
+    # 全量同步会重新处理全部问题，不需要单独重试
+    retry_ids = set() if full else set(get_failed_ids())
+    if retry_ids:
+        retried = len(retry_ids)
+        retry_ids, retried_count = _retry_failed(retry_ids, vector_db, chunk_size)
+        synced_count += retried_count
+        _set_failed_ids(retry_ids)
+        db.session.commit()
+        logger.info(f"重试之前同步失败的 {retried} 个问题: 成功 {retried_count} 个, 仍失败 {len(retry_ids)} 个")
+
+    logger.info(f"开始{'全量' if cursor is None else '增量'}同步向量数据库，高水位线: {cursor}")
+
+    while True:
+        # 键集分页：只读取高水位线之后的变化记录，按块流式读取
+        query = Problem.query.filter(Problem.updated_at.isnot(None)).order_by(Problem.updated_at, Problem.id)
+        if cursor is not None:
+            cursor_updated_at, cursor_id = cursor
+            query = query.filter(or_(
+                Problem.updated_at > cursor_updated_at,
+                and_(Problem.updated_at == cursor_updated_at, Problem.id > cursor_id)
+            ))
+
+        documents = []
+        loaded = []
+        for problem in query.limit(chunk_size).yield_per(chunk_size):
+            documents.append(problem.to_vector_document())
+            loaded.append(problem)
+
+        if not documents:
+            break
+
+        result = vector_db.upsert_problems(documents)
+        synced_count += result['success_count']
+        if result['errors']:
+            logger.error(f"向量同步部分失败: {result['errors'][:5]}")
+
+        # 本块失败的问题加入待重试列表（本块中同步成功的问题移出列表），与高水位线一起提交
+        chunk_failed = _failed_problem_ids(result)
+        retry_ids = (retry_ids - {problem.id for problem in loaded}) | chunk_failed
+
+        # 推进高水位线并释放本块加载的对象
+        cursor = (loaded[-1].updated_at, loaded[-1].id)
+        set_high_water_mark(*cursor)
+        _set_failed_ids(retry_ids)
+        db.session.commit()
+        for problem in loaded:
+            db.session.expunge(problem)
+
+        if len(documents) < chunk_size:
+            break
+
+    removed_count = remove_deleted_vectors(chunk_size) if remove_deleted else 0
+
+    elapsed = time.time() - start_time
+    logger.info(f"向量数据库同步完成: 同步 {synced_count} 个, 待重试 {len(retry_ids)} 个, "
+                f"清理 {removed_count} 个, 耗时 {elapsed:.2f} 秒")
+    return {
+        'synced_count': synced_count,
+        'failed_ids': sorted(retry_ids),  # 同步失败、下次同步时重试的问题ID
+        'retried_count': retried_count,  # 之前失败、本次重试成功的数量
+        'removed_count': removed_count,
+        'high_water_mark': {'updated_at': cursor[0].isoformat(), 'id': cursor[1]} if cursor else None,
+        'processing_time': round(elapsed, 2)
+    }
+
+
+def remove_deleted_vectors(page_size: int = 1000) -> int:
+    """
+    清理数据库中已删除问题对应的向量（遍历向量库中的全部ID）
+    问题删除时发件箱已删除其向量，本函数只用于兜底清理，由定时任务按VECTOR_ORPHAN_SWEEP_INTERVAL低频执行
+
+    Args:
+        page_size: 每页读取的向量ID数量
+
+    Returns:
+        int: 删除的向量数量
+    """
+    vector_db = get_vector_db()
+    orphan_ids = find_orphan_vector_ids(vector_db, page_size)
+
+    # 遍历结束后再删除，避免删除导致分页偏移错位
+    if orphan_ids:
+        vector_db.delete_problems(orphan_ids)
+        logger.info(f"已清理 {len(orphan_ids)} 个已删除问题的向量")
+    return len(orphan_ids)
+
+
+def _scheduled_sync(last_sweep_at: float, sweep_interval: float) -> float:
+    """
+    定时同步的一轮：增量同步（不遍历向量库），距上次清理超过sweep_interval秒时再清理遗留向量
+
+    Returns:
+        float: 上次清理的时间（time.monotonic()）
+    """
+    sync_vector_db(remove_deleted=False)
+    now = time.monotonic()
+    if sweep_interval > 0 and now - last_sweep_at >= sweep_interval:
+        remove_deleted_vectors()
+        return now
+    return last_sweep_at
+
+
+def start_vector_sync_scheduler(app, interval: int = None) -> Optional[threading.Thread]:
+    """
+    启动后台线程，按固定间隔执行增量同步，并按VECTOR_ORPHAN_SWEEP_INTERVAL低频清理遗留向量
+
+    Args:
+        app: Flask应用实例
+        interval: 同步间隔（秒），默认使用配置值，小于等于0时不启动
+
+    Returns:
+        Optional[threading.Thread]: 后台线程，未启动时返回None
+    """
+    interval = interval if interval is not None else app.config.get('VECTOR_SYNC_INTERVAL', 0)
+    if not interval or interval <= 0:
+        logger.info("未启用向量数据库定时同步")
+        return None
+
+    sweep_interval = app.config.get('VECTOR_ORPHAN_SWEEP_INTERVAL', 86400)
+
+    def _run():
+        # 启动时的同步已清理过一次
+        last_sweep_at = time.monotonic()
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    last_sweep_at = _scheduled_sync(last_sweep_at, sweep_interval)
+            except Exception as e:
+                logger.error(f"定时同步向量数据库失败: {str(e)}", exc_info=True)
+
+    thread = threading.Thread(target=_run, name='vector-sync-scheduler', daemon=True)
+    thread.start()
+    logger.info(f"已启动向量数据库定时同步，间隔 {interval} 秒")
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+    from app import app
+
+    parser = argparse.ArgumentParser(description='增量同步问题到向量数据库')
+    parser.add_argument('--full', action='store_true', help='忽略高水位线，执行全量同步')
+    parser.add_argument('--chunk-size', type=int, default=None, help='每块处理的问题数量')
+    parser.add_argument('--keep-deleted', action='store_true', help='不清理已删除问题的向量')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        summary = sync_vector_db(full=args.full, chunk_size=args.chunk_size, remove_deleted=not args.keep_deleted)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
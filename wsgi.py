@@ -6,12 +6,23 @@ WSGI应用入口文件
 import os
 from app import app
 from init_db import init_database
+from vector_outbox import start_outbox_worker
+from vector_sync import start_vector_sync_scheduler
+from ai_backfill import start_backfill_worker
+from profiler import install_signal_handler
 
 
 def create_app():
     """创建应用实例并初始化数据库"""
     # 初始化数据库
     init_database()
+    # 启动向量数据库发件箱后台处理、定时增量同步和AI补充分析（未配置间隔时不启动）
+    start_outbox_worker(app)
+    start_vector_sync_scheduler(app)
+    start_backfill_worker(app)
+    # 注册SIGUSR2采样（kill -USR2 <worker pid>）
+    install_signal_handler(app.config['PROFILE_OUTPUT_DIR'], app.config['PROFILE_SIGNAL_SECONDS'],
+                           app.config['PROFILE_INTERVAL_MS'] / 1000.0)
     return app
 
 